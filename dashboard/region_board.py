@@ -0,0 +1,52 @@
+"""Grouped queries behind the Hududlar pages (districts / district detail).
+
+v1 counterpart of the v2 region board (v2/backend/apps/shops/region_board.py):
+a fixed number of queries instead of one or more per region or per shop.
+"""
+from decimal import Decimal
+
+from django.db.models import Count, DecimalField, ExpressionWrapper, F, Q, Sum
+
+from orders.models import Order, OrderItem
+from shops.models import Region
+
+
+def district_list(day):
+    """[{district, total, partial, delivered}] for every region, in two queries."""
+    counts = {
+        row["shop__region_id"]: row
+        for row in (
+            Order.objects.filter(order_date=day)
+            .values("shop__region_id")
+            .annotate(
+                total=Count("id"),
+                partial=Count("id", filter=Q(status="Partially Delivered")),
+                delivered=Count("id", filter=Q(status="Delivered")),
+            )
+        )
+    }
+    result = []
+    for district in Region.objects.all():
+        row = counts.get(district.id, {})
+        result.append({
+            "district": district,
+            "total": row.get("total", 0),
+            "partial": row.get("partial", 0),
+            "delivered": row.get("delivered", 0),
+        })
+    return result
+
+
+def planned_loans(shop_ids, exclude_order_ids):
+    """{shop_id: Σ quantity × unit_price} over each shop's other orders, in one query."""
+    value = ExpressionWrapper(F("quantity") * F("unit_price"), output_field=DecimalField())
+    rows = (
+        OrderItem.objects.filter(order__shop_id__in=shop_ids)
+        .exclude(order_id__in=exclude_order_ids)
+        .values("order__shop_id")
+        .annotate(total=Sum(value))
+    )
+    loans = {shop_id: Decimal("0.00") for shop_id in shop_ids}
+    for row in rows:
+        loans[row["order__shop_id"]] = (row["total"] or Decimal("0")).quantize(Decimal("0.01"))
+    return loans
@@ -10,6 +10,7 @@ from django.db import connection
 
 from orders.models import Order, OrderItem
 from shops.models import Shop, Region
+from . import region_board
 from .forms import LoanRepaymentForm
 from .models import Payment
 from reports.models import Purchase, BakeryBalance
@@ -116,17 +117,7 @@ def dashboard_view(request):
 def districts_view(request):
     """Show per-district delivery statistics for today."""
     today = timezone.now().date()
-    districts = Region.objects.all()
-
-    district_list = []
-    for district in districts:
-        orders = Order.objects.filter(shop__region=district, order_date=today)
-        district_list.append({
-            "district": district,
-            "total": orders.count(),
-            "partial": orders.filter(status="Partially Delivered").count(),
-            "delivered": orders.filter(status="Delivered").count(),
-        })
+    district_list = region_board.district_list(today)
 
     return render(request, "dashboard/districts.html", {
         "district_list": district_list,
@@ -140,19 +131,17 @@ def district_detail_view(request, district_id):
     district = get_object_or_404(Region, id=district_id)
     today = timezone.now().date()
 
-    orders = Order.objects.filter(
-        shop__region=district, order_date=today
-    ).order_by("shop__name")
-
-    shop_loans = {}
-    shops_in_orders = set(order.shop for order in orders)
-    for shop in shops_in_orders:
-        # planned_loan still sums all past orders (all dates)
-        past_orders = shop.orders.exclude(id__in=[o.id for o in orders])
-        planned_loan = sum(
-            item.total_price for o in past_orders for item in o.items.all()
-        )
-        shop_loans[shop.id] = planned_loan
+    orders = list(
+        Order.objects.filter(shop__region=district, order_date=today)
+        .select_related("shop")
+        .prefetch_related("items__product")
+        .order_by("shop__name")
+    )
+
+    # planned_loan still sums all past orders (all dates)
+    shop_loans = region_board.planned_loans(
+        {o.shop_id for o in orders}, [o.id for o in orders]
+    )
 
     return render(request, "dashboard/district_detail.html", {
         "district": district,
@@ -0,0 +1,94 @@
+"""Stock-take engine behind the Taftish (inventory revision) page.
+
+v1 counterpart of the v2 batch revision engine
+(v2/backend/apps/inventory/revision.py): every row is validated before
+anything is written, then ingredients and product stocks are each locked with
+one id-ordered SELECT ... FOR UPDATE, updated with one bulk_update and audited
+with one bulk_create — a fixed number of statements for the whole formset.
+"""
+from collections import defaultdict
+from decimal import Decimal
+
+from .models import BakeryProductStock, Ingredient, InventoryRevisionReport
+
+
+def _load(ingredient_ids, product_ids, lock=False):
+    ingredients = Ingredient.objects.filter(id__in=ingredient_ids).order_by("id")
+    stocks = BakeryProductStock.objects.select_related("product").filter(product_id__in=product_ids).order_by("id")
+    if lock:
+        ingredients = ingredients.select_for_update()
+        stocks = stocks.select_for_update(of=("self",))
+    by_product = defaultdict(list)
+    for stock in stocks:
+        by_product[stock.product_id].append(stock)
+    return {ing.id: ing for ing in ingredients}, by_product
+
+
+def validate(rows):
+    """
+    rows: [(item_type, item_id, new_quantity, note)] → (items, errors).
+
+    Rows with missing data are skipped; errors are user-facing strings. An
+    ingredient or product may appear only once. Nothing is written — call
+    apply() only when errors is empty.
+    """
+    items, errors, seen = [], [], set()
+    for item_type, item_id, new_qty, note in rows:
+        if not item_type or not item_id or new_qty is None:
+            continue
+        new_qty = Decimal(str(new_qty))
+        if new_qty < 0:
+            errors.append(f"ID {item_id}: Miqdor manfiy bo'lishi mumkin emas")
+            continue
+        key = (item_type == "ingredient", item_id)
+        if key in seen:
+            label = "Xomashyo" if item_type == "ingredient" else "Mahsulot"
+            errors.append(f"{label} takrorlangan: {item_id}")
+            continue
+        seen.add(key)
+        items.append((item_type, item_id, new_qty, (note or "").strip()))
+
+    ingredients, stocks = _load(
+        {i[1] for i in items if i[0] == "ingredient"},
+        {i[1] for i in items if i[0] != "ingredient"},
+    )
+    valid = []
+    for item in items:
+        item_type, item_id = item[0], item[1]
+        if item_type == "ingredient" and item_id not in ingredients:
+            errors.append(f"Ingredient ID {item_id} topilmadi")
+        elif item_type != "ingredient" and len(stocks.get(item_id, ())) != 1:
+            errors.append(f"Product stock ID {item_id} topilmadi")
+        else:
+            valid.append(item)
+    return valid, errors
+
+
+def apply(items, user):
+    """Write validated items (inside transaction.atomic). Returns the number of changed items."""
+    ingredients, stocks = _load(
+        {i[1] for i in items if i[0] == "ingredient"},
+        {i[1] for i in items if i[0] != "ingredient"},
+        lock=True,
+    )
+    changed_ingredients, changed_stocks, reports = [], [], []
+    for item_type, item_id, new_qty, note in items:
+        item = ingredients[item_id] if item_type == "ingredient" else stocks[item_id][0]
+        old_qty = item.quantity
+        if new_qty == old_qty:
+            continue
+        item.quantity = new_qty
+        (changed_ingredients if item_type == "ingredient" else changed_stocks).append(item)
+        reports.append(InventoryRevisionReport(
+            item_type=item_type,
+            ingredient=item if item_type == "ingredient" else None,
+            product=item.product if item_type != "ingredient" else None,
+            old_quantity=old_qty,
+            new_quantity=new_qty,
+            note=note or f"Qo'lda o'zgartirildi: {old_qty} → {new_qty}",
+            user=user,
+        ))
+    Ingredient.objects.bulk_update(changed_ingredients, ["quantity"])
+    BakeryProductStock.objects.bulk_update(changed_stocks, ["quantity"])
+    InventoryRevisionReport.objects.bulk_create(reports)
+    return len(reports)
@@ -2,8 +2,9 @@ from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib import messages
 from django.db import transaction
 from django.utils import timezone
-from .models import Ingredient, Purchase, Production, DailyBakeryProduction, BakeryProductStock, InventoryRevisionReport
+from .models import Ingredient, Purchase, Production, DailyBakeryProduction, BakeryProductStock
 from .forms import IngredientForm, PurchaseForm, ProductionForm, DailyBakeryProductionForm, InventoryRevisionForm
+from . import revision
 from reports.models import Purchase as ReportPurchase
 from django.forms import formset_factory
 from decimal import Decimal
@@ -208,72 +209,25 @@ def inventory_revision(request):
         formset = RevisionFormSet(request.POST)
 
         if formset.is_valid():
+            rows = [
+                (
+                    form.cleaned_data.get('item_type'),
+                    form.cleaned_data.get('item_id'),
+                    form.cleaned_data.get('new_quantity'),
+                    form.cleaned_data.get('note', ''),
+                )
+                for form in formset
+            ]
+            # Validate every row first, then write the whole revision at once
+            # (inventory/revision.py) — a bad row no longer leaves earlier rows saved.
+            items, errors = revision.validate(rows)
             updated_count = 0
-            errors = []
-
-            with transaction.atomic():
-                for form in formset:
-                    item_type = form.cleaned_data.get('item_type')
-                    item_id = form.cleaned_data.get('item_id')
-                    new_qty = form.cleaned_data.get('new_quantity')
-                    note = form.cleaned_data.get('note', '').strip()
-
-                    # Skip if essential data is missing
-                    if not item_type or not item_id or new_qty is None:
-                        continue
-
-                    try:
-                        # Get the item with row-level lock
-                        if item_type == 'ingredient':
-                            item = Ingredient.objects.select_for_update().get(id=item_id)
-                            item_name = item.name
-                        else:  # product
-                            stock = BakeryProductStock.objects.select_for_update().get(product_id=item_id)
-                            item = stock
-                            item_name = stock.product.name
-
-                        # Get old quantity
-                        old_qty = item.quantity
-
-                        # Only update if quantity changed
-                        if Decimal(str(new_qty)) != old_qty:
-                            # Validate quantity is non-negative
-                            if new_qty < 0:
-                                errors.append(f"{item_name}: Miqdor manfiy bo'lishi mumkin emas")
-                                continue
-
-                            # Update quantity
-                            item.quantity = Decimal(str(new_qty))
-                            item.save(update_fields=['quantity'])
-
-                            # Create audit log
-                            InventoryRevisionReport.objects.create(
-                                item_type=item_type,
-                                ingredient=item if item_type == 'ingredient' else None,
-                                product=stock.product if item_type == 'product' else None,
-                                old_quantity=old_qty,
-                                new_quantity=Decimal(str(new_qty)),
-                                note=note or f"Qo'lda o'zgartirildi: {old_qty} → {new_qty}",
-                                user=request.user
-                            )
-                            updated_count += 1
-                            logger.info(
-                                f"Inventory revised: {item_type} '{item_name}' "
-                                f"{old_qty} → {new_qty} by {request.user.username}"
-                            )
-
-                    except Ingredient.DoesNotExist:
-                        errors.append(f"Ingredient ID {item_id} topilmadi")
-                        logger.error(f"Ingredient {item_id} not found during revision")
-                        continue
-                    except BakeryProductStock.DoesNotExist:
-                        errors.append(f"Product stock ID {item_id} topilmadi")
-                        logger.error(f"Product stock {item_id} not found during revision")
-                        continue
-                    except Exception as e:
-                        errors.append(f"Xatolik: {str(e)}")
-                        logger.exception(f"Error during inventory revision: {e}")
-                        continue
+            if not errors:
+                with transaction.atomic():
+                    updated_count = revision.apply(items, request.user)
+                logger.info(
+                    f"Inventory revised: {updated_count} items by {request.user.username}"
+                )
 
             # Show appropriate messages
             if errors:
@@ -5,3 +5,9 @@ class CoreConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "apps.core"
     label = "core"
+
+    def ready(self):
+        from . import deferred, sync
+
+        sync.connect_signals()
+        deferred.connect_signals()
@@ -0,0 +1,31 @@
+"""Version-keyed caching for derived read models.
+
+A cached value is stored under `<key>:<version>`, where the version is a
+fingerprint the caller reads from the source tables (e.g. max updated_at and
+row count). Any write changes the fingerprint, so a stale value is never
+served — old entries just expire — and no explicit invalidation is needed
+across gunicorn workers.
+"""
+from django.core.cache import cache
+
+DEFAULT_TTL = 10 * 60  # seconds
+
+
+def fingerprint(*parts) -> str:
+    """Join aggregate values (datetimes, counts, sums) into a version string."""
+    out = []
+    for p in parts:
+        if hasattr(p, "timestamp"):
+            p = p.timestamp()
+        out.append("" if p is None else str(p))
+    return "-".join(out)
+
+
+def get_or_build(key: str, version: str, build, ttl: int = DEFAULT_TTL):
+    """Return the cached value for (key, version), building it on a miss."""
+    full_key = f"{key}:{version}"
+    value = cache.get(full_key)
+    if value is None:
+        value = build()
+        cache.set(full_key, value, ttl)
+    return value
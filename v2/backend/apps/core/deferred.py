@@ -0,0 +1,45 @@
+"""Coalesced after-commit work.
+
+`defer(name, keys, run)` adds `keys` to a per-thread pending set called `name`
+and registers a drain with transaction.on_commit (which runs at once outside a
+transaction). The first drain after the commit takes the whole set and calls
+`run(keys)` once; later drains registered for the same set find it empty. A
+request that touches the same row many times does the follow-up work once.
+
+Keys collected by a rolled-back transaction have no drain left, so they run
+with the next commit on the same thread. That only repeats idempotent work.
+The sets are reset when a request starts, so nothing carries over from one
+request to the next.
+"""
+import threading
+
+from django.core.signals import request_started
+from django.db import transaction
+
+_local = threading.local()
+
+
+def _pending() -> dict:
+    if not hasattr(_local, "sets"):
+        _local.sets = {}
+    return _local.sets
+
+
+def defer(name: str, keys, run) -> None:
+    """Call `run(set_of_keys)` once the current transaction commits."""
+    _pending().setdefault(name, set()).update(keys)
+    transaction.on_commit(lambda: _drain(name, run))
+
+
+def _drain(name: str, run) -> None:
+    keys = _pending().pop(name, None)
+    if keys:
+        run(keys)
+
+
+def _reset(**kwargs) -> None:
+    _local.sets = {}
+
+
+def connect_signals() -> None:
+    request_started.connect(_reset, dispatch_uid="core_deferred_reset")
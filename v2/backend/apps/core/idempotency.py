@@ -0,0 +1,103 @@
+"""`Idempotency-Key` support for money- and stock-moving POSTs.
+
+Drivers on weak connections retry on timeout, and a retried payment or order
+create used to post twice (double kassa credit, double shop balance change).
+A view method wrapped with `@idempotent` honours the header:
+
+- first request: the key row is inserted in the same transaction as the view's
+  writes and stores the 2xx response; a non-2xx response rolls everything back,
+  so the client may retry with the same key after fixing the input;
+- retry after success: the stored response is returned (with an
+  `Idempotent-Replayed: true` header) and the view does not run;
+- retry while the first is still running: the unique index makes it wait for
+  the first transaction, then it replays that response;
+- same key with a different body or endpoint: 422.
+
+Requests without the header behave exactly as before.
+"""
+import functools
+import hashlib
+import json
+from datetime import timedelta
+
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+from rest_framework.permissions import SAFE_METHODS
+from rest_framework.response import Response
+from rest_framework.utils.encoders import JSONEncoder
+
+from .models import IdempotencyKey
+
+HEADER = "Idempotency-Key"
+KEY_TTL = timedelta(hours=24)
+MAX_KEY_LENGTH = 255
+
+
+def _request_hash(request) -> str:
+    body = json.dumps(request.data, sort_keys=True, cls=JSONEncoder, default=str)
+    raw = f"{request.method}:{request.path}:{body}"
+    return hashlib.sha256(raw.encode()).hexdigest()
+
+
+def _replay(record: IdempotencyKey, request_hash: str) -> Response:
+    if record.request_hash != request_hash:
+        return Response(
+            {"detail": "Idempotency-Key boshqa so'rov uchun ishlatilgan."},
+            status=422,
+        )
+    return Response(
+        record.response_body,
+        status=record.status_code,
+        headers={"Idempotent-Replayed": "true"},
+    )
+
+
+def idempotent(view_method):
+    """Decorator for ViewSet handlers (create / POST actions)."""
+
+    @functools.wraps(view_method)
+    def wrapper(self, request, *args, **kwargs):
+        key = request.headers.get(HEADER, "").strip()
+        if not key or not request.user.is_authenticated or request.method in SAFE_METHODS:
+            return view_method(self, request, *args, **kwargs)
+        if len(key) > MAX_KEY_LENGTH:
+            return Response(
+                {"detail": f"Idempotency-Key {MAX_KEY_LENGTH} belgidan oshmasin."},
+                status=400,
+            )
+
+        request_hash = _request_hash(request)
+        IdempotencyKey.objects.filter(
+            user=request.user, key=key, created_at__lt=timezone.now() - KEY_TTL
+        ).delete()
+
+        with transaction.atomic():
+            try:
+                with transaction.atomic():
+                    record = IdempotencyKey.objects.create(
+                        user=request.user, key=key, request_hash=request_hash
+                    )
+            except IntegrityError:
+                # Committed by an earlier (or concurrent, now finished) request.
+                return _replay(
+                    IdempotencyKey.objects.get(user=request.user, key=key), request_hash
+                )
+
+            response = view_method(self, request, *args, **kwargs)
+            if not 200 <= response.status_code < 300:
+                transaction.set_rollback(True)
+                return response
+            record.status_code = response.status_code
+            record.response_body = json.loads(json.dumps(response.data, cls=JSONEncoder))
+            record.save(update_fields=["status_code", "response_body"])
+            return response
+
+    return wrapper
+
+
+def purge_expired() -> int:
+    """Delete keys older than KEY_TTL; returns the number removed."""
+    deleted, _ = IdempotencyKey.objects.filter(
+        created_at__lt=timezone.now() - KEY_TTL
+    ).delete()
+    return deleted
@@ -19,14 +19,18 @@ from datetime import datetime, timezone as py_tz
 from decimal import Decimal
 from pathlib import Path
 
+from django.apps import apps
 from django.core.management.base import BaseCommand, CommandError
 from django.db import transaction
+from django.db.models import F
 from django.utils import timezone
 
+from apps.finance.balances import live
 from apps.finance.models import (
     ExpenseCategory,
     GeneralExpense,
     KassaAccount,
+    KassaBalanceCheckpoint,
     KassaTransaction,
     KassaTransactionType,
     Payment,
@@ -34,17 +38,22 @@ from apps.finance.models import (
 )
 from apps.inventory.models import (
     Ingredient,
+    IngredientLot,
+    IngredientMovement,
     ProductRecipe,
     Purchase as IngredientPurchase,
     Unit,
 )
+from apps.inventory.lots import backfill_lots
+from apps.inventory.stock import backfill_movements
 from apps.orders.models import Order, OrderItem, OrderStatus
 from apps.production.models import (
     BakeryProductStock,
     InventoryRevisionReport,
 )
 from apps.products.models import Product
-from apps.shops.models import Region, Shop
+from apps.shops import ledger
+from apps.shops.models import Region, Shop, ShopLedgerEntry, ShopLedgerKind
 from apps.users.models import User, UserActivityLog
 
 V1_STATUS_MAP = {
@@ -116,6 +125,10 @@ class Command(BaseCommand):
                 self._wipe()
             ctx = Context(self, conn)
             ctx.run()
+            # v1 keeps no stock history: replay what was imported into the ledger.
+            rows = backfill_movements(apps.get_model)
+            self.stdout.write(f"  Ingredient movements: {rows}")
+            self.stdout.write(f"  Ingredient lots: {backfill_lots(apps.get_model)}")
 
         self.stdout.write(self.style.SUCCESS("✓ Migration complete."))
 
@@ -123,15 +136,21 @@ class Command(BaseCommand):
         self.stdout.write("Wiping existing v2 data...")
         # Delete in FK-safe order.
         KassaTransaction.objects.all().delete()
+        # Kassa accounts are kept; with their ledger gone they start from zero.
+        KassaBalanceCheckpoint.objects.all().delete()
+        KassaAccount.objects.update(balance_uzs=0, balance_usd=0)
         Payment.objects.all().delete()
         GeneralExpense.objects.all().delete()
         ExpenseCategory.objects.all().delete()
         OrderItem.objects.all().delete()
         Order.objects.all().delete()
+        ShopLedgerEntry.objects.all().delete()
         IngredientPurchase.objects.all().delete()
         ProductRecipe.objects.all().delete()
         InventoryRevisionReport.objects.all().delete()
         BakeryProductStock.objects.all().delete()
+        IngredientMovement.objects.all().delete()
+        IngredientLot.objects.all().delete()
         Ingredient.objects.all().delete()
         Unit.objects.all().delete()
         Product.objects.all().delete()
@@ -216,6 +235,7 @@ class Context:
         self.log(f"  regions: {len(self.regions)}")
 
     def migrate_shops(self):
+        openings = []
         for row in self.fetch("SELECT * FROM shops_shop"):
             region = self.regions.get(row["region_id"])
             if not region:
@@ -226,9 +246,14 @@ class Context:
                 phone=row["phone"] or "",
                 address=row["address"] or "",
                 region=region,
-                loan_balance_uzs=Decimal(row["loan_balance"] or 0),
             )
             self.shops[row["id"]] = s
+            openings.append({
+                "shop_id": s.pk, "currency": "UZS", "amount": Decimal(row["loan_balance"] or 0),
+                "kind": ShopLedgerKind.OPENING, "note": "V1 dan ko'chirilgan qarz",
+            })
+        # The v1 debt enters through the ledger, so balance and entries agree.
+        ledger.post_many({s.pk: s for s in self.shops.values()}, openings)
         self.log(f"  shops: {len(self.shops)}")
 
     # ─────── Products ───────
@@ -478,13 +503,23 @@ class Context:
         if not rows:
             return
         amount = Decimal(rows[0]["amount"] or 0)
-        # Set Seyf balance directly; the ledger sum won't match without back-filling
-        # ledger entries, but the business "cash on hand" number is preserved.
-        self.seyf.balance_uzs = amount
-        self.seyf.save(update_fields=["balance_uzs"])
+        # v1 keeps no cash history: post the difference as one opening row so
+        # the Seyf balance still equals the sum of its ledger.
+        diff = amount - live(self.seyf)["UZS"]
+        if diff:
+            self.seyf.balance_uzs = F("balance_uzs") + diff
+            self.seyf.save(update_fields=["balance_uzs"])
+            KassaTransaction.objects.create(
+                account=self.seyf,
+                kind=KassaTransactionType.ADJUSTMENT,
+                currency="UZS",
+                amount=diff,
+                note="V1 dan ko'chirilgan qoldiq",
+                occurred_at=timezone.now(),
+            )
         self.log(f"  bakery_balance → Seyf: {amount} UZS")
 
     def recalc_shop_loan_balances(self):
-        # Shop.loan_balance was copied directly from v1; nothing to recalculate.
-        # (v2's single-source-of-truth formula matches what v1 had stored.)
+        # Shop.loan_balance was posted from v1 as an opening ledger entry;
+        # nothing to recalculate.
         pass
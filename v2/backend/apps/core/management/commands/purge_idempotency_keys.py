@@ -0,0 +1,19 @@
+"""
+Delete expired Idempotency-Key rows.
+
+Usage: python manage.py purge_idempotency_keys
+
+Keys are only needed while a client may still retry; rows older than
+apps.core.idempotency.KEY_TTL are removed. Safe to run from cron at any time.
+"""
+from django.core.management.base import BaseCommand
+
+from apps.core.idempotency import KEY_TTL, purge_expired
+
+
+class Command(BaseCommand):
+    help = "Delete Idempotency-Key rows older than the retention window."
+
+    def handle(self, *args, **options):
+        deleted = purge_expired()
+        self.stdout.write(self.style.SUCCESS(f"Deleted {deleted} keys older than {KEY_TTL}."))
@@ -0,0 +1,19 @@
+"""
+Delete old delta-sync tombstones.
+
+Usage: python manage.py purge_sync_tombstones
+
+Rows older than apps.core.sync.TOMBSTONE_TTL are removed; clients whose
+watermark is older than that get a full snapshot from /sync/ anyway.
+"""
+from django.core.management.base import BaseCommand
+
+from apps.core.sync import TOMBSTONE_TTL, purge_tombstones
+
+
+class Command(BaseCommand):
+    help = "Delete sync tombstones older than the retention window."
+
+    def handle(self, *args, **options):
+        deleted = purge_tombstones()
+        self.stdout.write(self.style.SUCCESS(f"Deleted {deleted} tombstones older than {TOMBSTONE_TTL}."))
@@ -0,0 +1,45 @@
+"""
+Recompute cached balances from their source rows and report drift.
+
+Usage:
+    python manage.py reconcile_balances                 # report only
+    python manage.py reconcile_balances --only shops kassa
+    python manage.py reconcile_balances --only shops --ids 4 7 --repair
+
+Types: shops, kassa, ingredients, product_stock, product_cost
+(see apps.core.reconcile). Repair needs --only (and --ids needs exactly one
+type); it runs in a single transaction.
+"""
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.core.reconcile import CHECKS, repair
+
+
+class Command(BaseCommand):
+    help = "Report (and optionally repair) drift in cached balances."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--only", nargs="+", choices=list(CHECKS), help="Balance types to check.")
+        parser.add_argument("--ids", nargs="+", type=int, help="Only these rows of the one --only type.")
+        parser.add_argument("--repair", action="store_true", help="Write the recomputed values.")
+
+    def handle(self, *args, **options):
+        if options["repair"] and not options["only"]:
+            raise CommandError("--repair needs --only with the balance types to overwrite.")
+        if options["ids"] and len(options["only"] or []) != 1:
+            raise CommandError("--ids needs exactly one --only type.")
+        kinds = options["only"] or list(CHECKS)
+        result = repair(kinds, options["ids"], dry_run=not options["repair"])
+        total = 0
+        for kind in kinds:
+            rows = result[kind]
+            total += len(rows)
+            self.stdout.write(f"{kind}: {len(rows)} drifted")
+            for r in rows:
+                self.stdout.write(
+                    f"  #{r['id']} {r['name']} · {r['field']}: "
+                    f"cached {r['cached']} / expected {r['expected']} (diff {r['diff']})"
+                )
+        verb = "Repaired" if options["repair"] else "Found"
+        style = self.style.SUCCESS if options["repair"] or not total else self.style.WARNING
+        self.stdout.write(style(f"{verb} {total} drifted values."))
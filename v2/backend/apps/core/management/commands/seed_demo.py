@@ -16,17 +16,28 @@ import random
 from datetime import timedelta
 from decimal import Decimal
 
+from django.apps import apps
 from django.core.management.base import BaseCommand
 from django.db import transaction
 from django.utils import timezone
 
 from apps.finance.models import KassaAccount, KassaTransaction, Payment, PaymentType
-from apps.inventory.models import Ingredient, ProductRecipe, Purchase as IngredientPurchase, Unit
+from apps.inventory.lots import backfill_lots
+from apps.inventory.models import (
+    Ingredient,
+    IngredientLot,
+    IngredientMovement,
+    ProductRecipe,
+    Purchase as IngredientPurchase,
+    Unit,
+)
+from apps.inventory.stock import backfill_movements
 from apps.orders.models import Order, OrderItem, OrderPriority, OrderStatus
 from apps.production.models import BakeryProductStock, Production
 from apps.products.models import Product
 from apps.salary.models import PaymentKind, RateType, SalaryPayment, SalaryRate
-from apps.shops.models import Region, Shop
+from apps.shops import ledger
+from apps.shops.models import Region, Shop, ShopLedgerEntry, ShopLedgerKind
 from apps.users.models import Role, User, UserActivityLog
 
 
@@ -56,6 +67,8 @@ class Command(BaseCommand):
         self._seed_salary_rates(users)
         self._seed_salary_payments(users, accounts)
         self._seed_activity(users)
+        backfill_movements(apps.get_model)
+        backfill_lots(apps.get_model)
 
         self.stdout.write(self.style.SUCCESS("✓ Demo data seeded."))
         self.stdout.write(
@@ -70,8 +83,8 @@ class Command(BaseCommand):
         for model in [
             UserActivityLog, Payment, KassaTransaction, IngredientPurchase,
             SalaryPayment, SalaryRate,
-            Production, BakeryProductStock, OrderItem, Order,
-            ProductRecipe, Ingredient, Unit, Product, Shop, Region,
+            Production, BakeryProductStock, OrderItem, Order, ShopLedgerEntry,
+            ProductRecipe, IngredientMovement, IngredientLot, Ingredient, Unit, Product, Shop, Region,
         ]:
             model.objects.all().delete()
         # Keep kassa accounts — they're seeded by data migration, not demo.
@@ -282,6 +295,7 @@ class Command(BaseCommand):
         priorities = [OrderPriority.NORMAL, OrderPriority.NORMAL, OrderPriority.HIGH, OrderPriority.URGENT]
         statuses = [OrderStatus.PENDING, OrderStatus.PARTIALLY_DELIVERED, OrderStatus.DELIVERED]
 
+        shops = {s.pk: s for s in Shop.objects.select_for_update().filter(pk__in=[s.pk for s in shops.values()])}
         shop_list = list(shops.values())
         for i in range(20):
             shop = random.choice(shop_list)
@@ -297,37 +311,39 @@ class Command(BaseCommand):
                 note="",
                 created_by=manager,
             )
+            delivered_total = Decimal("0")
             for p in random.sample(product_list, random.randint(1, 3)):
                 qty = random.randint(5, 30)
                 delivered = qty if st == OrderStatus.DELIVERED else (
                     random.randint(0, qty) if st == OrderStatus.PARTIALLY_DELIVERED else 0
                 )
-                OrderItem.objects.create(
+                item = OrderItem.objects.create(
                     order=order,
                     product=p,
                     unit_price=p.default_price_uzs,
                     quantity=qty,
                     delivered_quantity=delivered,
                 )
-
-        # Recompute shop loan balances from orders + payments
-        from django.db.models import Sum, F
-        for shop in shop_list:
-            delivered_total = Decimal("0")
-            for o in Order.objects.filter(shop=shop, currency="UZS").prefetch_related("items"):
-                for it in o.items.all():
-                    delivered_total += it.delivered_price
-            shop.loan_balance_uzs = delivered_total
-            shop.save(update_fields=["loan_balance_uzs"])
+                delivered_total += item.delivered_price
+            ledger.post_entry(
+                shop, "UZS", delivered_total, ShopLedgerKind.DELIVERY,
+                reference=order, user=manager, occurred_at=ledger.order_moment(order_date),
+            )
 
     def _seed_payments(self, shops, accounts, users):
         driver = next((u for u in users.values() if u.role == Role.DRIVER), None)
         now = timezone.now()
-        for shop in list(shops.values())[:5]:
+        ids = [s.pk for s in list(shops.values())[:5]]
+        for shop in Shop.objects.select_for_update().filter(pk__in=ids).order_by("pk"):
             # Two payments: one today, one a few days ago
-            for days in [0, 3]:
-                amount = Decimal(random.randint(100_000, 800_000))
-                Payment.objects.create(
+            for days in [3, 0]:
+                received_at = now - timedelta(days=days)
+                # Never pay more than was owed at the time.
+                owed = ledger.balance_as_of(shop.pk, "UZS", received_at)
+                amount = min(Decimal(random.randint(100_000, 800_000)), owed)
+                if amount <= 0:
+                    continue
+                payment = Payment.objects.create(
                     shop=shop,
                     payment_type=PaymentType.COLLECTION,
                     currency="UZS",
@@ -335,12 +351,13 @@ class Command(BaseCommand):
                     discount=Decimal("0"),
                     account=accounts["seyf"],
                     collected_by=driver,
-                    received_at=now - timedelta(days=days),
+                    received_at=received_at,
                     note="Demo to'lov",
                 )
-                # Partial recompute of shop balance
-                shop.loan_balance_uzs = max(Decimal("0"), shop.loan_balance_uzs - amount)
-                shop.save(update_fields=["loan_balance_uzs"])
+                ledger.post_entry(
+                    shop, "UZS", -amount, ShopLedgerKind.PAYMENT,
+                    reference=payment, user=driver, occurred_at=payment.received_at,
+                )
 
     def _seed_salary_rates(self, users):
         """Per-role defaults: nonvoy = per_product, driver = per_week, manager = fixed_monthly."""
@@ -25,6 +25,7 @@ import psycopg2
 import psycopg2.extras
 from django.core.management.base import BaseCommand
 from django.db import transaction
+from django.db.models import F
 
 
 V1_DB = {
@@ -198,7 +199,7 @@ class Command(BaseCommand):
 
         # Get existing V2 production dates to avoid duplicates
         existing_v2_dates = set(
-            Production.objects.values_list("occurred_at__date", flat=True)
+            Production.objects.values_list("business_date", flat=True)
         )
 
         # Build product name → V2 product ID mapping
@@ -234,7 +235,7 @@ class Command(BaseCommand):
                 # (simple dedup by date + product + meshok)
                 if Production.objects.filter(
                     product_id=v2_prod_id,
-                    occurred_at__date=occurred_at.date(),
+                    business_date=occurred_at.date(),
                     meshok_count=row["meshok"],
                 ).exists():
                     skipped += 1
@@ -304,7 +305,7 @@ class Command(BaseCommand):
                 if SalaryPayment.objects.filter(
                     user=v2_user,
                     amount=row["amount"],
-                    occurred_at__date=occurred_at.date(),
+                    business_date=occurred_at.date(),
                 ).exists():
                     skipped += 1
                     continue
@@ -328,6 +329,7 @@ class Command(BaseCommand):
         self.stdout.write(f"  Salary payments: created={created}, skipped={skipped}")
 
     def _sync_recipes(self, cur):
+        from apps.inventory import stock
         from apps.inventory.models import Ingredient, ProductRecipe, Unit
         from apps.products.models import Product as V2Product
 
@@ -349,6 +351,7 @@ class Command(BaseCommand):
         v1_ingredients = cur.fetchall()
         v2_ingr_by_name = {i.name: i for i in Ingredient.objects.all()}
         ingr_id_map = {}  # v1 id → v2 Ingredient object
+        v1_quantities = {}  # v2 id → v1 quantity
         for row in v1_ingredients:
             ingr = v2_ingr_by_name.get(row["name"])
             unit = unit_id_map.get(row["unit_id"])
@@ -359,18 +362,20 @@ class Command(BaseCommand):
                 ingr = Ingredient.objects.create(
                     name=row["name"],
                     unit=unit,
-                    quantity=row["quantity"] or Decimal("0"),
                     low_stock_threshold=row["low_stock_threshold"] or Decimal("0"),
                 )
                 v2_ingr_by_name[row["name"]] = ingr
                 self.stdout.write(f"    Created ingredient: {row['name']}")
             else:
-                # Update quantity from v1
-                ingr.quantity = row["quantity"] or Decimal("0")
                 ingr.low_stock_threshold = row["low_stock_threshold"] or Decimal("0")
-                ingr.save(update_fields=["quantity", "low_stock_threshold"])
+                ingr.save(update_fields=["low_stock_threshold"])
+            v1_quantities[ingr.id] = row["quantity"] or Decimal("0")
             ingr_id_map[row["id"]] = ingr
 
+        # Update quantity from v1 — as revision movements in the stock ledger.
+        with transaction.atomic():
+            stock.set_to(v1_quantities, note="v1 sinxronlash")
+
         # Sync product recipes
         cur.execute("SELECT id, product_id, ingredient_id, amount_per_meshok FROM inventory_productrecipe")
         v1_recipes = cur.fetchall()
@@ -559,7 +564,8 @@ class Command(BaseCommand):
         self.stdout.write(f"  Loan repayments: created={created}, skipped={skipped}")
 
     def _sync_kassa_balance(self, cur):
-        from apps.finance.models import KassaAccount
+        from apps.finance.balances import live
+        from apps.finance.models import KassaAccount, KassaTransaction, KassaTransactionType
         from decimal import Decimal
 
         # Get V1's current balance
@@ -572,10 +578,24 @@ class Command(BaseCommand):
         v1_balance = Decimal(str(row["amount"]))
         self.stdout.write(f"  V1 balance: {v1_balance} UZS")
 
-        try:
-            rizoxon = KassaAccount.objects.get(name="Rizoxon")
-            rizoxon.balance_uzs = v1_balance
-            rizoxon.save(update_fields=["balance_uzs"])
-            self.stdout.write(f"  Updated Rizoxon balance to {v1_balance} UZS")
-        except KassaAccount.DoesNotExist:
-            self.stderr.write("  Rizoxon account not found")
+        # Post the difference as a ledger adjustment instead of overwriting the
+        # cached balance, so the kassa still equals the sum of its transactions.
+        with transaction.atomic():
+            try:
+                rizoxon = KassaAccount.objects.select_for_update().get(name="Rizoxon")
+            except KassaAccount.DoesNotExist:
+                self.stderr.write("  Rizoxon account not found")
+                return
+            diff = v1_balance - live(rizoxon)["UZS"]
+            if diff:
+                rizoxon.balance_uzs = F("balance_uzs") + diff
+                rizoxon.save(update_fields=["balance_uzs"])
+                KassaTransaction.objects.create(
+                    account=rizoxon,
+                    kind=KassaTransactionType.ADJUSTMENT,
+                    currency="UZS",
+                    amount=diff,
+                    note="V1 balans bilan tenglashtirish",
+                    occurred_at=datetime.now(py_tz.utc),
+                )
+        self.stdout.write(f"  Rizoxon balance set to {v1_balance} UZS (adjustment {diff})")
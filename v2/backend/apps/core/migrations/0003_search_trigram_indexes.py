@@ -0,0 +1,49 @@
+"""Trigram GIN indexes for search (apps.core.search) — PostgreSQL only.
+
+Indexes are on UPPER(col) so they serve both Django's `icontains`
+(UPPER(col::text) LIKE UPPER(...), used by DRF SearchFilter) and the
+`%>` word-similarity operator. Other backends skip this migration's SQL.
+"""
+from django.db import migrations
+
+INDEXES = [
+    ("shops_shop_name_trgm", "shops_shop", "name"),
+    ("shops_shop_owner_trgm", "shops_shop", "owner_name"),
+    ("shops_shop_phone_trgm", "shops_shop", "phone"),
+    ("orders_order_note_trgm", "orders_order", "note"),
+    ("products_product_name_trgm", "products_product", "name"),
+    ("inventory_ingredient_name_trgm", "inventory_ingredient", "name"),
+]
+
+
+def create_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    schema_editor.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    for name, table, column in INDEXES:
+        schema_editor.execute(
+            f'CREATE INDEX IF NOT EXISTS "{name}" ON "{table}" '
+            f'USING gin (UPPER("{column}"::text) gin_trgm_ops)'
+        )
+
+
+def drop_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    for name, _table, _column in INDEXES:
+        schema_editor.execute(f'DROP INDEX IF EXISTS "{name}"')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0002_synctombstone"),
+        ("shops", "0005_backfill_shop_ledger"),
+        ("orders", "0004_order_updated_at_index"),
+        ("products", "0005_product_updated_at_index"),
+        ("inventory", "0002_initial"),
+    ]
+
+    operations = [
+        migrations.RunPython(create_indexes, drop_indexes),
+    ]
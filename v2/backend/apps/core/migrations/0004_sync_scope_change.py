@@ -0,0 +1,25 @@
+# Generated by Django 5.1.15 on 2026-10-19 04:06
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0003_search_trigram_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SyncScopeChange',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('shop_id', models.BigIntegerField()),
+                ('driver_id', models.BigIntegerField()),
+                ('changed_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['driver_id', 'changed_at'], name='core_syncsc_driver__4b147b_idx')],
+            },
+        ),
+    ]
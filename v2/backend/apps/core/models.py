@@ -1,5 +1,7 @@
-"""Abstract base models shared across apps."""
+"""Base models shared across apps."""
+from django.conf import settings
 from django.db import models
+from django.utils import timezone
 
 
 class TimestampedModel(models.Model):
@@ -12,6 +14,62 @@ class TimestampedModel(models.Model):
         abstract = True
 
 
+def business_date_of(moment):
+    """Local (settings.TIME_ZONE, Asia/Tashkent) calendar day of a datetime."""
+    if moment is None:
+        return None
+    if timezone.is_naive(moment):
+        moment = timezone.make_aware(moment)
+    return timezone.localdate(moment)
+
+
+class BusinessDateModel(models.Model):
+    """Abstract base storing the local business day of a datetime field.
+
+    Reports filter and group by `business_date` — a plain indexed DATE —
+    instead of `occurred_at__date` / TruncDate(tzinfo=…), which convert every
+    row and cannot use the (…, -occurred_at) indexes. save() keeps it in step
+    with BUSINESS_DATE_FROM; bulk_create callers set it with business_date_of().
+    """
+
+    BUSINESS_DATE_FROM = "occurred_at"
+
+    business_date = models.DateField(null=True, blank=True, editable=False)
+
+    class Meta:
+        abstract = True
+
+    def save(self, *args, **kwargs):
+        self.business_date = business_date_of(getattr(self, self.BUSINESS_DATE_FROM))
+        update_fields = kwargs.get("update_fields")
+        if update_fields is not None and self.BUSINESS_DATE_FROM in update_fields:
+            kwargs["update_fields"] = {*update_fields, "business_date"}
+        super().save(*args, **kwargs)
+
+
+def backfill_business_date(model, source: str, schema_editor) -> None:
+    """Fill `business_date` from `source` for rows that have none (data migrations)."""
+    if schema_editor.connection.vendor == "postgresql":
+        table = schema_editor.quote_name(model._meta.db_table)
+        column = schema_editor.quote_name(model._meta.get_field(source).column)
+        with schema_editor.connection.cursor() as cursor:
+            cursor.execute(
+                f"UPDATE {table} SET business_date = ({column} AT TIME ZONE %s)::date "
+                f"WHERE business_date IS NULL AND {column} IS NOT NULL",
+                [settings.TIME_ZONE],
+            )
+        return
+    batch = []
+    for obj in model.objects.filter(business_date__isnull=True).only("pk", source).iterator(chunk_size=2000):
+        obj.business_date = business_date_of(getattr(obj, source))
+        batch.append(obj)
+        if len(batch) >= 2000:
+            model.objects.bulk_update(batch, ["business_date"])
+            batch = []
+    if batch:
+        model.objects.bulk_update(batch, ["business_date"])
+
+
 class ArchivableModel(models.Model):
     """Abstract base for soft-archive pattern.
 
@@ -25,14 +83,85 @@ class ArchivableModel(models.Model):
     class Meta:
         abstract = True
 
+    def _archive_fields(self) -> list[str]:
+        # Bump updated_at too (when the model has it) so the delta sync feed
+        # and version-keyed caches see archive/unarchive.
+        fields = ["is_archived", "archived_at"]
+        if any(f.name == "updated_at" for f in self._meta.concrete_fields):
+            fields.append("updated_at")
+        return fields
+
     def archive(self) -> None:
         from django.utils import timezone
 
         self.is_archived = True
         self.archived_at = timezone.now()
-        self.save(update_fields=["is_archived", "archived_at"])
+        self.save(update_fields=self._archive_fields())
 
     def unarchive(self) -> None:
         self.is_archived = False
         self.archived_at = None
-        self.save(update_fields=["is_archived", "archived_at"])
+        self.save(update_fields=self._archive_fields())
+
+
+class SyncTombstone(models.Model):
+    """Marker left behind when a row served by the delta sync feed is deleted.
+
+    Written by post_delete receivers in apps.core.sync; the feed returns the
+    ids deleted since the client's watermark so it can drop them locally.
+    """
+
+    model = models.CharField(max_length=50)
+    object_id = models.BigIntegerField()
+    deleted_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [models.Index(fields=["model", "deleted_at"])]
+
+    def __str__(self) -> str:
+        return f"{self.model}#{self.object_id}"
+
+
+class SyncScopeChange(models.Model):
+    """A shop moved onto or off a driver — one row per driver involved.
+
+    The driver-scoped delta feed (apps.core.sync) uses these to tell the old
+    driver's replica to drop the shop and to send the new driver the shop's
+    history, which did not change and so would not be in a delta.
+    """
+
+    shop_id = models.BigIntegerField()
+    driver_id = models.BigIntegerField()
+    changed_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [models.Index(fields=["driver_id", "changed_at"])]
+
+    def __str__(self) -> str:
+        return f"shop#{self.shop_id} · driver#{self.driver_id}"
+
+
+class IdempotencyKey(models.Model):
+    """First successful response of a money/stock-moving POST, per (user, key).
+
+    A retried request carrying the same `Idempotency-Key` header gets this
+    response back instead of running the transaction again. See
+    apps.core.idempotency; expired rows are removed by `purge_idempotency_keys`.
+    """
+
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name="+"
+    )
+    key = models.CharField(max_length=255)
+    request_hash = models.CharField(max_length=64)
+    status_code = models.PositiveSmallIntegerField(null=True, blank=True)
+    response_body = models.JSONField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["user", "key"], name="uniq_idempotency_user_key"),
+        ]
+
+    def __str__(self) -> str:
+        return f"{self.user_id}:{self.key}"
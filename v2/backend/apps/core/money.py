@@ -1,11 +1,13 @@
 """Money helpers. UZS + USD are tracked separately, NEVER summed together."""
 from dataclasses import dataclass
-from decimal import ROUND_HALF_UP, Decimal
+from decimal import ROUND_HALF_UP, Decimal, InvalidOperation
 
-from .constants import Currency
+from .constants import MONEY_DECIMAL_PLACES, MONEY_MAX_DIGITS, Currency
 
 ZERO = Decimal("0.00")
 _QUANT = Decimal("0.01")
+# Smallest amount a money column (MONEY_MAX_DIGITS, MONEY_DECIMAL_PLACES) can't hold.
+MONEY_LIMIT = Decimal(10) ** (MONEY_MAX_DIGITS - MONEY_DECIMAL_PLACES)
 
 
 def quantize_money(value: Decimal | int | float | str) -> Decimal:
@@ -15,6 +17,18 @@ def quantize_money(value: Decimal | int | float | str) -> Decimal:
     return value.quantize(_QUANT, rounding=ROUND_HALF_UP)
 
 
+def parse_money(value) -> Decimal:
+    """User input → quantized amount. Raises ValueError for anything a money
+    column can't store: not a number, NaN / Infinity, or too many digits."""
+    try:
+        amount = quantize_money(Decimal(str(value)))
+    except InvalidOperation:
+        raise ValueError(value)
+    if not amount.is_finite() or abs(amount) >= MONEY_LIMIT:
+        raise ValueError(value)
+    return amount
+
+
 @dataclass(frozen=True)
 class Money:
     """A pair of currency-separated amounts. Never summed across currencies."""
@@ -5,11 +5,93 @@ The default PageNumberPagination has no `page_size_query_param`, so a client's
 That truncated charts/lists that legitimately need more rows (e.g. the daily
 production chart, the kassa transactions list). This class honours `page_size`
 up to a sane ceiling.
+
+The append-only lists (orders, payments, kassa ledger, activity log) grow
+without bound, and page-number paging costs a full COUNT(*) plus an ever larger
+OFFSET on each of them. Those views use CursorOrPagePagination, which switches
+to keyset paging on the view's `cursor_ordering` when the client asks for it.
 """
-from rest_framework.pagination import PageNumberPagination
+import json
+
+from django.db import connections
+from rest_framework.pagination import CursorPagination, PageNumberPagination
 
 
 class StandardPagination(PageNumberPagination):
     page_size = 50
     page_size_query_param = "page_size"
     max_page_size = 2000
+
+
+def approximate_count(queryset) -> int:
+    """Planner row estimate for `queryset` — no table scan on PostgreSQL.
+
+    Falls back to an exact COUNT(*) on other backends (SQLite in tests).
+    """
+    connection = connections[queryset.db]
+    if connection.vendor != "postgresql":
+        return queryset.count()
+    sql, params = queryset.order_by().values("pk").query.sql_with_params()
+    with connection.cursor() as cursor:
+        cursor.execute("EXPLAIN (FORMAT JSON) " + sql, params)
+        plan = cursor.fetchone()[0]
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return int(plan[0]["Plan"]["Plan Rows"])
+
+
+class CursorOrPagePagination(CursorPagination):
+    """Keyset paging on request, page numbers otherwise.
+
+    Cursor mode is used when the request carries `?cursor=` or `?paging=cursor`;
+    a page is then an indexed range scan on the view's `cursor_ordering`, with
+    no COUNT. DRF builds the cursor from the first field only: rows tied on it
+    are stepped over by OFFSET, capped at `offset_cutoff` (1000). The first
+    field must therefore be near-unique (a timestamp, not a date), or a page
+    costs as much as its ties and paging can stall; `?ordering=` is ignored in
+    cursor mode for the same reason. `?count=approx` adds an
+    `approximate_count` from the planner. Requests without either keep the
+    StandardPagination shape, so existing clients are unaffected.
+    """
+
+    page_size = 50
+    page_size_query_param = "page_size"
+    max_page_size = 2000
+    ordering = "-created_at"
+    mode_query_param = "paging"
+
+    fallback = None
+    approx_count = None
+
+    def _wants_cursor(self, request) -> bool:
+        params = request.query_params
+        return self.cursor_query_param in params or params.get(self.mode_query_param) == "cursor"
+
+    def get_ordering(self, request, queryset, view):
+        # DRF would take the ordering from the view's OrderingFilter, so
+        # ?ordering=<non-unique field> would skip or repeat rows. A cursor only
+        # pages correctly on cursor_ordering, so ?ordering= is ignored here.
+        ordering = getattr(view, "cursor_ordering", self.ordering)
+        return (ordering,) if isinstance(ordering, str) else tuple(ordering)
+
+    def paginate_queryset(self, queryset, request, view=None):
+        if not self._wants_cursor(request):
+            self.fallback = StandardPagination()
+            return self.fallback.paginate_queryset(queryset, request, view)
+        self.fallback = None
+        if request.query_params.get("count") == "approx":
+            self.approx_count = approximate_count(queryset)
+        return super().paginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data):
+        if self.fallback is not None:
+            return self.fallback.get_paginated_response(data)
+        response = super().get_paginated_response(data)
+        if self.approx_count is not None:
+            response.data["approximate_count"] = self.approx_count
+        return response
+
+    def to_html(self):
+        if self.fallback is not None:
+            return self.fallback.to_html()
+        return super().to_html()
@@ -0,0 +1,201 @@
+"""Cached-balance reconciliation — recompute every cached balance from its source rows.
+
+Balances that are maintained incrementally, and what they must equal:
+
+- shops          Shop.loan_balance_*           = Σ ShopLedgerEntry.amount
+- kassa          KassaAccount.balance_*        = Σ KassaTransaction.amount (folded rows;
+                                                 see apps.finance.balances.fold)
+- ingredients    Ingredient.quantity           = Σ IngredientMovement.quantity
+                                                 (see apps.inventory.stock)
+- product_stock  BakeryProductStock.quantity   = Σ Production.unit_count
+                                                 − Σ net delivered (delivered − returned)
+                                                 + Σ revision corrections
+- product_cost   Product.cost_price_uzs        = Σ recipe × ingredient.avg_cost_uzs / meshok_size
+
+Each type is checked with one query: the owning table annotated with correlated
+aggregate subqueries. `repair()` locks the drifted rows, re-checks them under
+the lock and writes the expected values with one bulk_update per type, all in
+one transaction.
+
+Repair only touches the types (and, for one type, the ids) it is given and is
+a dry run unless asked to write: a cached value that drifted because rows are
+missing would otherwise be "fixed" to the wrong number. Review the report
+first.
+"""
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import (
+    Case,
+    DecimalField,
+    ExpressionWrapper,
+    F,
+    OuterRef,
+    Subquery,
+    Sum,
+    Value,
+    When,
+)
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from apps.core.constants import MONEY_DECIMAL_PLACES, QTY_DECIMAL_PLACES
+
+DEC = DecimalField(max_digits=30, decimal_places=6)
+
+
+def _sum(qs, match_field: str, expr, outer: str = "pk") -> Coalesce:
+    """Correlated SUM(expr) of `qs` rows whose `match_field` equals the outer row's `outer`."""
+    sub = (
+        qs.filter(**{match_field: OuterRef(outer)})
+        .order_by()
+        .values(match_field)
+        .annotate(s=Sum(expr, output_field=DEC))
+        .values("s")
+    )
+    return Coalesce(Subquery(sub, output_field=DEC), Value(Decimal("0")), output_field=DEC)
+
+
+def _shops():
+    from apps.shops.models import Shop, ShopLedgerEntry
+
+    qs = Shop.objects.annotate(
+        expected_loan_balance_uzs=_sum(ShopLedgerEntry.objects.filter(currency="UZS"), "shop", F("amount")),
+        expected_loan_balance_usd=_sum(ShopLedgerEntry.objects.filter(currency="USD"), "shop", F("amount")),
+    )
+    return Shop, qs, ["loan_balance_uzs", "loan_balance_usd"], MONEY_DECIMAL_PLACES
+
+
+def _kassa():
+    from apps.finance.models import KassaAccount, KassaTransaction
+
+    qs = KassaAccount.objects.annotate(
+        expected_balance_uzs=_sum(
+            KassaTransaction.objects.filter(currency="UZS", is_folded=True), "account", F("amount")
+        ),
+        expected_balance_usd=_sum(
+            KassaTransaction.objects.filter(currency="USD", is_folded=True), "account", F("amount")
+        ),
+    )
+    return KassaAccount, qs, ["balance_uzs", "balance_usd"], MONEY_DECIMAL_PLACES
+
+
+def _ingredients():
+    from apps.inventory.models import Ingredient, IngredientMovement
+
+    qs = Ingredient.objects.annotate(
+        expected_quantity=_sum(IngredientMovement.objects.all(), "ingredient", F("quantity"))
+    )
+    return Ingredient, qs, ["quantity"], QTY_DECIMAL_PLACES
+
+
+def _product_stock():
+    from apps.orders.models import OrderItem
+    from apps.production.models import BakeryProductStock, InventoryRevisionReport, Production
+
+    def per_product(model_qs, expr):
+        return _sum(model_qs, "product_id", expr, outer="product_id")
+
+    revisions = InventoryRevisionReport.objects.filter(
+        item_type=InventoryRevisionReport.ItemType.PRODUCT
+    )
+    qs = BakeryProductStock.objects.annotate(
+        expected_quantity=(
+            per_product(Production.objects.all(), F("unit_count"))
+            - per_product(OrderItem.objects.all(), F("delivered_quantity") - F("returned_quantity"))
+            + per_product(revisions, F("new_quantity") - F("old_quantity"))
+        )
+    )
+    return BakeryProductStock, qs, ["quantity"], QTY_DECIMAL_PLACES
+
+
+def _product_cost():
+    from apps.inventory.models import ProductRecipe
+    from apps.products.models import Product
+
+    material = _sum(
+        ProductRecipe.objects.all(), "product",
+        ExpressionWrapper(F("amount_per_meshok") * F("ingredient__avg_cost_uzs"), output_field=DEC),
+    )
+    qs = Product.objects.annotate(
+        expected_cost_price_uzs=Case(
+            When(meshok_size__gt=0, then=ExpressionWrapper(material / F("meshok_size"), output_field=DEC)),
+            default=Value(Decimal("0")),
+            output_field=DEC,
+        )
+    )
+    return Product, qs, ["cost_price_uzs"], MONEY_DECIMAL_PLACES
+
+
+CHECKS = {
+    "shops": _shops,
+    "kassa": _kassa,
+    "ingredients": _ingredients,
+    "product_stock": _product_stock,
+    "product_cost": _product_cost,
+}
+
+
+def _drift(kind: str, ids=None) -> list[dict]:
+    model, qs, fields, places = CHECKS[kind]()
+    if ids is not None:
+        qs = qs.filter(pk__in=ids)
+    quantum = Decimal(1).scaleb(-places)
+    rows = []
+    for obj in qs.order_by("pk"):
+        for field in fields:
+            cached = getattr(obj, field)
+            expected = Decimal(getattr(obj, f"expected_{field}")).quantize(quantum)
+            if cached != expected:
+                rows.append({
+                    "type": kind,
+                    "id": obj.pk,
+                    "name": str(obj),
+                    "field": field,
+                    "cached": cached,
+                    "expected": expected,
+                    "diff": cached - expected,
+                })
+    return rows
+
+
+def drift_report(kinds=None) -> dict[str, list[dict]]:
+    """{type: [drifted rows]} for the requested balance types (all by default)."""
+    return {kind: _drift(kind) for kind in (kinds or CHECKS)}
+
+
+def repair(kinds, ids=None, *, dry_run=True) -> dict[str, list[dict]]:
+    """Overwrite drifted cached values of `kinds` (restricted to `ids` when
+    given) with the recomputed ones; returns what changed, or with `dry_run`
+    what would change, without writing anything."""
+    if not kinds:
+        raise ValueError("repair needs explicit balance types")
+    if dry_run:
+        return {kind: _drift(kind, ids) for kind in kinds}
+    fixed = {}
+    with transaction.atomic():
+        for kind in kinds:
+            drifted = sorted({r["id"] for r in _drift(kind, ids)})
+            if not drifted:
+                fixed[kind] = []
+                continue
+            model = CHECKS[kind]()[0]
+            objs = {o.pk: o for o in model.objects.select_for_update().filter(pk__in=drifted).order_by("pk")}
+            rows = _drift(kind, drifted)  # re-check under the lock
+            fields = set()
+            for r in rows:
+                setattr(objs[r["id"]], r["field"], r["expected"])
+                fields.add(r["field"])
+            if kind == "product_cost":
+                now = timezone.now()
+                for o in objs.values():
+                    o.cost_price_updated_at = now
+                fields.add("cost_price_updated_at")
+            if any(f.name == "updated_at" for f in model._meta.concrete_fields):
+                now = timezone.now()
+                for o in objs.values():
+                    o.updated_at = now
+                fields.add("updated_at")
+            model.objects.bulk_update(list(objs.values()), sorted(fields))
+            fixed[kind] = rows
+    return fixed
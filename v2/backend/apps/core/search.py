@@ -0,0 +1,153 @@
+"""Typeahead search across shops, orders, products and ingredients.
+
+On PostgreSQL the searched columns carry trigram GIN indexes on UPPER(col)
+(core migration 0003). The same index serves DRF SearchFilter's `icontains`
+(`UPPER(col::text) LIKE UPPER('%q%')`) and the word-similarity operator used
+here for typo-tolerant matches (`UPPER(col) %> 'Q'`), so neither scans the
+table. Matches are ranked by word similarity, with a bonus for prefix hits.
+
+SQLite (tests, local smoke runs) has neither, so it falls back to plain
+`icontains` matching ranked by prefix hits.
+"""
+from django.db import connection
+from django.db.models import Case, F, FloatField, Q, Value, When
+from django.db.models.functions import Greatest, Upper
+
+DEFAULT_LIMIT = 10
+MAX_LIMIT = 50
+MIN_QUERY_LENGTH = 2
+
+TYPES = ("shops", "orders", "products", "ingredients")
+
+
+def _is_postgres() -> bool:
+    return connection.vendor == "postgresql"
+
+
+def _ranked(qs, fields: list[str], q: str):
+    """Filter `qs` to rows matching `q` in any of `fields` and annotate `score`."""
+    match = Q()
+    for f in fields:
+        match |= Q(**{f"{f}__icontains": q})
+    prefix = Case(
+        When(Q(**{f"{fields[0]}__istartswith": q}), then=Value(1.0)),
+        default=Value(0.0),
+        output_field=FloatField(),
+    )
+
+    if not _is_postgres():
+        return qs.filter(match).annotate(score=prefix)
+
+    from django.contrib.postgres.search import TrigramWordSimilarity
+
+    needle = q.upper()
+    for f in fields:
+        qs = qs.annotate(**{f"_u_{f}": Upper(f)})
+        match |= Q(**{f"_u_{f}__trigram_word_similar": needle})
+    sims = [TrigramWordSimilarity(needle, F(f"_u_{f}")) for f in fields]
+    similarity = sims[0] if len(sims) == 1 else Greatest(*sims)
+    return qs.filter(match).annotate(score=similarity + prefix)
+
+
+def search_shops(q: str, limit: int = DEFAULT_LIMIT) -> list[dict]:
+    from apps.shops.models import Shop
+
+    qs = _ranked(
+        Shop.objects.filter(is_archived=False), ["name", "owner_name", "phone"], q
+    )
+    return [
+        {
+            "id": s["id"],
+            "label": s["name"],
+            "detail": " · ".join(filter(None, [s["owner_name"], s["phone"], s["region__name"]])),
+            "score": round(s["score"], 3),
+        }
+        for s in qs.order_by("-score", "name").values(
+            "id", "name", "owner_name", "phone", "region__name", "score"
+        )[:limit]
+    ]
+
+
+def search_orders(q: str, shop_ids: list[int], limit: int = DEFAULT_LIMIT) -> list[dict]:
+    """Orders by id, by matched shop, or by note — newest first within each rank."""
+    from apps.orders.models import Order
+
+    match = Q(shop_id__in=shop_ids)
+    if len(q) >= MIN_QUERY_LENGTH:
+        match |= Q(note__icontains=q)
+    exact_id = Value(0.0)
+    if q.isdigit():
+        match |= Q(id=int(q))
+        exact_id = Case(When(id=int(q), then=Value(2.0)), default=Value(0.0), output_field=FloatField())
+    qs = (
+        Order.objects.filter(match)
+        .annotate(score=exact_id)
+        .order_by("-score", "-order_date", "-id")
+        .values("id", "order_date", "status", "currency", "shop__name", "score")[:limit]
+    )
+    return [
+        {
+            "id": o["id"],
+            "label": f"#{o['id']} · {o['shop__name']}",
+            "detail": f"{o['order_date'].isoformat()} · {o['status']}",
+            "score": o["score"],
+        }
+        for o in qs
+    ]
+
+
+def search_products(q: str, limit: int = DEFAULT_LIMIT) -> list[dict]:
+    from apps.products.models import Product
+
+    qs = _ranked(Product.objects.filter(is_archived=False), ["name"], q)
+    return [
+        {
+            "id": p["id"],
+            "label": p["name"],
+            "detail": str(p["default_price_uzs"]),
+            "score": round(p["score"], 3),
+        }
+        for p in qs.order_by("-score", "sort_order", "name").values(
+            "id", "name", "default_price_uzs", "score"
+        )[:limit]
+    ]
+
+
+def search_ingredients(q: str, limit: int = DEFAULT_LIMIT) -> list[dict]:
+    from apps.inventory.models import Ingredient
+
+    qs = _ranked(Ingredient.objects.filter(is_archived=False), ["name"], q)
+    return [
+        {
+            "id": i["id"],
+            "label": i["name"],
+            "detail": f"{i['quantity']} {i['unit__short']}",
+            "score": round(i["score"], 3),
+        }
+        for i in qs.order_by("-score", "name").values(
+            "id", "name", "quantity", "unit__short", "score"
+        )[:limit]
+    ]
+
+
+def search(q: str, types=TYPES, limit: int = DEFAULT_LIMIT) -> dict[str, list[dict]]:
+    """{type: ranked matches} for each requested type.
+
+    Queries shorter than MIN_QUERY_LENGTH only look up an order by id.
+    """
+    q = q.strip()
+    result = {t: [] for t in types}
+    if len(q) < MIN_QUERY_LENGTH:
+        if q.isdigit() and "orders" in types:
+            result["orders"] = search_orders(q, [], limit)
+        return result
+    shops = search_shops(q, limit) if ("shops" in types or "orders" in types) else []
+    if "shops" in types:
+        result["shops"] = shops
+    if "orders" in types:
+        result["orders"] = search_orders(q, [s["id"] for s in shops], limit)
+    if "products" in types:
+        result["products"] = search_products(q, limit)
+    if "ingredients" in types:
+        result["ingredients"] = search_ingredients(q, limit)
+    return result
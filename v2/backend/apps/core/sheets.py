@@ -0,0 +1,79 @@
+"""Spreadsheet import helpers shared by the bulk import endpoints.
+
+`read_rows` streams an .xlsx (openpyxl read-only mode) into plain dicts keyed
+by canonical column names; `lookup` resolves the id-or-name cells of a column
+against one table in a single query.
+"""
+
+
+class SheetError(ValueError):
+    """The file cannot be imported at all; message is user-facing."""
+
+
+def _clean_key(value) -> str:
+    key = str(value).strip()
+    if key.endswith(".0") and key[:-2].isdigit():  # numeric cells come back as floats
+        key = key[:-2]
+    return key
+
+
+def read_rows(file, columns: dict, required=(), max_rows: int = 20000) -> list[tuple[int, dict]]:
+    """[(sheet line number, {column: cell})] for the non-empty rows of the first sheet.
+
+    `columns` maps each canonical name to the accepted (lower-cased) header
+    aliases; unknown headers are ignored, missing optional columns are absent
+    from the row dicts.
+    """
+    from openpyxl import load_workbook
+
+    try:
+        wb = load_workbook(file, read_only=True, data_only=True)
+    except Exception as exc:  # openpyxl raises several unrelated types
+        raise SheetError(f"Excel faylni o'qib bo'lmadi: {exc}")
+    try:
+        rows = wb.active.iter_rows(values_only=True)
+        header = next(rows, None)
+        if not header:
+            raise SheetError("Fayl bo'sh")
+        names = [str(h or "").strip().lower() for h in header]
+        idx = {}
+        for col, aliases in columns.items():
+            for i, name in enumerate(names):
+                if name in aliases:
+                    idx[col] = i
+                    break
+        missing = [c for c in required if c not in idx]
+        if missing:
+            raise SheetError(f"Ustun topilmadi: {', '.join(missing)}")
+
+        out = []
+        for line, row in enumerate(rows, start=2):
+            cells = {col: (row[i] if i < len(row) else None) for col, i in idx.items()}
+            if all(v in (None, "") for v in cells.values()):
+                continue
+            if len(out) >= max_rows:
+                raise SheetError(f"Ko'pi bilan {max_rows} qator")
+            out.append((line, cells))
+        return out
+    finally:
+        wb.close()
+
+
+def lookup(queryset, values, fields=("name",)) -> dict:
+    """Map each raw cell (pk, or an exact case-insensitive match on one of
+    `fields`) to a pk, reading `queryset` once. Unresolved cells are absent."""
+    by_id, by_text = {}, {}
+    for row in queryset.values_list("pk", *fields):
+        by_id[str(row[0])] = row[0]
+        for text in row[1:]:
+            if text:
+                by_text.setdefault(str(text).strip().lower(), row[0])
+    out = {}
+    for v in values:
+        if v in (None, ""):
+            continue
+        key = _clean_key(v)
+        pk = by_id.get(key) or by_text.get(key.lower())
+        if pk is not None:
+            out[v] = pk
+    return out
@@ -0,0 +1,203 @@
+"""Delta sync feed for offline-capable clients (driver app).
+
+`changes_since(since)` returns the orders, order items, shops, shop prices,
+products and payments created or updated after the watermark (`updated_at`),
+plus the ids deleted since then (SyncTombstone rows written by the post_delete
+receivers below).
+
+Order items have no timestamp of their own: every item change saves its order,
+so the feed sends the complete item set of each changed order and the client
+replaces that order's items locally.
+
+A driver-scoped feed also follows shops moving between drivers
+(SyncScopeChange rows, written when Shop.assigned_driver changes): a shop that
+left the driver is listed in `left_scope`, and the client drops it with its
+orders, items, prices and payments; a shop that joined is sent with the same
+history a full snapshot carries. Scope is by driver only, so a region change
+moves nothing.
+
+The returned watermark is the server time at the start of the read minus
+OVERLAP, so rows committed by transactions that were in flight during the read
+are picked up next time. Clients upsert by id, so the overlap only costs a few
+duplicate rows.
+"""
+from datetime import timedelta
+
+from django.db.models import Q
+from django.db.models.signals import post_delete, post_init, post_save
+from django.utils import timezone
+
+from .models import SyncScopeChange, SyncTombstone
+
+OVERLAP = timedelta(seconds=30)
+# Tombstones older than this are purged; a client whose watermark is older
+# gets a full snapshot instead of a delta.
+TOMBSTONE_TTL = timedelta(days=30)
+# A full snapshot carries orders / payments from this many days back only.
+SNAPSHOT_DAYS = 30
+
+ORDER_FIELDS = (
+    "id", "shop", "order_date", "delivery_time", "priority", "status",
+    "currency", "note", "updated_at",
+)
+ITEM_FIELDS = (
+    "id", "order", "product", "unit_price", "quantity",
+    "delivered_quantity", "returned_quantity",
+)
+SHOP_FIELDS = (
+    "id", "name", "owner_name", "phone", "address", "region", "assigned_driver",
+    "loan_balance_uzs", "loan_balance_usd", "loan_limit_uzs", "loan_limit_usd",
+    "is_archived", "updated_at",
+)
+PRICE_FIELDS = ("id", "shop", "product", "currency", "price", "updated_at")
+PRODUCT_FIELDS = (
+    "id", "name", "default_price_uzs", "default_price_usd", "sort_order",
+    "is_archived", "updated_at",
+)
+PAYMENT_FIELDS = (
+    "id", "shop", "order", "order_date", "payment_type", "currency", "amount",
+    "discount", "account", "collected_by", "received_at", "note", "updated_at",
+)
+
+# feed key → model label; deletions of these models leave a tombstone.
+TRACKED = {
+    "orders": "orders.Order",
+    "shops": "shops.Shop",
+    "prices": "shops.ShopProductPrice",
+    "products": "products.Product",
+    "payments": "finance.Payment",
+}
+
+
+def _record_deletion(sender, instance, **kwargs):
+    SyncTombstone.objects.create(model=sender._meta.label, object_id=instance.pk)
+
+
+_UNKNOWN = object()
+
+
+def record_scope_change(shop_ids, *driver_ids) -> None:
+    """Note that `shop_ids` moved onto / off each of `driver_ids` (None skipped).
+    Callers that reassign shops with QuerySet.update() call this themselves."""
+    SyncScopeChange.objects.bulk_create([
+        SyncScopeChange(shop_id=shop_id, driver_id=driver_id)
+        for shop_id in shop_ids for driver_id in driver_ids if driver_id is not None
+    ])
+
+
+def _remember_driver(sender, instance, **kwargs):
+    # Read from __dict__ so a deferred field is not fetched just for this.
+    instance._sync_driver_id = instance.__dict__.get("assigned_driver_id", _UNKNOWN)
+
+
+def _record_reassignment(sender, instance, created, update_fields=None, **kwargs):
+    old = getattr(instance, "_sync_driver_id", _UNKNOWN)
+    new = instance.assigned_driver_id
+    instance._sync_driver_id = new
+    if created or old is _UNKNOWN or old == new:
+        return
+    if update_fields is not None and "assigned_driver" not in update_fields:
+        return
+    record_scope_change([instance.pk], old, new)
+
+
+
+def connect_signals() -> None:
+    for label in TRACKED.values():
+        post_delete.connect(_record_deletion, sender=label, dispatch_uid=f"sync-tombstone:{label}")
+    post_init.connect(_remember_driver, sender="shops.Shop", dispatch_uid="sync-scope:init")
+    post_save.connect(_record_reassignment, sender="shops.Shop", dispatch_uid="sync-scope:save")
+
+
+def _scope_moves(since, driver_id) -> tuple[list, list]:
+    """(entered, left) shop ids of `driver_id` since the watermark."""
+    from apps.shops.models import Shop
+
+    touched = set(
+        SyncScopeChange.objects.filter(driver_id=driver_id, changed_at__gt=since)
+        .values_list("shop_id", flat=True)
+    )
+    if not touched:
+        return [], []
+    entered = set(Shop.objects.filter(id__in=touched, assigned_driver_id=driver_id).values_list("id", flat=True))
+    return sorted(entered), sorted(touched - entered)
+
+
+def changes_since(since=None, driver_id=None) -> dict:
+    """Everything a client needs to bring its replica from `since` to now.
+
+    `since=None` (or a watermark older than TOMBSTONE_TTL) yields a full
+    snapshot and `"full": true`. `driver_id` limits shops, orders, prices and
+    payments to the shops assigned to that driver.
+    """
+    from apps.finance.models import Payment
+    from apps.orders.models import Order, OrderItem
+    from apps.products.models import Product
+    from apps.shops.models import Shop, ShopProductPrice
+
+    started = timezone.now()
+    full = since is None or since < started - TOMBSTONE_TTL
+
+    shops = Shop.objects.all()
+    orders = Order.objects.all()
+    prices = ShopProductPrice.objects.all()
+    payments = Payment.objects.all()
+    products = Product.objects.all()
+    if driver_id is not None:
+        shops = shops.filter(assigned_driver_id=driver_id)
+        orders = orders.filter(shop__assigned_driver_id=driver_id)
+        prices = prices.filter(shop__assigned_driver_id=driver_id)
+        payments = payments.filter(shop__assigned_driver_id=driver_id)
+
+    cutoff = timezone.localdate() - timedelta(days=SNAPSHOT_DAYS)
+    left = []
+    if full:
+        orders = orders.filter(order_date__gte=cutoff)
+        payments = payments.filter(business_date__gte=cutoff)
+    else:
+        changed = Q(updated_at__gt=since)
+        entered = []
+        if driver_id is not None:
+            entered, left = _scope_moves(since, driver_id)
+        joined = Q(shop_id__in=entered)
+        shops = shops.filter(changed | Q(id__in=entered))
+        orders = orders.filter(changed | (joined & Q(order_date__gte=cutoff)))
+        prices = prices.filter(changed | joined)
+        payments = payments.filter(changed | (joined & Q(business_date__gte=cutoff)))
+        products = products.filter(changed)
+
+    order_rows = list(orders.order_by("id").values(*ORDER_FIELDS))
+    order_ids = [o["id"] for o in order_rows]
+    item_rows = list(
+        OrderItem.objects.filter(order_id__in=order_ids).order_by("id").values(*ITEM_FIELDS)
+    )
+
+    deleted = {key: [] for key in TRACKED}
+    if not full:
+        labels = {label: key for key, label in TRACKED.items()}
+        for model, object_id in SyncTombstone.objects.filter(
+            deleted_at__gt=since
+        ).values_list("model", "object_id"):
+            deleted[labels[model]].append(object_id)
+
+    return {
+        "watermark": (started - OVERLAP).isoformat(),
+        "full": full,
+        "orders": order_rows,
+        "order_items": item_rows,
+        "shops": list(shops.order_by("id").values(*SHOP_FIELDS)),
+        "prices": list(prices.order_by("id").values(*PRICE_FIELDS)),
+        "products": list(products.order_by("id").values(*PRODUCT_FIELDS)),
+        "payments": list(payments.order_by("id").values(*PAYMENT_FIELDS)),
+        "deleted": deleted,
+        "left_scope": left,
+    }
+
+
+def purge_tombstones() -> int:
+    """Delete tombstones (and scope changes) older than TOMBSTONE_TTL; returns
+    the number of tombstones removed."""
+    horizon = timezone.now() - TOMBSTONE_TTL
+    deleted, _ = SyncTombstone.objects.filter(deleted_at__lt=horizon).delete()
+    SyncScopeChange.objects.filter(changed_at__lt=horizon).delete()
+    return deleted
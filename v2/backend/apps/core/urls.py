@@ -1,6 +1,13 @@
 from django.urls import path
 
-from .views import DashboardSummaryView, NetIncomeHistoryView, NotificationsView
+from .views import (
+    DashboardSummaryView,
+    NetIncomeHistoryView,
+    NotificationsView,
+    ReconcileView,
+    SearchView,
+    SyncView,
+)
 
 app_name = "core"
 
@@ -8,4 +15,7 @@ urlpatterns = [
     path("dashboard/summary/", DashboardSummaryView.as_view(), name="dashboard-summary"),
     path("dashboard/net-income-history/", NetIncomeHistoryView.as_view(), name="net-income-history"),
     path("notifications/", NotificationsView.as_view(), name="notifications"),
+    path("sync/", SyncView.as_view(), name="sync"),
+    path("reconcile/", ReconcileView.as_view(), name="reconcile"),
+    path("search/", SearchView.as_view(), name="search"),
 ]
@@ -1,5 +1,5 @@
 """Core views — dashboard summary + misc cross-app endpoints."""
-from datetime import date, datetime, time, timedelta
+from datetime import date, timedelta
 
 from django.db.models import Sum, F, Q
 from django.utils import timezone
@@ -8,11 +8,14 @@ from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 from rest_framework.views import APIView
 
+from apps.core.permissions import IsManagerOrAdmin
+from apps.finance.balances import with_live_balances
 from apps.finance.models import (
     GeneralExpense,
     KassaAccount,
     Payment,
 )
+from apps.inventory import forecast
 from apps.inventory.models import Ingredient, Purchase as IngredientPurchase
 from apps.orders.models import Order, OrderPriority, OrderStatus
 from apps.production.models import Production
@@ -20,17 +23,6 @@ from apps.salary.models import SalaryPayment
 from apps.shops.models import Shop
 
 
-def _day_bounds(d):
-    """Return (start_of_day, end_of_day) for date `d` in the server timezone."""
-    start = timezone.make_aware(datetime.combine(d, time.min))
-    end = timezone.make_aware(datetime.combine(d, time.max))
-    return start, end
-
-
-def _month_start(d):
-    return timezone.make_aware(datetime.combine(d.replace(day=1), time.min))
-
-
 class DashboardSummaryView(APIView):
     """
     Aggregated today/month figures for the home dashboard.
@@ -50,24 +42,19 @@ class DashboardSummaryView(APIView):
                 sel_date = timezone.localdate()
         is_today = sel_date == timezone.localdate()
 
-        today_start, today_end = _day_bounds(sel_date)
-        month_start = _month_start(sel_date)
-
         # ── Kassa balances (Seyf + Rizoxon) ─────────────────────────
         accounts = [
             {
                 "slug": a.slug,
                 "name": a.name,
-                "balance_uzs": str(a.balance_uzs),
-                "balance_usd": str(a.balance_usd),
+                "balance_uzs": str(a.live_balance_uzs),
+                "balance_usd": str(a.live_balance_usd),
             }
-            for a in KassaAccount.objects.all()
+            for a in with_live_balances(KassaAccount.objects.all())
         ]
 
         # ── Today's kirim (payments received today) ─────────────────
-        today_payments = Payment.objects.filter(
-            received_at__range=(today_start, today_end)
-        )
+        today_payments = Payment.objects.filter(business_date=sel_date)
         kirim_today_uzs = today_payments.filter(currency="UZS").aggregate(
             s=Sum("amount")
         )["s"] or 0
@@ -94,15 +81,15 @@ class DashboardSummaryView(APIView):
 
         # ── Today's and month's production (feature #13) ────────────
         prod_today = Production.objects.filter(
-            occurred_at__range=(today_start, today_end)
+            business_date=sel_date
         ).aggregate(meshok=Sum("meshok_count"), units=Sum("unit_count"))
         prod_month = Production.objects.filter(
-            occurred_at__gte=month_start
+            business_date__gte=sel_date.replace(day=1)
         ).aggregate(meshok=Sum("meshok_count"), units=Sum("unit_count"))
 
         # Per-product breakdown today
         prod_by_product = list(
-            Production.objects.filter(occurred_at__range=(today_start, today_end))
+            Production.objects.filter(business_date=sel_date)
             .values("product__id", "product__name")
             .annotate(meshok=Sum("meshok_count"), units=Sum("unit_count"))
             .order_by("-meshok")
@@ -181,19 +168,13 @@ class DashboardSummaryView(APIView):
             usd = qs.filter(currency="USD").aggregate(s=Sum(field))["s"] or 0
             return uzs, usd
 
-        purchases_today = IngredientPurchase.objects.filter(
-            occurred_at__range=(today_start, today_end)
-        )
+        purchases_today = IngredientPurchase.objects.filter(business_date=sel_date)
         purchase_uzs, purchase_usd = _sum_today(purchases_today, "total_price")
 
-        expenses_today = GeneralExpense.objects.filter(
-            occurred_at__range=(today_start, today_end)
-        )
+        expenses_today = GeneralExpense.objects.filter(business_date=sel_date)
         expense_uzs, expense_usd = _sum_today(expenses_today)
 
-        salary_today = SalaryPayment.objects.filter(
-            occurred_at__range=(today_start, today_end)
-        ).exclude(kind="deduction")
+        salary_today = SalaryPayment.objects.filter(business_date=sel_date).exclude(kind="deduction")
         salary_uzs, salary_usd = _sum_today(salary_today)
 
         net_uzs = (kirim_today_uzs or 0) - (purchase_uzs + expense_uzs + salary_uzs)
@@ -277,62 +258,35 @@ class NetIncomeHistoryView(APIView):
             dt_from = today - timedelta(days=29)
             dt_to = today
 
-        results = []
-        current = dt_from
-        while current <= dt_to:
-            start = timezone.make_aware(datetime.combine(current, time.min))
-            end = timezone.make_aware(datetime.combine(current, time.max))
-
-            revenue_uzs = (
-                Payment.objects.filter(received_at__range=(start, end), currency="UZS")
-                .aggregate(s=Sum("amount"))["s"] or 0
-            )
-            revenue_usd = (
-                Payment.objects.filter(received_at__range=(start, end), currency="USD")
-                .aggregate(s=Sum("amount"))["s"] or 0
+        def by_day(qs, field="amount"):
+            """{(business_date, currency): Σ field} over the range — one grouped query."""
+            rows = (
+                qs.filter(business_date__gte=dt_from, business_date__lte=dt_to)
+                .values("business_date", "currency")
+                .annotate(s=Sum(field))
+                .order_by()
             )
+            return {(r["business_date"], r["currency"]): r["s"] or 0 for r in rows}
 
-            purchase_uzs = (
-                IngredientPurchase.objects.filter(occurred_at__range=(start, end), currency="UZS")
-                .aggregate(s=Sum("total_price"))["s"] or 0
-            )
-            purchase_usd = (
-                IngredientPurchase.objects.filter(occurred_at__range=(start, end), currency="USD")
-                .aggregate(s=Sum("total_price"))["s"] or 0
-            )
+        revenue = by_day(Payment.objects.all())
+        purchases = by_day(IngredientPurchase.objects.all(), "total_price")
+        expenses = by_day(GeneralExpense.objects.all())
+        salaries = by_day(SalaryPayment.objects.exclude(kind="deduction"))
 
-            expense_uzs = (
-                GeneralExpense.objects.filter(occurred_at__range=(start, end), currency="UZS")
-                .aggregate(s=Sum("amount"))["s"] or 0
-            )
-            expense_usd = (
-                GeneralExpense.objects.filter(occurred_at__range=(start, end), currency="USD")
-                .aggregate(s=Sum("amount"))["s"] or 0
-            )
-
-            salary_uzs = (
-                SalaryPayment.objects.filter(occurred_at__range=(start, end), currency="UZS")
-                .exclude(kind="deduction")
-                .aggregate(s=Sum("amount"))["s"] or 0
-            )
-            salary_usd = (
-                SalaryPayment.objects.filter(occurred_at__range=(start, end), currency="USD")
-                .exclude(kind="deduction")
-                .aggregate(s=Sum("amount"))["s"] or 0
-            )
-
-            expenses_uzs = purchase_uzs + expense_uzs + salary_uzs
-            expenses_usd = purchase_usd + expense_usd + salary_usd
-
-            results.append({
-                "date": current.isoformat(),
-                "revenue_uzs": str(revenue_uzs),
-                "expenses_uzs": str(expenses_uzs),
-                "net_uzs": str(revenue_uzs - expenses_uzs),
-                "revenue_usd": str(revenue_usd),
-                "expenses_usd": str(expenses_usd),
-                "net_usd": str(revenue_usd - expenses_usd),
-            })
+        results = []
+        current = dt_from
+        while current <= dt_to:
+            row = {"date": current.isoformat()}
+            for cur in ("uzs", "usd"):
+                key = (current, cur.upper())
+                rev = revenue.get(key, 0)
+                spent = purchases.get(key, 0) + expenses.get(key, 0) + salaries.get(key, 0)
+                row.update({
+                    f"revenue_{cur}": str(rev),
+                    f"expenses_{cur}": str(spent),
+                    f"net_{cur}": str(rev - spent),
+                })
+            results.append(row)
             current += timedelta(days=1)
 
         return Response({"results": results, "count": len(results)})
@@ -340,7 +294,8 @@ class NetIncomeHistoryView(APIView):
 
 class NotificationsView(APIView):
     """
-    Feature #10: real-time notifications (loan-limit exceeded + low stock).
+    Feature #10: real-time notifications (loan-limit exceeded + low stock,
+    plus ingredients forecast to run out — apps.inventory.forecast).
 
     Computed on-the-fly from current state — no stored notification model.
     Frontend polls this to update the bell badge.
@@ -367,6 +322,23 @@ class NotificationsView(APIView):
             }
             for i in low_stock
         ]
+        # Ingredients the consumption forecast says will run out within the
+        # supplier lead time, before they reach the fixed threshold.
+        low_ids = {i["id"] for i in low_stock_items}
+        running_out_items = [
+            {
+                "id": r["ingredient_id"],
+                "kind": "running_out",
+                "ingredient_id": r["ingredient_id"],
+                "name": r["name"],
+                "quantity": r["quantity"],
+                "days_of_cover": r["days_of_cover"],
+                "suggested_quantity": r["suggested_quantity"],
+                "unit": r["unit"],
+            }
+            for r in forecast.plan()
+            if r["needs_reorder"] and r["days_of_cover"] is not None and r["ingredient_id"] not in low_ids
+        ]
 
         over_limit_qs = (
             Shop.objects
@@ -397,8 +369,141 @@ class NotificationsView(APIView):
 
         return Response(
             {
-                "count": len(low_stock_items) + len(over_limit_items),
+                "count": len(low_stock_items) + len(running_out_items) + len(over_limit_items),
                 "low_stock": low_stock_items,
+                "running_out": running_out_items,
                 "loan_limit": over_limit_items,
             }
         )
+
+
+class SyncView(APIView):
+    """
+    GET /sync/?since=<watermark>[&driver=<id>] — delta feed for offline clients.
+
+    Returns rows changed after `since` plus ids deleted since then, and a new
+    `watermark` to send next time. Without `since` a full snapshot is returned.
+    Drivers are limited to their own shops; others may pass `driver` to do the
+    same. A driver feed lists shops moved off the driver in `left_scope`.
+    See apps.core.sync.
+    """
+
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        from django.utils.dateparse import parse_datetime
+
+        from .sync import changes_since
+
+        since = None
+        if raw := request.query_params.get("since"):
+            since = parse_datetime(raw)
+            if since is None:
+                return Response(
+                    {"detail": "since must be an ISO datetime (the last watermark)."},
+                    status=status.HTTP_400_BAD_REQUEST,
+                )
+            if timezone.is_naive(since):
+                since = timezone.make_aware(since)
+
+        driver_id = request.query_params.get("driver") or None
+        if driver_id is not None:
+            try:
+                driver_id = int(driver_id)
+            except ValueError:
+                return Response(
+                    {"detail": "driver must be a user id."},
+                    status=status.HTTP_400_BAD_REQUEST,
+                )
+        if getattr(request.user, "role", None) == "driver":
+            driver_id = request.user.id
+        return Response(changes_since(since, driver_id=driver_id))
+
+
+class ReconcileView(APIView):
+    """
+    GET  /reconcile/?only=shops,kassa — drift between cached balances and their
+         source rows (apps.core.reconcile).
+    POST /reconcile/ {"only": [...], "ids": [...], "apply": true} — overwrite the
+         drifted values of the listed types (ids: rows of a single type) in one
+         transaction; without "apply": true only reports what would change.
+    """
+
+    permission_classes = [IsManagerOrAdmin]
+
+    @staticmethod
+    def _kinds(raw):
+        from .reconcile import CHECKS
+
+        if isinstance(raw, str):
+            raw = [k for k in raw.split(",") if k]
+        kinds = list(raw or CHECKS)
+        unknown = [k for k in kinds if k not in CHECKS]
+        return kinds, unknown
+
+    @staticmethod
+    def _serialize(result):
+        return {
+            kind: [
+                {**r, "cached": str(r["cached"]), "expected": str(r["expected"]), "diff": str(r["diff"])}
+                for r in rows
+            ]
+            for kind, rows in result.items()
+        }
+
+    def get(self, request):
+        from .reconcile import drift_report
+
+        kinds, unknown = self._kinds(request.query_params.get("only"))
+        if unknown:
+            return Response({"detail": f"Unknown balance types: {', '.join(unknown)}"}, status=400)
+        result = drift_report(kinds)
+        return Response({
+            "drift": self._serialize(result),
+            "count": sum(len(rows) for rows in result.values()),
+        })
+
+    def post(self, request):
+        from .reconcile import repair
+
+        if not request.data.get("only"):
+            return Response({"detail": "only: list the balance types to repair."}, status=400)
+        kinds, unknown = self._kinds(request.data.get("only"))
+        if unknown:
+            return Response({"detail": f"Unknown balance types: {', '.join(unknown)}"}, status=400)
+        ids = request.data.get("ids")
+        if ids is not None:
+            if len(kinds) != 1:
+                return Response({"detail": "ids needs exactly one balance type in only."}, status=400)
+            if not isinstance(ids, list) or not all(isinstance(i, int) and not isinstance(i, bool) for i in ids):
+                return Response({"detail": "ids must be a list of integers."}, status=400)
+        apply = request.data.get("apply") is True
+        result = repair(kinds, ids, dry_run=not apply)
+        return Response({
+            "repaired" if apply else "would_repair": self._serialize(result),
+            "dry_run": not apply,
+            "count": sum(len(rows) for rows in result.values()),
+        })
+
+
+class SearchView(APIView):
+    """
+    GET /search/?q=<text>[&types=shops,orders][&limit=10] — typeahead across
+    shops, orders, products and ingredients, ranked per type (apps.core.search).
+    """
+
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        from .search import DEFAULT_LIMIT, MAX_LIMIT, TYPES, search
+
+        q = request.query_params.get("q", "")
+        types = [t for t in request.query_params.get("types", "").split(",") if t] or list(TYPES)
+        unknown = [t for t in types if t not in TYPES]
+        if unknown:
+            return Response({"detail": f"Unknown types: {', '.join(unknown)}"}, status=400)
+        try:
+            limit = min(int(request.query_params.get("limit", DEFAULT_LIMIT)), MAX_LIMIT)
+        except ValueError:
+            return Response({"detail": "limit must be an integer."}, status=400)
+        return Response({"q": q, **search(q, types, max(limit, 1))})
@@ -5,6 +5,7 @@ from .models import (
     ExpenseCategory,
     GeneralExpense,
     KassaAccount,
+    KassaBalanceCheckpoint,
     KassaTransaction,
     Payment,
 )
@@ -24,6 +25,16 @@ class KassaAccountAdmin(admin.ModelAdmin):
     list_display = ["name", "slug", "balance_uzs", "balance_usd"]
     fields = ["name", "slug", "description", "balance_uzs", "balance_usd"]
     search_fields = ["name", "slug"]
+    # Balances follow the KassaTransaction ledger (apps.finance.balances).
+    readonly_fields = ["balance_uzs", "balance_usd"]
+
+
+@admin.register(KassaBalanceCheckpoint)
+class KassaBalanceCheckpointAdmin(admin.ModelAdmin):
+    list_display = ["account", "day", "balance_uzs", "balance_usd", "created_at"]
+    list_filter = ["account"]
+    ordering = ["-day", "account"]
+    readonly_fields = ["account", "day", "balance_uzs", "balance_usd"]
 
 
 @admin.register(KassaTransaction)
@@ -5,3 +5,8 @@ class FinanceConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "apps.finance"
     label = "finance"
+
+    def ready(self):
+        from .balances import connect_signals
+
+        connect_signals()
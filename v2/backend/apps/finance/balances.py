@@ -0,0 +1,273 @@
+"""Kassa balances derived from the KassaTransaction ledger.
+
+A kassa's balance is the sum of its ledger rows. KassaAccount.balance_* caches
+that sum for the current moment; KassaBalanceCheckpoint rows store it at the
+end of each day, so the balance at any moment is
+
+    last checkpoint before the moment + Σ rows since that checkpoint
+
+— one index lookup and one short range sum instead of a scan of the whole
+history.
+
+Checkpoints are only valid while the history behind them is unchanged. The
+post_save / post_delete receivers below drop every checkpoint from the
+affected day onwards; call `invalidate_rows()` around queryset `.update()`s
+on the ledger, which do not send signals.
+
+Deferred balances (settings.KASSA_DEFERRED_BALANCES): every posting would
+otherwise lock and update one of the two kassa rows, so all cash writes queue
+behind each other. In deferred mode the posting engine only appends ledger
+rows with is_folded=False; `fold()` later adds them to the cached balance in
+one short transaction (after each commit when KASSA_FOLD_ON_COMMIT, and
+periodically via the fold_kassa_balances task / command). The live balance is
+cached + Σ unfolded rows — read it with `with_live_balances()` / `live()`.
+"""
+from datetime import timedelta
+from decimal import Decimal
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Case, DecimalField, F, Min, OuterRef, Q, Subquery, Sum, Value, When
+from django.db.models.functions import Coalesce
+from django.db.models.signals import post_delete, post_save
+from django.utils import timezone
+
+from apps.core.constants import MONEY_DECIMAL_PLACES, MONEY_MAX_DIGITS
+
+from .models import KassaAccount, KassaBalanceCheckpoint, KassaTransaction
+
+ZERO = Decimal("0")
+FOLD_BATCH = 5000
+_MONEY = DecimalField(max_digits=MONEY_MAX_DIGITS, decimal_places=MONEY_DECIMAL_PLACES)
+
+
+def _sums(qs) -> dict[str, Decimal]:
+    agg = qs.aggregate(
+        uzs=Sum("amount", filter=Q(currency="UZS")),
+        usd=Sum("amount", filter=Q(currency="USD")),
+    )
+    return {"UZS": agg["uzs"] or ZERO, "USD": agg["usd"] or ZERO}
+
+
+def balance_as_of(account_id: int, at=None) -> dict[str, Decimal]:
+    """{"UZS": …, "USD": …} of the kassa right after everything up to `at`.
+
+    `at=None` means the whole ledger, i.e. what the cached balance should be.
+    """
+    checkpoints = KassaBalanceCheckpoint.objects.filter(account_id=account_id)
+    if at is not None:
+        checkpoints = checkpoints.filter(day__lt=timezone.localdate(at))
+    cp = checkpoints.order_by("-day").first()
+
+    rows = KassaTransaction.objects.filter(account_id=account_id)
+    base = {"UZS": ZERO, "USD": ZERO}
+    if cp is not None:
+        rows = rows.filter(business_date__gt=cp.day)
+        base = {"UZS": cp.balance_uzs, "USD": cp.balance_usd}
+    if at is not None:
+        rows = rows.filter(occurred_at__lte=at)
+    delta = _sums(rows)
+    return {cur: base[cur] + delta[cur] for cur in base}
+
+
+def _daily_totals(account_id: int, after=None, until=None) -> dict:
+    """{day: {"UZS": Σ, "USD": Σ}} of an account's ledger rows per local day."""
+    rows = KassaTransaction.objects.filter(account_id=account_id)
+    if after is not None:
+        rows = rows.filter(business_date__gt=after)
+    if until is not None:
+        rows = rows.filter(business_date__lte=until)
+    days: dict = {}
+    for r in rows.values("business_date", "currency").annotate(s=Sum("amount")).order_by():
+        days.setdefault(r["business_date"], {"UZS": ZERO, "USD": ZERO})[r["currency"]] += r["s"]
+    return days
+
+
+def build_checkpoints(until=None) -> int:
+    """Write the missing daily checkpoints of every kassa up to `until` (default
+    yesterday). Continues from each account's last checkpoint; returns the
+    number of rows created."""
+    until = until or timezone.localdate() - timedelta(days=1)
+    created = 0
+    for account in KassaAccount.objects.all():
+        with transaction.atomic():
+            last = (
+                KassaBalanceCheckpoint.objects.select_for_update()
+                .filter(account=account).order_by("-day").first()
+            )
+            if last is not None:
+                if last.day >= until:
+                    continue
+                start = last.day + timedelta(days=1)
+                running = {"UZS": last.balance_uzs, "USD": last.balance_usd}
+            else:
+                first = KassaTransaction.objects.filter(account=account).aggregate(m=Min("occurred_at"))["m"]
+                if first is None:
+                    continue
+                start = timezone.localdate(first)
+                running = {"UZS": ZERO, "USD": ZERO}
+
+            totals = _daily_totals(account.id, after=last.day if last else None, until=until)
+            rows = []
+            day = start
+            while day <= until:
+                for cur, amount in totals.get(day, {}).items():
+                    running[cur] += amount
+                rows.append(KassaBalanceCheckpoint(
+                    account=account, day=day,
+                    balance_uzs=running["UZS"], balance_usd=running["USD"],
+                ))
+                day += timedelta(days=1)
+            KassaBalanceCheckpoint.objects.bulk_create(rows, batch_size=1000)
+            created += len(rows)
+    return created
+
+
+def verify() -> list[dict]:
+    """Mismatches between the cached balances, the checkpoints and the ledger.
+
+    Every checkpoint is compared with the running ledger sum at its day, and
+    every live balance (cached + unfolded) with `balance_as_of(account)`.
+    """
+    problems = []
+    for account in KassaAccount.objects.all():
+        checkpoints = list(KassaBalanceCheckpoint.objects.filter(account=account).order_by("day"))
+        if checkpoints:
+            totals = _daily_totals(account.id, until=checkpoints[-1].day)
+            running = {"UZS": ZERO, "USD": ZERO}
+            days = iter(sorted(totals))
+            pending = next(days, None)
+            for cp in checkpoints:
+                while pending is not None and pending <= cp.day:
+                    for cur, amount in totals[pending].items():
+                        running[cur] += amount
+                    pending = next(days, None)
+                for cur, stored in (("UZS", cp.balance_uzs), ("USD", cp.balance_usd)):
+                    if stored != running[cur]:
+                        problems.append({
+                            "account": account.slug, "what": f"checkpoint {cp.day}",
+                            "currency": cur, "stored": stored, "ledger": running[cur],
+                        })
+
+        derived = balance_as_of(account.id)
+        current = live(account)
+        for cur, cached in current.items():
+            if cached != derived[cur]:
+                problems.append({
+                    "account": account.slug, "what": "cached balance",
+                    "currency": cur, "stored": cached, "ledger": derived[cur],
+                })
+    return problems
+
+
+# ─────────────────── Cached / deferred balances ───────────────────
+def deferred() -> bool:
+    return getattr(settings, "KASSA_DEFERRED_BALANCES", False)
+
+
+def add_to_cached(deltas: dict) -> None:
+    """deltas: {(account_id, currency): amount} → one UPDATE on KassaAccount."""
+    deltas = {k: v for k, v in deltas.items() if v}
+    if not deltas:
+        return
+
+    def column(currency):
+        whens = [
+            When(pk=acc, then=Value(amount, output_field=_MONEY))
+            for (acc, cur), amount in deltas.items() if cur == currency
+        ]
+        field = "balance_uzs" if currency == "UZS" else "balance_usd"
+        if not whens:
+            return F(field)
+        return F(field) + Case(*whens, default=Value(ZERO, output_field=_MONEY), output_field=_MONEY)
+
+    KassaAccount.objects.filter(pk__in={acc for acc, _ in deltas}).update(
+        balance_uzs=column("UZS"),
+        balance_usd=column("USD"),
+        updated_at=timezone.now(),
+    )
+
+
+def _unfolded(currency: str):
+    sub = (
+        KassaTransaction.objects.filter(account=OuterRef("pk"), currency=currency, is_folded=False)
+        .order_by()
+        .values("account")
+        .annotate(s=Sum("amount"))
+        .values("s")
+    )
+    return Coalesce(Subquery(sub, output_field=_MONEY), Value(ZERO, output_field=_MONEY), output_field=_MONEY)
+
+
+def with_live_balances(qs):
+    """Annotate live_balance_uzs / live_balance_usd (cached + unfolded rows)."""
+    return qs.annotate(
+        live_balance_uzs=F("balance_uzs") + _unfolded("UZS"),
+        live_balance_usd=F("balance_usd") + _unfolded("USD"),
+    )
+
+
+def live(account) -> dict[str, Decimal]:
+    """{"UZS": …, "USD": …} live balance of one (already loaded) account."""
+    tail = _sums(KassaTransaction.objects.filter(account_id=account.pk, is_folded=False))
+    return {"UZS": account.balance_uzs + tail["UZS"], "USD": account.balance_usd + tail["USD"]}
+
+
+def fold(account_ids=None) -> int:
+    """Add unfolded ledger rows to the cached balances; returns rows folded.
+
+    Rows are taken with FOR UPDATE SKIP LOCKED, so concurrent folds split the
+    work and never wait on each other or on a posting that is deleting its
+    rows; whatever is skipped is picked up by the next fold.
+    """
+    folded = 0
+    while True:
+        with transaction.atomic():
+            rows = KassaTransaction.objects.filter(is_folded=False)
+            if account_ids is not None:
+                rows = rows.filter(account_id__in=account_ids)
+            picked = list(
+                rows.select_for_update(skip_locked=True)
+                .order_by("pk").values_list("pk", "account_id", "currency", "amount")[:FOLD_BATCH]
+            )
+            if not picked:
+                return folded
+            deltas: dict = {}
+            for _, account_id, currency, amount in picked:
+                deltas[(account_id, currency)] = deltas.get((account_id, currency), ZERO) + amount
+            KassaTransaction.objects.filter(pk__in=[p[0] for p in picked]).update(is_folded=True)
+            add_to_cached(deltas)
+        folded += len(picked)
+        if len(picked) < FOLD_BATCH:
+            return folded
+
+
+def schedule_fold(account_ids) -> None:
+    """Fold the accounts' new rows once the current transaction commits."""
+    if getattr(settings, "KASSA_FOLD_ON_COMMIT", True):
+        ids = sorted(set(account_ids))
+        transaction.on_commit(lambda: fold(ids))
+
+
+# ─────────────────── Invalidation ───────────────────
+def invalidate(account_id: int, at) -> None:
+    """Drop the account's checkpoints that include moment `at`."""
+    KassaBalanceCheckpoint.objects.filter(
+        account_id=account_id, day__gte=timezone.localdate(at)
+    ).delete()
+
+
+def invalidate_rows(qs) -> None:
+    """Drop checkpoints covering any row of a KassaTransaction queryset."""
+    for r in qs.order_by().values("account_id").annotate(first=Min("occurred_at")):
+        invalidate(r["account_id"], r["first"])
+
+
+def _on_change(sender, instance, **kwargs):
+    if instance.occurred_at is not None:
+        invalidate(instance.account_id, instance.occurred_at)
+
+
+def connect_signals() -> None:
+    post_save.connect(_on_change, sender=KassaTransaction, dispatch_uid="kassa_checkpoint_save")
+    post_delete.connect(_on_change, sender=KassaTransaction, dispatch_uid="kassa_checkpoint_delete")
@@ -0,0 +1,124 @@
+"""Driver × day cash reconciliation matrix (feature #25, multi-day).
+
+For every active driver and every day of the range: cash collected, cash
+handed over and the day's pending amount per currency, plus the running
+unhandled balance — what the driver still held at the end of that day.
+
+Two grouped queries cover the whole range: Payment by (collector,
+business_date, currency) and CashHandover by (driver, local day, currency).
+Rows before the range are folded into the day before `date_from` (GREATEST of
+the day and that date), which gives each driver's opening balance from the
+same two queries.
+"""
+from datetime import date, datetime, time, timedelta
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.db.models import DateField, F, Sum, Value
+from django.db.models.functions import Greatest, TruncDate
+from django.utils import timezone
+
+from .models import CashHandover, Payment
+
+ZERO = Decimal("0")
+MAX_DAYS = 93
+CURRENCIES = ("UZS", "USD")
+
+
+def _daily(qs, driver_field: str, day, opening_day) -> dict:
+    """{(driver_id, day, currency): Σ amount}; pre-range rows land on opening_day."""
+    day = Greatest(day, Value(opening_day, output_field=DateField()), output_field=DateField())
+    rows = (
+        qs.annotate(day=day)
+        .values(driver_field, "day", "currency")
+        .annotate(total=Sum("amount"))
+    )
+    out = {}
+    for r in rows:
+        d = r["day"]
+        if isinstance(d, str):  # SQLite returns GREATEST() of dates as text
+            d = date.fromisoformat(d[:10])
+        out[(r[driver_field], d, r["currency"])] = r["total"] or ZERO
+    return out
+
+
+def driver_matrix(date_from, date_to) -> dict:
+    """Per-driver rows with one cell per day of [date_from, date_to]."""
+    drivers = list(
+        get_user_model().objects.filter(role="driver", is_archived=False).order_by("username")
+    )
+    ids = [d.id for d in drivers]
+    opening_day = date_from - timedelta(days=1)
+    end = timezone.make_aware(datetime.combine(date_to + timedelta(days=1), time.min))
+    collected = _daily(
+        Payment.objects.filter(collected_by_id__in=ids, business_date__lte=date_to),
+        "collected_by_id", F("business_date"), opening_day,
+    )
+    handed = _daily(
+        CashHandover.objects.filter(driver_id__in=ids, occurred_at__lt=end),
+        "driver_id", TruncDate("occurred_at", tzinfo=timezone.get_current_timezone()), opening_day,
+    )
+
+    days = [date_from + timedelta(days=i) for i in range((date_to - date_from).days + 1)]
+    totals = {f"{k}_{c.lower()}": ZERO for k in ("collected", "handed") for c in CURRENCIES}
+    results = []
+    for d in drivers:
+        running = {
+            c: collected.get((d.id, opening_day, c), ZERO) - handed.get((d.id, opening_day, c), ZERO)
+            for c in CURRENCIES
+        }
+        row = {
+            "driver_id": d.id,
+            "driver_name": d.display_name,
+            "username": d.username,
+            **{f"opening_{c.lower()}": str(running[c]) for c in CURRENCIES},
+            "days": [],
+        }
+        for day in days:
+            cell = {"date": day.isoformat()}
+            for c in CURRENCIES:
+                got = collected.get((d.id, day, c), ZERO)
+                gave = handed.get((d.id, day, c), ZERO)
+                running[c] += got - gave
+                totals[f"collected_{c.lower()}"] += got
+                totals[f"handed_{c.lower()}"] += gave
+                cell.update({
+                    f"collected_{c.lower()}": str(got),
+                    f"handed_{c.lower()}": str(gave),
+                    f"pending_{c.lower()}": str(got - gave),
+                    f"unhandled_{c.lower()}": str(running[c]),
+                })
+            row["days"].append(cell)
+        row.update({f"closing_{c.lower()}": str(running[c]) for c in CURRENCIES})
+        results.append(row)
+
+    return {
+        "date_from": date_from.isoformat(),
+        "date_to": date_to.isoformat(),
+        "days": [day.isoformat() for day in days],
+        "results": results,
+        "count": len(results),
+        "totals": {k: str(v) for k, v in totals.items()},
+    }
+
+
+def matrix_sheets(matrix: dict) -> list[tuple[str, list[str], list[list]]]:
+    """Flatten the matrix into (title, headers, rows) sheets for the xlsx export."""
+    rows = []
+    for r in matrix["results"]:
+        for cell in r["days"]:
+            rows.append([
+                r["driver_name"],
+                cell["date"],
+                *(
+                    float(cell[f"{k}_{c}"])
+                    for c in ("uzs", "usd")
+                    for k in ("collected", "handed", "pending", "unhandled")
+                ),
+            ])
+    headers = ["Haydovchi", "Sana"] + [
+        f"{label} {c}"
+        for c in CURRENCIES
+        for label in ("Yig'ilgan", "Topshirilgan", "Kun qoldig'i", "Jami qoldiq")
+    ]
+    return [("Haydovchi kassa", headers, rows)]
@@ -0,0 +1,33 @@
+"""
+Fold pending kassa ledger rows into the cached balances (see apps.finance.balances).
+
+Usage:
+    python manage.py fold_kassa_balances            # once
+    python manage.py fold_kassa_balances --every 5  # loop, every 5 seconds
+
+Needed in deferred-balance mode (KASSA_DEFERRED_BALANCES) when folds after
+commit are off or have been skipped; run it once before switching the mode
+off so every row is folded.
+"""
+import time
+
+from django.core.management.base import BaseCommand
+
+from apps.finance.balances import fold
+
+
+class Command(BaseCommand):
+    help = "Fold unfolded KassaTransaction rows into KassaAccount balances."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--every", type=float, help="Repeat every N seconds until interrupted.")
+
+    def handle(self, *args, **options):
+        every = options["every"]
+        while True:
+            folded = fold()
+            if folded or not every:
+                self.stdout.write(self.style.SUCCESS(f"Folded {folded} rows."))
+            if not every:
+                return
+            time.sleep(every)
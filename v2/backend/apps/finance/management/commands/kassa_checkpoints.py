@@ -0,0 +1,32 @@
+"""
+Write daily kassa balance checkpoints (see apps.finance.balances).
+
+Usage:
+    python manage.py kassa_checkpoints                   # up to yesterday
+    python manage.py kassa_checkpoints --until 2026-01-31
+
+Run daily after midnight (cron). Continues from each account's last
+checkpoint, so it is cheap to run repeatedly.
+"""
+from datetime import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.finance.balances import build_checkpoints
+
+
+class Command(BaseCommand):
+    help = "Write missing daily KassaBalanceCheckpoint rows."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--until", help="Last day to checkpoint (YYYY-MM-DD), default yesterday.")
+
+    def handle(self, *args, **options):
+        until = None
+        if options["until"]:
+            try:
+                until = datetime.strptime(options["until"], "%Y-%m-%d").date()
+            except ValueError:
+                raise CommandError("--until must be YYYY-MM-DD")
+        created = build_checkpoints(until)
+        self.stdout.write(self.style.SUCCESS(f"Created {created} checkpoints."))
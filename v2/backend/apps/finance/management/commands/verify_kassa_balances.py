@@ -0,0 +1,29 @@
+"""
+Check kassa balances against the KassaTransaction ledger.
+
+Usage:
+    python manage.py verify_kassa_balances
+
+Flags every checkpoint whose stored balance differs from the ledger sum at
+its day, and every cached KassaAccount balance that differs from the last
+checkpoint plus the transactions since. Exits non-zero on any mismatch; use
+`reconcile_balances --only kassa --repair` to fix cached balances.
+"""
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.finance.balances import verify
+
+
+class Command(BaseCommand):
+    help = "Flag kassa checkpoints and cached balances that disagree with the ledger."
+
+    def handle(self, *args, **options):
+        problems = verify()
+        for p in problems:
+            self.stdout.write(
+                f"  [{p['account']}] {p['what']} · {p['currency']}: "
+                f"stored {p['stored']} / ledger {p['ledger']} (diff {p['stored'] - p['ledger']})"
+            )
+        if problems:
+            raise CommandError(f"{len(problems)} kassa balance mismatches.")
+        self.stdout.write(self.style.SUCCESS("Kassa balances match the ledger."))
@@ -0,0 +1,21 @@
+# Generated by Django 5.1.15 on 2026-10-19 02:56
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('finance', '0005_expensecategory_include_in_pnl'),
+        ('orders', '0004_order_updated_at_index'),
+        ('shops', '0003_updated_at_indexes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='payment',
+            index=models.Index(fields=['updated_at'], name='finance_pay_updated_fe7461_idx'),
+        ),
+    ]
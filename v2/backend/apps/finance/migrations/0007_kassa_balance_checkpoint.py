@@ -0,0 +1,29 @@
+# Generated by Django 5.1.15 on 2026-10-19 03:07
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('finance', '0006_payment_updated_at_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='KassaBalanceCheckpoint',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('balance_uzs', models.DecimalField(decimal_places=2, max_digits=16)),
+                ('balance_usd', models.DecimalField(decimal_places=2, max_digits=16)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('account', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='checkpoints', to='finance.kassaaccount')),
+            ],
+            options={
+                'ordering': ['account', '-day'],
+                'constraints': [models.UniqueConstraint(fields=('account', 'day'), name='kassa_checkpoint_account_day')],
+            },
+        ),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 5.1.15 on 2026-10-19 03:16
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('finance', '0007_kassa_balance_checkpoint'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='kassatransaction',
+            name='is_folded',
+            field=models.BooleanField(default=True),
+        ),
+        migrations.AddIndex(
+            model_name='kassatransaction',
+            index=models.Index(condition=models.Q(('is_folded', False)), fields=['account'], name='kassa_tx_unfolded_idx'),
+        ),
+    ]
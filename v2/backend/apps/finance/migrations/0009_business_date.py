@@ -0,0 +1,70 @@
+# Generated by Django 5.1.15 on 2026-10-19 03:19
+
+from django.conf import settings
+from django.db import migrations, models
+
+from apps.core.models import backfill_business_date
+
+SOURCES = [
+    ("GeneralExpense", "occurred_at"),
+    ("KassaTransaction", "occurred_at"),
+    ("Payment", "received_at"),
+]
+
+
+def backfill(apps, schema_editor):
+    for model_name, source in SOURCES:
+        backfill_business_date(apps.get_model("finance", model_name), source, schema_editor)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('finance', '0008_kassa_transaction_is_folded'),
+        ('orders', '0004_order_updated_at_index'),
+        ('shops', '0006_shop_price_batches'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='generalexpense',
+            name='business_date',
+            field=models.DateField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='kassatransaction',
+            name='business_date',
+            field=models.DateField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='payment',
+            name='business_date',
+            field=models.DateField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='generalexpense',
+            index=models.Index(fields=['business_date', 'currency'], name='finance_gen_busines_86eb60_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='kassatransaction',
+            index=models.Index(fields=['account', 'business_date'], name='finance_kas_account_32df08_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='kassatransaction',
+            index=models.Index(fields=['business_date', 'kind'], name='finance_kas_busines_f112b6_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='payment',
+            index=models.Index(fields=['business_date', 'currency'], name='finance_pay_busines_1ff2b7_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='payment',
+            index=models.Index(fields=['collected_by', 'business_date'], name='finance_pay_collect_f8e8da_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='payment',
+            index=models.Index(fields=['shop', 'business_date'], name='finance_pay_shop_id_3bb987_idx'),
+        ),
+        migrations.RunPython(backfill, migrations.RunPython.noop),
+    ]
@@ -21,7 +21,7 @@ from apps.core.constants import (
     MONEY_MAX_DIGITS,
     Currency,
 )
-from apps.core.models import ArchivableModel, TimestampedModel
+from apps.core.models import ArchivableModel, BusinessDateModel, TimestampedModel
 
 
 # ────────────────── Kassa (cash accounts) ──────────────────
@@ -64,7 +64,7 @@ class KassaTransactionType(models.TextChoices):
     EXCHANGE = "exchange", "Valyuta ayirboshlash"
 
 
-class KassaTransaction(TimestampedModel):
+class KassaTransaction(BusinessDateModel, TimestampedModel):
     """Append-only ledger of every money movement into/out of a kassa.
 
     Positive amounts = money in. Negative = money out.
@@ -95,6 +95,9 @@ class KassaTransaction(TimestampedModel):
         blank=True,
         related_name="kassa_transactions",
     )
+    # False while the row is not yet included in KassaAccount.balance_* —
+    # only in deferred-balance mode (see apps.finance.balances.fold).
+    is_folded = models.BooleanField(default=True)
 
     class Meta:
         ordering = ["-occurred_at", "-id"]
@@ -102,6 +105,12 @@ class KassaTransaction(TimestampedModel):
             models.Index(fields=["account", "-occurred_at"]),
             models.Index(fields=["kind", "-occurred_at"]),
             models.Index(fields=["reference_model", "reference_id"]),
+            models.Index(
+                fields=["account"], condition=models.Q(is_folded=False),
+                name="kassa_tx_unfolded_idx",
+            ),
+            models.Index(fields=["account", "business_date"]),
+            models.Index(fields=["business_date", "kind"]),
         ]
 
     def __str__(self) -> str:
@@ -109,6 +118,37 @@ class KassaTransaction(TimestampedModel):
         return f"[{self.account.slug}] {sign}{abs(self.amount)} {self.currency} · {self.get_kind_display()}"
 
 
+class KassaBalanceCheckpoint(models.Model):
+    """Ledger balance of one kassa at the end of a (local) day.
+
+    Written daily by `manage.py kassa_checkpoints`. The balance at any moment
+    is the last checkpoint before it plus the KassaTransaction rows since
+    (apps.finance.balances). Checkpoints from a day onwards are dropped when a
+    transaction dated on or before that day is created, edited or deleted.
+    """
+
+    account = models.ForeignKey(
+        KassaAccount, on_delete=models.CASCADE, related_name="checkpoints"
+    )
+    day = models.DateField()
+    balance_uzs = models.DecimalField(
+        max_digits=MONEY_MAX_DIGITS, decimal_places=MONEY_DECIMAL_PLACES
+    )
+    balance_usd = models.DecimalField(
+        max_digits=MONEY_MAX_DIGITS, decimal_places=MONEY_DECIMAL_PLACES
+    )
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ["account", "-day"]
+        constraints = [
+            models.UniqueConstraint(fields=["account", "day"], name="kassa_checkpoint_account_day"),
+        ]
+
+    def __str__(self) -> str:
+        return f"[{self.account.slug}] {self.day}: {self.balance_uzs} UZS / {self.balance_usd} USD"
+
+
 # ────────────────── Payments (Kirim) ──────────────────
 class PaymentType(models.TextChoices):
     COLLECTION = "collection", "Kirim (delivery payment)"
@@ -116,7 +156,7 @@ class PaymentType(models.TextChoices):
     OTHER = "other", "Boshqa"
 
 
-class Payment(TimestampedModel):
+class Payment(BusinessDateModel, TimestampedModel):
     """
     Cash received from a shop.
 
@@ -169,12 +209,18 @@ class Payment(TimestampedModel):
     received_at = models.DateTimeField(db_index=True)
     note = models.TextField(blank=True)
 
+    BUSINESS_DATE_FROM = "received_at"
+
     class Meta:
         ordering = ["-received_at"]
         indexes = [
             models.Index(fields=["shop", "-received_at"]),
             models.Index(fields=["collected_by", "-received_at"]),
             models.Index(fields=["payment_type", "-received_at"]),
+            models.Index(fields=["updated_at"]),  # delta sync feed
+            models.Index(fields=["business_date", "currency"]),
+            models.Index(fields=["collected_by", "business_date"]),
+            models.Index(fields=["shop", "business_date"]),
         ]
 
     def closes_loan_by(self):
@@ -207,7 +253,7 @@ class ExpenseCategory(TimestampedModel, ArchivableModel):
         return self.name
 
 
-class GeneralExpense(TimestampedModel):
+class GeneralExpense(BusinessDateModel, TimestampedModel):
     """Non-inventory expense (utilities, fuel, packaging, etc.)."""
 
     category = models.ForeignKey(
@@ -237,6 +283,9 @@ class GeneralExpense(TimestampedModel):
 
     class Meta:
         ordering = ["-occurred_at"]
+        indexes = [
+            models.Index(fields=["business_date", "currency"]),
+        ]
 
     def __str__(self) -> str:
         return f"{self.title} · {self.amount} {self.currency}"
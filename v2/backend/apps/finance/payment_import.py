@@ -0,0 +1,198 @@
+"""Bulk payment (kirim) import from a driver's collection sheet.
+
+Rows come from an .xlsx (first row = header, see _COLUMNS) or a JSON list of
+objects with the same keys. Shops, kassas and collectors are resolved with
+one query each; every row is validated before anything is written, so an
+import either goes in completely or not at all. `build` returns unsaved
+Payment instances — the view saves them with one bulk_create and posts them
+through posting.post_batch, which moves each shop and kassa once.
+"""
+from datetime import date, datetime, time
+from decimal import ROUND_HALF_UP, Decimal, InvalidOperation
+
+from django.contrib.auth import get_user_model
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+
+from apps.core.models import business_date_of
+from apps.core.sheets import SheetError, lookup, read_rows
+from apps.shops.models import Shop
+
+from .models import KassaAccount, Payment, PaymentType
+
+MAX_IMPORT_ROWS = 5000
+ZERO = Decimal("0")
+
+# Accepted header names (lower-cased) for each spreadsheet column.
+_COLUMNS = {
+    "shop": ("shop", "shop_id", "do'kon", "dokon"),
+    "amount": ("amount", "summa"),
+    "discount": ("discount", "skidka", "chegirma"),
+    "currency": ("currency", "valyuta"),
+    "account": ("account", "kassa"),
+    "payment_type": ("payment_type", "turi"),
+    "collected_by": ("collected_by", "haydovchi", "driver"),
+    "received_at": ("received_at", "vaqt", "sana"),
+    "order_date": ("order_date", "buyurtma sanasi"),
+    "note": ("note", "izoh"),
+}
+
+
+class PaymentImportError(ValueError):
+    """The import cannot be read at all; message is user-facing."""
+
+
+def _money(value) -> Decimal:
+    return Decimal(str(value)).quantize(Decimal("0.01"), rounding=ROUND_HALF_UP)
+
+
+def _moment(value):
+    """Cell → aware datetime; a bare date is taken as noon of that day."""
+    if isinstance(value, datetime):
+        return value if timezone.is_aware(value) else timezone.make_aware(value)
+    if isinstance(value, date):
+        return timezone.make_aware(datetime.combine(value, time(12)))
+    text = str(value).strip()
+    if (dt := parse_datetime(text)) is not None:
+        return dt if timezone.is_aware(dt) else timezone.make_aware(dt)
+    if (d := parse_date(text)) is not None:
+        return timezone.make_aware(datetime.combine(d, time(12)))
+    raise ValueError(text)
+
+
+def _day(value):
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    if (d := parse_date(str(value).strip())) is not None:
+        return d
+    raise ValueError(value)
+
+
+def read_sheet(file) -> list[tuple[int, dict]]:
+    try:
+        return read_rows(file, _COLUMNS, required=("shop", "amount"), max_rows=MAX_IMPORT_ROWS)
+    except SheetError as exc:
+        raise PaymentImportError(str(exc))
+
+
+def read_json(items) -> list[tuple[int, dict]]:
+    if not isinstance(items, list) or not items:
+        raise PaymentImportError("payments ro'yxati bo'sh bo'lmasligi kerak")
+    if len(items) > MAX_IMPORT_ROWS:
+        raise PaymentImportError(f"Ko'pi bilan {MAX_IMPORT_ROWS} qator")
+    if not all(isinstance(item, dict) for item in items):
+        raise PaymentImportError("payments elementlari obyekt bo'lishi kerak")
+    return [(i, {k: item.get(k) for k in _COLUMNS if k in item}) for i, item in enumerate(items, start=1)]
+
+
+def build(rows, *, defaults: dict) -> tuple[list[Payment], list[dict]]:
+    """Validate rows → (unsaved payments, errors).
+
+    `defaults` fills cells left empty: account, currency, collected_by,
+    received_at, payment_type. Shops may be given by id or exact name,
+    kassas by id, slug or name, collectors by id or username.
+    """
+    def cell(cells, key):
+        value = cells.get(key)
+        return defaults.get(key) if value in (None, "") else value
+
+    shop_ids = lookup(Shop.objects.all(), {c.get("shop") for _, c in rows})
+    shops = Shop.objects.in_bulk(set(shop_ids.values()))
+    accounts = lookup(
+        KassaAccount.objects.all(), {cell(c, "account") for _, c in rows}, fields=("slug", "name")
+    )
+    users = lookup(
+        get_user_model().objects.filter(is_active=True),
+        {cell(c, "collected_by") for _, c in rows},
+        fields=("username",),
+    )
+    now = timezone.now()
+
+    payments, errors = [], []
+    for line, cells in rows:
+        def fail(detail):
+            errors.append({"row": line, "detail": detail})
+
+        shop = shops.get(shop_ids.get(cells.get("shop")))
+        if shop is None:
+            fail(f"Do'kon topilmadi: {cells.get('shop')}")
+            continue
+        if shop.is_archived:
+            fail(f"Do'kon arxivlangan: {shop.name}")
+            continue
+        account_id = accounts.get(cell(cells, "account"))
+        if account_id is None:
+            fail(f"Kassa topilmadi: {cell(cells, 'account')}")
+            continue
+        currency = str(cell(cells, "currency") or "UZS").strip().upper()
+        if currency not in ("UZS", "USD"):
+            fail(f"Valyuta noto'g'ri: {currency}")
+            continue
+        try:
+            amount = _money(cells.get("amount"))
+            discount = _money(cells.get("discount") or 0)
+        except (InvalidOperation, TypeError, ValueError):
+            fail(f"Summa noto'g'ri: {cells.get('amount')} / {cells.get('discount')}")
+            continue
+        if amount <= 0 or discount < 0:
+            fail("Summa musbat, chegirma manfiy bo'lmasligi kerak")
+            continue
+        payment_type = str(cell(cells, "payment_type") or PaymentType.COLLECTION).strip()
+        if payment_type not in PaymentType.values:
+            fail(f"To'lov turi noto'g'ri: {payment_type}")
+            continue
+        collector = cell(cells, "collected_by")
+        collected_by_id = users.get(collector)
+        if collector not in (None, "") and collected_by_id is None:
+            fail(f"Foydalanuvchi topilmadi: {collector}")
+            continue
+        try:
+            raw_at = cell(cells, "received_at")
+            received_at = _moment(raw_at) if raw_at not in (None, "") else now
+            order_date = _day(cells["order_date"]) if cells.get("order_date") not in (None, "") else None
+        except ValueError:
+            fail(f"Sana noto'g'ri: {cells.get('received_at')} / {cells.get('order_date')}")
+            continue
+        payments.append(Payment(
+            shop=shop,
+            order_date=order_date,
+            payment_type=payment_type,
+            currency=currency,
+            amount=amount,
+            discount=discount,
+            account_id=account_id,
+            collected_by_id=collected_by_id,
+            received_at=received_at,
+            business_date=business_date_of(received_at),
+            note=str(cells.get("note") or ""),
+        ))
+    return payments, errors
+
+
+def summary(payments: list[Payment]) -> dict:
+    """Preview totals: overall, per shop and per kassa, split by currency."""
+    totals, per_shop, per_account = {}, {}, {}
+    for p in payments:
+        t = totals.setdefault(p.currency, {"currency": p.currency, "count": 0, "amount": ZERO, "discount": ZERO})
+        s = per_shop.setdefault((p.shop_id, p.currency), {
+            "shop": p.shop_id, "shop_name": p.shop.name, "currency": p.currency,
+            "count": 0, "amount": ZERO, "discount": ZERO,
+        })
+        a = per_account.setdefault((p.account_id, p.currency), {
+            "account": p.account_id, "currency": p.currency, "count": 0, "amount": ZERO,
+        })
+        for bucket in (t, s, a):
+            bucket["count"] += 1
+            bucket["amount"] += p.amount
+        t["discount"] += p.discount
+        s["discount"] += p.discount
+
+    def out(rows):
+        return [
+            {k: str(v) if isinstance(v, Decimal) else v for k, v in row.items()}
+            for _, row in sorted(rows.items())
+        ]
+
+    return {"totals": out(totals), "shops": out(per_shop), "accounts": out(per_account)}
@@ -0,0 +1,243 @@
+"""Posting engine — the one write path for money movements.
+
+A business record (payment, expense, handover, transfer, exchange, purchase,
+salary payment) describes its money effect as a list of `Leg`s: cash into or
+out of a kassa in one currency, optionally with an effect on a shop's debt.
+`post`, `repost` and `unpost` then apply those legs for the record:
+
+1. lock every affected Shop, then every affected KassaAccount, each set in one
+   SELECT … FOR UPDATE ordered by pk — so concurrent postings always take
+   locks in the same order and cannot deadlock on each other;
+2. move the cached kassa balances with one UPDATE (CASE per account);
+3. write the shop debt changes through apps.shops.ledger.post_many (one
+   bulk_update + one bulk_create);
+4. write the KassaTransaction rows with one bulk_create.
+
+`post_batch` does the same for many new records at once (bulk imports).
+
+In deferred-balance mode (see apps.finance.balances) steps 1 and 2 skip the
+kassa rows: new ledger rows are written unfolded and balances.fold() moves
+the cached balance after commit, so concurrent postings only contend on the
+shops they touch. Deleted rows that were already folded are taken back out
+of the cached balance directly.
+
+Callers wrap the record save and the posting in one transaction.atomic().
+"""
+from collections import defaultdict
+from dataclasses import dataclass
+from decimal import Decimal
+
+from apps.core.models import business_date_of
+from apps.shops import ledger as shop_ledger
+from apps.shops.models import Shop, ShopLedgerKind
+
+from .balances import add_to_cached, deferred, invalidate, invalidate_rows, schedule_fold
+from .models import KassaAccount, KassaTransaction
+
+ZERO = Decimal("0")
+
+
+@dataclass(frozen=True)
+class Leg:
+    """One money effect of a record.
+
+    amount       kassa effect in `currency` (+ in, − out); 0 for a shop-only leg.
+    shop_amount  shop debt effect (+ up, − down), posted as `shop_kind`.
+    """
+
+    account_id: int | None
+    currency: str
+    amount: Decimal = ZERO
+    kind: str = ""
+    note: str = ""
+    shop_id: int | None = None
+    shop_amount: Decimal = ZERO
+    shop_kind: str = ShopLedgerKind.PAYMENT
+
+
+def _lock(legs) -> dict:
+    """Lock the legs' shops then accounts (pk order); returns {shop_id: Shop}.
+
+    Accounts are not locked in deferred mode."""
+    shop_ids = sorted({leg.shop_id for leg in legs if leg.shop_id and leg.shop_amount})
+    account_ids = []
+    if not deferred():
+        account_ids = sorted({leg.account_id for leg in legs if leg.account_id and leg.amount})
+    shops = {}
+    if shop_ids:
+        shops = {s.pk: s for s in Shop.objects.select_for_update().filter(pk__in=shop_ids).order_by("pk")}
+    if account_ids:
+        list(
+            KassaAccount.objects.select_for_update()
+            .filter(pk__in=account_ids).order_by("pk").values_list("pk", flat=True)
+        )
+    return shops
+
+
+def _kassa_deltas(legs, sign=1) -> dict:
+    out = defaultdict(Decimal)
+    for leg in legs:
+        if leg.account_id and leg.amount:
+            out[(leg.account_id, leg.currency)] += sign * Decimal(str(leg.amount))
+    return out
+
+
+def _rows(reference, legs, occurred_at, user) -> list[KassaTransaction]:
+    return [
+        KassaTransaction(
+            account_id=leg.account_id,
+            kind=leg.kind,
+            currency=leg.currency,
+            amount=leg.amount,
+            reference_model=reference._meta.label,
+            reference_id=reference.pk,
+            note=leg.note[:255],
+            occurred_at=occurred_at,
+            business_date=business_date_of(occurred_at),
+            created_by=user if user is not None and user.is_authenticated else None,
+            is_folded=not deferred(),
+        )
+        for leg in legs
+        if leg.account_id and leg.amount
+    ]
+
+
+def _write_rows(rows) -> None:
+    if not rows:
+        return
+    KassaTransaction.objects.bulk_create(rows)
+    # bulk_create sends no post_save: drop checkpoints covering backdated rows here.
+    first = {}
+    for r in rows:
+        if r.account_id not in first or r.occurred_at < first[r.account_id]:
+            first[r.account_id] = r.occurred_at
+    for account_id, at in first.items():
+        invalidate(account_id, at)
+    if deferred():
+        schedule_fold(first)
+
+
+def _linked(reference):
+    return KassaTransaction.objects.filter(
+        reference_model=reference._meta.label, reference_id=reference.pk
+    )
+
+
+def _delete_linked(reference) -> bool:
+    """Delete the record's ledger rows; True when there were any.
+
+    The callers' cached-balance moves assume every deleted row was folded
+    (immediate mode) or none was (deferred mode); rows on the other side of
+    that assumption are corrected here. Locking them first keeps a concurrent
+    fold off these rows.
+    """
+    linked = _linked(reference)
+    rows = list(linked.select_for_update().values_list("account_id", "currency", "amount", "is_folded"))
+    if not rows:
+        return False
+    correction = defaultdict(Decimal)
+    for account_id, currency, amount, is_folded in rows:
+        if deferred() and is_folded:
+            correction[(account_id, currency)] -= amount
+        elif not deferred() and not is_folded:
+            correction[(account_id, currency)] += amount
+    add_to_cached(correction)
+    invalidate_rows(linked)
+    linked.delete()
+    return True
+
+
+def _shop_entries(reference, legs, occurred_at, sign=1, note=None) -> list[dict]:
+    return [
+        {
+            "shop_id": leg.shop_id,
+            "currency": leg.currency,
+            "amount": sign * Decimal(str(leg.shop_amount)),
+            "kind": leg.shop_kind,
+            "reference": reference,
+            "note": note if note is not None else "",
+            "occurred_at": occurred_at,
+        }
+        for leg in legs
+        if leg.shop_id and leg.shop_amount
+    ]
+
+
+def _move_cached(deltas) -> None:
+    if not deferred():
+        add_to_cached(deltas)
+
+
+def post(reference, legs, *, occurred_at, user=None) -> None:
+    """Apply a new record's legs."""
+    shops = _lock(legs)
+    _move_cached(_kassa_deltas(legs))
+    shop_ledger.post_many(shops, _shop_entries(reference, legs, occurred_at), user=user)
+    _write_rows(_rows(reference, legs, occurred_at, user))
+
+
+def repost(
+    reference,
+    old_legs,
+    new_legs,
+    *,
+    occurred_at,
+    old_occurred_at=None,
+    user=None,
+    note: str = "",
+    rewrite_missing: bool = True,
+) -> None:
+    """Replace an edited record's effect: old legs out, new legs in.
+
+    Kassa balances move by the net difference in one UPDATE and the record's
+    ledger rows are replaced. Shop debt is append-only, so the old effect is
+    reversed (with `note`, at `old_occurred_at` — the record's time before the
+    edit, default `occurred_at`) and the new one posted as separate entries.
+    With rewrite_missing=False, records that had no ledger rows (history
+    imported without them) keep having none.
+    """
+    shops = _lock([*old_legs, *new_legs])
+    deltas = _kassa_deltas(new_legs)
+    for key, amount in _kassa_deltas(old_legs, sign=-1).items():
+        deltas[key] += amount
+    _move_cached(deltas)
+    shop_ledger.post_many(
+        shops,
+        _shop_entries(reference, old_legs, old_occurred_at or occurred_at, sign=-1, note=note)
+        + _shop_entries(reference, new_legs, occurred_at),
+        user=user,
+    )
+    had_rows = _delete_linked(reference)
+    if had_rows or rewrite_missing:
+        _write_rows(_rows(reference, new_legs, occurred_at, user))
+    if deferred() and not had_rows:
+        # No rows to take the old effect out of the cache (history imported
+        # without them): move the cache directly, as immediate mode does.
+        add_to_cached(_kassa_deltas(old_legs, sign=-1) if rewrite_missing else deltas)
+
+
+def unpost(reference, legs, *, occurred_at=None, user=None, note: str = "") -> None:
+    """Reverse a record's legs before it is deleted and drop its ledger rows.
+    The shop debt reversal is dated `occurred_at` (the record's time; default now)."""
+    shops = _lock(legs)
+    _move_cached(_kassa_deltas(legs, sign=-1))
+    shop_ledger.post_many(
+        shops, _shop_entries(reference, legs, occurred_at, sign=-1, note=note), user=user
+    )
+    if not _delete_linked(reference) and deferred():
+        add_to_cached(_kassa_deltas(legs, sign=-1))
+
+
+def post_batch(items, *, user=None) -> None:
+    """Apply many new records at once: items = [(reference, legs, occurred_at)].
+
+    Same steps as `post`, but each shop and kassa is locked and updated once
+    for the whole batch, with the deltas summed across records.
+    """
+    all_legs = [leg for _, legs, _ in items for leg in legs]
+    shops = _lock(all_legs)
+    _move_cached(_kassa_deltas(all_legs))
+    shop_ledger.post_many(
+        shops, [e for ref, legs, at in items for e in _shop_entries(ref, legs, at)], user=user
+    )
+    _write_rows([r for ref, legs, at in items for r in _rows(ref, legs, at, user)])
@@ -1,6 +1,8 @@
 from django.contrib.auth import get_user_model
 from rest_framework import serializers
 
+from apps.core.constants import MONEY_DECIMAL_PLACES, MONEY_MAX_DIGITS
+
 from .models import (
     CashHandover,
     ExpenseCategory,
@@ -14,6 +16,17 @@ from .models import (
 
 
 class KassaAccountSerializer(serializers.ModelSerializer):
+    # Live balances (cached + not yet folded rows); the queryset must come
+    # from balances.with_live_balances().
+    balance_uzs = serializers.DecimalField(
+        source="live_balance_uzs", max_digits=MONEY_MAX_DIGITS,
+        decimal_places=MONEY_DECIMAL_PLACES, read_only=True,
+    )
+    balance_usd = serializers.DecimalField(
+        source="live_balance_usd", max_digits=MONEY_MAX_DIGITS,
+        decimal_places=MONEY_DECIMAL_PLACES, read_only=True,
+    )
+
     class Meta:
         model = KassaAccount
         fields = [
@@ -0,0 +1,14 @@
+"""Celery tasks for the finance app."""
+from celery import shared_task
+
+from .balances import fold
+
+
+@shared_task(name="finance.fold_kassa_balances")
+def fold_kassa_balances() -> int:
+    """Fold pending kassa ledger rows into the cached balances (deferred mode).
+
+    Schedule every few seconds with django-celery-beat when
+    KASSA_DEFERRED_BALANCES is on; harmless (one index probe) otherwise.
+    """
+    return fold()
@@ -3,6 +3,7 @@ from rest_framework.routers import DefaultRouter
 
 from .views import (
     CashHandoverViewSet,
+    DriverHandoverMatrixView,
     DriverHandoverReportView,
     ExpenseCategoryViewSet,
     GeneralExpenseViewSet,
@@ -31,5 +32,10 @@ urlpatterns = [
         DriverHandoverReportView.as_view(),
         name="driver-handover-report",
     ),
+    path(
+        "driver-handover-report/matrix/",
+        DriverHandoverMatrixView.as_view(),
+        name="driver-handover-matrix",
+    ),
     *router.urls,
 ]
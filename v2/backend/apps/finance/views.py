@@ -2,16 +2,20 @@ from decimal import Decimal
 
 from django.contrib.auth import get_user_model
 from django.db import transaction
-from django.db.models import Count, F, Sum
+from django.db.models import Count, Sum
 from django.utils import timezone
 from rest_framework import filters, status, viewsets
+from rest_framework.decorators import action
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 from rest_framework.views import APIView
 
+from apps.core.idempotency import idempotent
+from apps.core.pagination import CursorOrPagePagination
 from apps.core.permissions import ReadOrManagerWrite
-from apps.shops.models import Shop
 
+from . import balances, driver_matrix, payment_import, posting
+from .posting import Leg
 from .models import (
     CashHandover,
     ExpenseCategory,
@@ -38,9 +42,41 @@ from .serializers import (
 # ─────────────────── Kassa ───────────────────
 class KassaAccountViewSet(viewsets.ReadOnlyModelViewSet):
     permission_classes = [IsAuthenticated]
-    queryset = KassaAccount.objects.all()
+    queryset = balances.with_live_balances(KassaAccount.objects.all())
     serializer_class = KassaAccountSerializer
 
+    @action(detail=True, methods=["get"], url_path="balance-as-of")
+    def balance_as_of(self, request, pk=None):
+        """GET /finance/accounts/{id}/balance-as-of/?date=YYYY-MM-DD (end of day)
+        or ?at=<ISO datetime> — the kassa balance from its ledger at that moment."""
+        from datetime import datetime, time
+
+        from django.utils.dateparse import parse_datetime
+
+        account = self.get_object()
+        p = request.query_params
+        try:
+            if p.get("at"):
+                at = parse_datetime(p["at"])
+                if at is None:
+                    raise ValueError
+                if timezone.is_naive(at):
+                    at = timezone.make_aware(at)
+            elif p.get("date"):
+                day = datetime.strptime(p["date"], "%Y-%m-%d").date()
+                at = timezone.make_aware(datetime.combine(day, time.max))
+            else:
+                return Response({"detail": "date or at is required."}, status=400)
+        except ValueError:
+            return Response({"detail": "date must be YYYY-MM-DD, at an ISO datetime."}, status=400)
+        balance = balances.balance_as_of(account.id, at)
+        return Response({
+            "account": account.id,
+            "at": at,
+            "balance_uzs": str(balance["UZS"]),
+            "balance_usd": str(balance["USD"]),
+        })
+
 
 def _resolve_source_notes(rows) -> dict:
     """{(reference_model, reference_id): user_note} for a batch of transactions.
@@ -73,6 +109,8 @@ class KassaTransactionViewSet(viewsets.ReadOnlyModelViewSet):
     serializer_class = KassaTransactionSerializer
     filter_backends = [filters.OrderingFilter]
     ordering_fields = ["occurred_at", "amount"]
+    pagination_class = CursorOrPagePagination
+    cursor_ordering = ("-occurred_at", "-id")
 
     def get_queryset(self):
         qs = KassaTransaction.objects.select_related("account", "created_by")
@@ -84,9 +122,9 @@ class KassaTransactionViewSet(viewsets.ReadOnlyModelViewSet):
         if currency := p.get("currency"):
             qs = qs.filter(currency=currency)
         if date_from := p.get("date_from"):
-            qs = qs.filter(occurred_at__date__gte=date_from)
+            qs = qs.filter(business_date__gte=date_from)
         if date_to := p.get("date_to"):
-            qs = qs.filter(occurred_at__date__lte=date_to)
+            qs = qs.filter(business_date__lte=date_to)
         return qs
 
     def list(self, request, *args, **kwargs):
@@ -101,38 +139,19 @@ class KassaTransactionViewSet(viewsets.ReadOnlyModelViewSet):
 
 
 # ─────────────────── Payments (Kirim) ───────────────────
-def _apply_payment_to_shop_balance(payment: Payment):
-    """Subtract payment.amount + payment.discount from shop's per-currency loan balance."""
-    shop = Shop.objects.select_for_update().get(pk=payment.shop_id)
-    delta = payment.amount + payment.discount
-    if payment.currency == "UZS":
-        shop.loan_balance_uzs = F("loan_balance_uzs") - delta
-    else:
-        shop.loan_balance_usd = F("loan_balance_usd") - delta
-    shop.save(update_fields=["loan_balance_uzs", "loan_balance_usd"])
-
-
-def _apply_payment_to_kassa(payment: Payment):
-    """Log the cash into the kassa account — append-only + update cached balance."""
-    account = KassaAccount.objects.select_for_update().get(pk=payment.account_id)
-    if payment.currency == "UZS":
-        account.balance_uzs = F("balance_uzs") + payment.amount
-    else:
-        account.balance_usd = F("balance_usd") + payment.amount
-    account.save(update_fields=["balance_uzs", "balance_usd"])
-    KassaTransaction.objects.create(
-        account=payment.account,
+def _payment_legs(payment: Payment) -> list[Leg]:
+    """Cash into the kassa; amount + discount off the shop's loan balance."""
+    return [Leg(
+        account_id=payment.account_id,
+        currency=payment.currency,
+        amount=payment.amount,
         kind=KassaTransactionType.PAYMENT_IN
         if payment.payment_type == "collection"
         else KassaTransactionType.LOAN_REPAYMENT,
-        currency=payment.currency,
-        amount=payment.amount,
-        reference_model="finance.Payment",
-        reference_id=payment.id,
         note=f"Kirim · {payment.shop.name}",
-        occurred_at=payment.received_at,
-        created_by=payment.collected_by,
-    )
+        shop_id=payment.shop_id,
+        shop_amount=-payment.closes_loan_by(),
+    )]
 
 
 class PaymentViewSet(viewsets.ModelViewSet):
@@ -147,6 +166,8 @@ class PaymentViewSet(viewsets.ModelViewSet):
     serializer_class = PaymentSerializer
     filter_backends = [filters.OrderingFilter]
     ordering_fields = ["received_at", "amount"]
+    pagination_class = CursorOrPagePagination
+    cursor_ordering = ("-received_at", "-id")
 
     def get_queryset(self):
         qs = Payment.objects.select_related("shop", "account", "collected_by", "order")
@@ -160,101 +181,89 @@ class PaymentViewSet(viewsets.ModelViewSet):
         if collector := p.get("collected_by"):
             qs = qs.filter(collected_by_id=collector)
         if date_from := p.get("date_from"):
-            qs = qs.filter(received_at__date__gte=date_from)
+            qs = qs.filter(business_date__gte=date_from)
         if date_to := p.get("date_to"):
-            qs = qs.filter(received_at__date__lte=date_to)
+            qs = qs.filter(business_date__lte=date_to)
         return qs
 
+    @idempotent
+    def create(self, request, *args, **kwargs):
+        return super().create(request, *args, **kwargs)
+
     def perform_create(self, serializer):
         with transaction.atomic():
             payment = serializer.save(
                 collected_by=serializer.validated_data.get("collected_by") or self.request.user
             )
-            _apply_payment_to_shop_balance(payment)
-            _apply_payment_to_kassa(payment)
+            posting.post(
+                payment, _payment_legs(payment),
+                occurred_at=payment.received_at, user=payment.collected_by,
+            )
 
     def perform_update(self, serializer):
         with transaction.atomic():
-            old = serializer.instance
-            old_amount = old.amount
-            old_discount = old.discount
-            old_currency = old.currency
-            old_account_id = old.account_id
-            old_shop_id = old.shop_id
-
+            old_legs = _payment_legs(serializer.instance)
+            old_received_at = serializer.instance.received_at
             payment = serializer.save()
-
-            # Reverse old shop balance change.
-            old_shop = Shop.objects.select_for_update().get(pk=old_shop_id)
-            old_delta = old_amount + old_discount
-            if old_currency == "UZS":
-                old_shop.loan_balance_uzs = F("loan_balance_uzs") + old_delta
-            else:
-                old_shop.loan_balance_usd = F("loan_balance_usd") + old_delta
-            old_shop.save(update_fields=["loan_balance_uzs", "loan_balance_usd"])
-
-            # Apply new shop balance change.
-            _apply_payment_to_shop_balance(payment)
-
-            # Lock both KassaAccounts in deterministic (sorted) order to prevent
-            # deadlocks when two concurrent updates swap old/new accounts.
-            acct_ids = sorted({old_account_id, payment.account_id})
-            accounts = {
-                a.id: a
-                for a in KassaAccount.objects.select_for_update().filter(id__in=acct_ids)
-            }
-
-            # Reverse old kassa credit.
-            old_account = accounts[old_account_id]
-            if old_currency == "UZS":
-                old_account.balance_uzs = F("balance_uzs") - old_amount
-            else:
-                old_account.balance_usd = F("balance_usd") - old_amount
-            old_account.save(update_fields=["balance_uzs", "balance_usd"])
-
-            # Apply new kassa credit.
-            new_account = accounts[payment.account_id]
-            if payment.currency == "UZS":
-                new_account.balance_uzs = F("balance_uzs") + payment.amount
-            else:
-                new_account.balance_usd = F("balance_usd") + payment.amount
-            new_account.save(update_fields=["balance_uzs", "balance_usd"])
-
-            # Update linked KassaTransaction.
-            KassaTransaction.objects.filter(
-                reference_model="finance.Payment",
-                reference_id=payment.id,
-            ).update(
-                account=payment.account,
-                currency=payment.currency,
-                amount=payment.amount,
-                occurred_at=payment.received_at,
+            posting.repost(
+                payment, old_legs, _payment_legs(payment),
+                occurred_at=payment.received_at, old_occurred_at=old_received_at,
+                user=payment.collected_by,
+                note="To'lov tahrirlandi (bekor)",
             )
 
     def perform_destroy(self, instance):
         with transaction.atomic():
-            # Reverse shop balance change.
-            shop = Shop.objects.select_for_update().get(pk=instance.shop_id)
-            delta = instance.amount + instance.discount
-            if instance.currency == "UZS":
-                shop.loan_balance_uzs = F("loan_balance_uzs") + delta
-            else:
-                shop.loan_balance_usd = F("loan_balance_usd") + delta
-            shop.save(update_fields=["loan_balance_uzs", "loan_balance_usd"])
+            posting.unpost(
+                instance, _payment_legs(instance), occurred_at=instance.received_at,
+                user=self.request.user, note="To'lov o'chirildi",
+            )
+            instance.delete()
 
-            # Reverse kassa credit.
-            account = KassaAccount.objects.select_for_update().get(pk=instance.account_id)
-            if instance.currency == "UZS":
-                account.balance_uzs = F("balance_uzs") - instance.amount
-            else:
-                account.balance_usd = F("balance_usd") - instance.amount
-            account.save(update_fields=["balance_uzs", "balance_usd"])
+    @action(detail=False, methods=["post"], url_path="import")
+    @idempotent
+    def import_payments(self, request):
+        """Post a whole collection sheet at once.
+
+        POST multipart {file: .xlsx, account?, currency?, collected_by?,
+             received_at?, dry_run?} or JSON {payments: [...], same defaults}.
+        Columns / keys: shop, amount [, discount, currency, account,
+        payment_type, collected_by, received_at, order_date, note]; the
+        top-level values fill empty cells. Any bad row rejects the import.
+        dry_run=true returns the per-shop / per-kassa totals without saving.
+        """
+        data = request.data
+        dry_run = str(data.get("dry_run", "")).lower() in ("1", "true")
+        defaults = {
+            k: data.get(k)
+            for k in ("account", "currency", "collected_by", "received_at", "payment_type")
+            if data.get(k) not in (None, "")
+        }
+        defaults.setdefault("collected_by", request.user.pk)
+        try:
+            upload = request.FILES.get("file")
+            rows = (
+                payment_import.read_sheet(upload) if upload is not None
+                else payment_import.read_json(data.get("payments"))
+            )
+        except payment_import.PaymentImportError as exc:
+            return Response({"detail": str(exc)}, status=400)
 
-            KassaTransaction.objects.filter(
-                reference_model="finance.Payment",
-                reference_id=instance.id,
-            ).delete()
-            instance.delete()
+        payments, errors = payment_import.build(rows, defaults=defaults)
+        preview = {"dry_run": dry_run, "count": len(payments), **payment_import.summary(payments), "errors": errors}
+        if errors and not dry_run:
+            return Response({"detail": "Faylda xatolar bor", **preview}, status=400)
+        if dry_run or not payments:
+            return Response(preview)
+
+        with transaction.atomic():
+            Payment.objects.bulk_create(payments, batch_size=1000)
+            posting.post_batch(
+                [(p, _payment_legs(p), p.received_at) for p in payments], user=request.user,
+            )
+        return Response(
+            {**preview, "ids": [p.pk for p in payments]}, status=status.HTTP_201_CREATED,
+        )
 
 
 # ─────────────────── Expenses ───────────────────
@@ -264,6 +273,16 @@ class ExpenseCategoryViewSet(viewsets.ModelViewSet):
     queryset = ExpenseCategory.objects.all()
 
 
+def _expense_legs(exp: GeneralExpense) -> list[Leg]:
+    return [Leg(
+        account_id=exp.account_id,
+        currency=exp.currency,
+        amount=-exp.amount,
+        kind=KassaTransactionType.GENERAL_EXPENSE,
+        note=exp.title,
+    )]
+
+
 class GeneralExpenseViewSet(viewsets.ModelViewSet):
     permission_classes = [ReadOrManagerWrite]
     serializer_class = GeneralExpenseSerializer
@@ -278,85 +297,46 @@ class GeneralExpenseViewSet(viewsets.ModelViewSet):
         if currency := p.get("currency"):
             qs = qs.filter(currency=currency)
         if date_from := p.get("date_from"):
-            qs = qs.filter(occurred_at__date__gte=date_from)
+            qs = qs.filter(business_date__gte=date_from)
         if date_to := p.get("date_to"):
-            qs = qs.filter(occurred_at__date__lte=date_to)
+            qs = qs.filter(business_date__lte=date_to)
         return qs
 
+    @idempotent
+    def create(self, request, *args, **kwargs):
+        return super().create(request, *args, **kwargs)
+
     def perform_create(self, serializer):
         with transaction.atomic():
             exp = serializer.save(created_by=self.request.user)
-            account = KassaAccount.objects.select_for_update().get(pk=exp.account_id)
-            if exp.currency == "UZS":
-                account.balance_uzs = F("balance_uzs") - exp.amount
-            else:
-                account.balance_usd = F("balance_usd") - exp.amount
-            account.save(update_fields=["balance_uzs", "balance_usd"])
-            KassaTransaction.objects.create(
-                account=exp.account,
-                kind=KassaTransactionType.GENERAL_EXPENSE,
-                currency=exp.currency,
-                amount=-exp.amount,
-                reference_model="finance.GeneralExpense",
-                reference_id=exp.id,
-                note=exp.title,
-                occurred_at=exp.occurred_at,
-                created_by=self.request.user,
-            )
+            posting.post(exp, _expense_legs(exp), occurred_at=exp.occurred_at, user=exp.created_by)
 
     def perform_update(self, serializer):
         with transaction.atomic():
-            old = serializer.instance
-            old_amount = old.amount
-            old_currency = old.currency
-            old_account_id = old.account_id
-
+            old_legs = _expense_legs(serializer.instance)
             exp = serializer.save()
-
-            # Reverse old deduction from old account.
-            old_account = KassaAccount.objects.select_for_update().get(pk=old_account_id)
-            if old_currency == "UZS":
-                old_account.balance_uzs = F("balance_uzs") + old_amount
-            else:
-                old_account.balance_usd = F("balance_usd") + old_amount
-            old_account.save(update_fields=["balance_uzs", "balance_usd"])
-
-            # Apply new deduction to (possibly new) account.
-            new_account = KassaAccount.objects.select_for_update().get(pk=exp.account_id)
-            if exp.currency == "UZS":
-                new_account.balance_uzs = F("balance_uzs") - exp.amount
-            else:
-                new_account.balance_usd = F("balance_usd") - exp.amount
-            new_account.save(update_fields=["balance_uzs", "balance_usd"])
-
-            # Update linked KassaTransaction.
-            KassaTransaction.objects.filter(
-                reference_model="finance.GeneralExpense",
-                reference_id=exp.id,
-            ).update(
-                account=exp.account,
-                currency=exp.currency,
-                amount=-exp.amount,
-                note=exp.title,
-                occurred_at=exp.occurred_at,
+            posting.repost(
+                exp, old_legs, _expense_legs(exp),
+                occurred_at=exp.occurred_at, user=exp.created_by,
             )
 
     def perform_destroy(self, instance):
         with transaction.atomic():
-            account = KassaAccount.objects.select_for_update().get(pk=instance.account_id)
-            if instance.currency == "UZS":
-                account.balance_uzs = F("balance_uzs") + instance.amount
-            else:
-                account.balance_usd = F("balance_usd") + instance.amount
-            account.save(update_fields=["balance_uzs", "balance_usd"])
-            KassaTransaction.objects.filter(
-                reference_model="finance.GeneralExpense",
-                reference_id=instance.id,
-            ).delete()
+            posting.unpost(instance, _expense_legs(instance), user=self.request.user)
             instance.delete()
 
 
 # ─────────────────── Cash Handover (feature #25) ───────────────────
+def _handover_legs(handover: CashHandover) -> list[Leg]:
+    return [Leg(
+        account_id=handover.to_account_id,
+        currency=handover.currency,
+        amount=handover.amount,
+        kind=KassaTransactionType.CASH_HANDOVER,
+        note=f"Handover · {handover.driver.display_name}",
+    )]
+
+
 class CashHandoverViewSet(viewsets.ModelViewSet):
     permission_classes = [ReadOrManagerWrite]
     serializer_class = CashHandoverSerializer
@@ -374,80 +354,55 @@ class CashHandoverViewSet(viewsets.ModelViewSet):
             qs = qs.filter(occurred_at__date__lte=date_to)
         return qs
 
+    @idempotent
+    def create(self, request, *args, **kwargs):
+        return super().create(request, *args, **kwargs)
+
     def perform_create(self, serializer):
         with transaction.atomic():
             received_by = serializer.validated_data.get("received_by") or self.request.user
             handover = serializer.save(received_by=received_by)
-            account = KassaAccount.objects.select_for_update().get(pk=handover.to_account_id)
-            if handover.currency == "UZS":
-                account.balance_uzs = F("balance_uzs") + handover.amount
-            else:
-                account.balance_usd = F("balance_usd") + handover.amount
-            account.save(update_fields=["balance_uzs", "balance_usd"])
-            KassaTransaction.objects.create(
-                account=handover.to_account,
-                kind=KassaTransactionType.CASH_HANDOVER,
-                currency=handover.currency,
-                amount=handover.amount,
-                reference_model="finance.CashHandover",
-                reference_id=handover.id,
-                note=f"Handover · {handover.driver.display_name}",
-                occurred_at=handover.occurred_at,
-                created_by=handover.received_by,
+            posting.post(
+                handover, _handover_legs(handover),
+                occurred_at=handover.occurred_at, user=handover.received_by,
             )
 
     def perform_update(self, serializer):
         with transaction.atomic():
-            old = serializer.instance
-            old_amount = Decimal(str(old.amount))
-            old_currency = old.currency
-            old_account_id = old.to_account_id
-
+            old_legs = _handover_legs(serializer.instance)
             handover = serializer.save()
-
-            # Reverse old balance on old account.
-            old_account = KassaAccount.objects.select_for_update().get(pk=old_account_id)
-            if old_currency == "UZS":
-                old_account.balance_uzs = F("balance_uzs") - old_amount
-            else:
-                old_account.balance_usd = F("balance_usd") - old_amount
-            old_account.save(update_fields=["balance_uzs", "balance_usd"])
-
-            # Apply new balance to (possibly changed) account.
-            new_account = KassaAccount.objects.select_for_update().get(pk=handover.to_account_id)
-            if handover.currency == "UZS":
-                new_account.balance_uzs = F("balance_uzs") + handover.amount
-            else:
-                new_account.balance_usd = F("balance_usd") + handover.amount
-            new_account.save(update_fields=["balance_uzs", "balance_usd"])
-
-            # Sync the linked KassaTransaction row.
-            KassaTransaction.objects.filter(
-                reference_model="finance.CashHandover",
-                reference_id=handover.id,
-            ).update(
-                account=handover.to_account,
-                currency=handover.currency,
-                amount=handover.amount,
-                occurred_at=handover.occurred_at,
-                note=f"Handover · {handover.driver.display_name}",
+            posting.repost(
+                handover, old_legs, _handover_legs(handover),
+                occurred_at=handover.occurred_at, user=handover.received_by,
             )
 
     def perform_destroy(self, instance):
         with transaction.atomic():
-            account = KassaAccount.objects.select_for_update().get(pk=instance.to_account_id)
-            if instance.currency == "UZS":
-                account.balance_uzs = F("balance_uzs") - instance.amount
-            else:
-                account.balance_usd = F("balance_usd") - instance.amount
-            account.save(update_fields=["balance_uzs", "balance_usd"])
-            KassaTransaction.objects.filter(
-                reference_model="finance.CashHandover",
-                reference_id=instance.id,
-            ).delete()
+            posting.unpost(instance, _handover_legs(instance), user=self.request.user)
             instance.delete()
 
 
+def _transfer_legs(transfer: KassaTransfer) -> list[Leg]:
+    """Debit the source kassa, credit the destination, same currency."""
+    suffix = f" · {transfer.note}" if transfer.note else ""
+    return [
+        Leg(
+            account_id=transfer.from_account_id,
+            currency=transfer.currency,
+            amount=-transfer.amount,
+            kind=KassaTransactionType.TRANSFER,
+            note=f"O'tkazma → {transfer.to_account.name}{suffix}",
+        ),
+        Leg(
+            account_id=transfer.to_account_id,
+            currency=transfer.currency,
+            amount=transfer.amount,
+            kind=KassaTransactionType.TRANSFER,
+            note=f"O'tkazma ← {transfer.from_account.name}{suffix}",
+        ),
+    ]
+
+
 class KassaTransferViewSet(viewsets.ModelViewSet):
     """
     Transfer cash between KassaAccounts (e.g. Rizoxon → Seyf).
@@ -473,140 +428,54 @@ class KassaTransferViewSet(viewsets.ModelViewSet):
             qs = qs.filter(occurred_at__date__lte=date_to)
         return qs
 
+    @idempotent
+    def create(self, request, *args, **kwargs):
+        return super().create(request, *args, **kwargs)
+
     def perform_create(self, serializer):
         with transaction.atomic():
             transfer = serializer.save(created_by=self.request.user)
-
-            # Debit source account.
-            src = KassaAccount.objects.select_for_update().get(pk=transfer.from_account_id)
-            if transfer.currency == "UZS":
-                src.balance_uzs = F("balance_uzs") - transfer.amount
-            else:
-                src.balance_usd = F("balance_usd") - transfer.amount
-            src.save(update_fields=["balance_uzs", "balance_usd"])
-
-            # Credit destination account.
-            dst = KassaAccount.objects.select_for_update().get(pk=transfer.to_account_id)
-            if transfer.currency == "UZS":
-                dst.balance_uzs = F("balance_uzs") + transfer.amount
-            else:
-                dst.balance_usd = F("balance_usd") + transfer.amount
-            dst.save(update_fields=["balance_uzs", "balance_usd"])
-
-            ref_note = transfer.note or f"{transfer.from_account.name} → {transfer.to_account.name}"
-
-            # Debit ledger row on source.
-            KassaTransaction.objects.create(
-                account=transfer.from_account,
-                kind=KassaTransactionType.TRANSFER,
-                currency=transfer.currency,
-                amount=-transfer.amount,
-                reference_model="finance.KassaTransfer",
-                reference_id=transfer.id,
-                note=f"O'tkazma → {transfer.to_account.name}" + (f" · {transfer.note}" if transfer.note else ""),
-                occurred_at=transfer.occurred_at,
-                created_by=self.request.user,
-            )
-            # Credit ledger row on destination.
-            KassaTransaction.objects.create(
-                account=transfer.to_account,
-                kind=KassaTransactionType.TRANSFER,
-                currency=transfer.currency,
-                amount=transfer.amount,
-                reference_model="finance.KassaTransfer",
-                reference_id=transfer.id,
-                note=f"O'tkazma ← {transfer.from_account.name}" + (f" · {transfer.note}" if transfer.note else ""),
-                occurred_at=transfer.occurred_at,
-                created_by=self.request.user,
+            posting.post(
+                transfer, _transfer_legs(transfer),
+                occurred_at=transfer.occurred_at, user=transfer.created_by,
             )
 
     def perform_update(self, serializer):
         with transaction.atomic():
-            old = serializer.instance
-            old_amount = Decimal(str(old.amount))
-            old_currency = old.currency
-            old_from_id = old.from_account_id
-            old_to_id = old.to_account_id
-
+            old_legs = _transfer_legs(serializer.instance)
             transfer = serializer.save()
-
-            # Reverse old: re-add to source, remove from destination.
-            old_src = KassaAccount.objects.select_for_update().get(pk=old_from_id)
-            if old_currency == "UZS":
-                old_src.balance_uzs = F("balance_uzs") + old_amount
-            else:
-                old_src.balance_usd = F("balance_usd") + old_amount
-            old_src.save(update_fields=["balance_uzs", "balance_usd"])
-
-            old_dst = KassaAccount.objects.select_for_update().get(pk=old_to_id)
-            if old_currency == "UZS":
-                old_dst.balance_uzs = F("balance_uzs") - old_amount
-            else:
-                old_dst.balance_usd = F("balance_usd") - old_amount
-            old_dst.save(update_fields=["balance_uzs", "balance_usd"])
-
-            # Apply new: deduct from new source, credit new destination.
-            new_src = KassaAccount.objects.select_for_update().get(pk=transfer.from_account_id)
-            if transfer.currency == "UZS":
-                new_src.balance_uzs = F("balance_uzs") - transfer.amount
-            else:
-                new_src.balance_usd = F("balance_usd") - transfer.amount
-            new_src.save(update_fields=["balance_uzs", "balance_usd"])
-
-            new_dst = KassaAccount.objects.select_for_update().get(pk=transfer.to_account_id)
-            if transfer.currency == "UZS":
-                new_dst.balance_uzs = F("balance_uzs") + transfer.amount
-            else:
-                new_dst.balance_usd = F("balance_usd") + transfer.amount
-            new_dst.save(update_fields=["balance_uzs", "balance_usd"])
-
-            # Sync both linked KassaTransaction rows (debit row has amount<0).
-            KassaTransaction.objects.filter(
-                reference_model="finance.KassaTransfer",
-                reference_id=transfer.id,
-                amount__lt=0,
-            ).update(
-                account=transfer.from_account,
-                currency=transfer.currency,
-                amount=-transfer.amount,
-                occurred_at=transfer.occurred_at,
-                note=f"O'tkazma → {transfer.to_account.name}" + (f" · {transfer.note}" if transfer.note else ""),
-            )
-            KassaTransaction.objects.filter(
-                reference_model="finance.KassaTransfer",
-                reference_id=transfer.id,
-                amount__gt=0,
-            ).update(
-                account=transfer.to_account,
-                currency=transfer.currency,
-                amount=transfer.amount,
-                occurred_at=transfer.occurred_at,
-                note=f"O'tkazma ← {transfer.from_account.name}" + (f" · {transfer.note}" if transfer.note else ""),
+            posting.repost(
+                transfer, old_legs, _transfer_legs(transfer),
+                occurred_at=transfer.occurred_at, user=transfer.created_by,
             )
 
     def perform_destroy(self, instance):
         with transaction.atomic():
-            # Reverse source debit.
-            src = KassaAccount.objects.select_for_update().get(pk=instance.from_account_id)
-            if instance.currency == "UZS":
-                src.balance_uzs = F("balance_uzs") + instance.amount
-            else:
-                src.balance_usd = F("balance_usd") + instance.amount
-            src.save(update_fields=["balance_uzs", "balance_usd"])
+            posting.unpost(instance, _transfer_legs(instance), user=self.request.user)
+            instance.delete()
 
-            # Reverse destination credit.
-            dst = KassaAccount.objects.select_for_update().get(pk=instance.to_account_id)
-            if instance.currency == "UZS":
-                dst.balance_uzs = F("balance_uzs") - instance.amount
-            else:
-                dst.balance_usd = F("balance_usd") - instance.amount
-            dst.save(update_fields=["balance_uzs", "balance_usd"])
 
-            KassaTransaction.objects.filter(
-                reference_model="finance.KassaTransfer",
-                reference_id=instance.id,
-            ).delete()
-            instance.delete()
+def _exchange_legs(exchange: KassaExchange) -> list[Leg]:
+    """Debit `from_currency`, credit `to_currency` on the same kassa."""
+    base_note = exchange.note or (
+        f"{exchange.from_amount} {exchange.from_currency} → {exchange.to_amount} {exchange.to_currency}"
+    )
+    return [
+        Leg(
+            account_id=exchange.account_id,
+            currency=exchange.from_currency,
+            amount=-exchange.from_amount,
+            kind=KassaTransactionType.EXCHANGE,
+            note=f"Ayirboshlash → {exchange.to_currency} · {base_note}",
+        ),
+        Leg(
+            account_id=exchange.account_id,
+            currency=exchange.to_currency,
+            amount=exchange.to_amount,
+            kind=KassaTransactionType.EXCHANGE,
+            note=f"Ayirboshlash ← {exchange.from_currency} · {base_note}",
+        ),
+    ]
 
 
 class KassaExchangeViewSet(viewsets.ModelViewSet):
@@ -635,6 +504,10 @@ class KassaExchangeViewSet(viewsets.ModelViewSet):
             qs = qs.filter(occurred_at__date__lte=date_to)
         return qs
 
+    @idempotent
+    def create(self, request, *args, **kwargs):
+        return super().create(request, *args, **kwargs)
+
     def perform_create(self, serializer):
         from rest_framework.serializers import ValidationError
 
@@ -645,74 +518,23 @@ class KassaExchangeViewSet(viewsets.ModelViewSet):
             ex = serializer.validated_data
             from_cur = ex["from_currency"]
             from_amount = ex["from_amount"]
-            to_cur = ex["to_currency"]
-            to_amount = ex["to_amount"]
 
             # Guard: enough money in the source currency.
-            available = account.balance_uzs if from_cur == "UZS" else account.balance_usd
+            available = balances.live(account)[from_cur]
             if from_amount > available:
                 raise ValidationError(
                     {"from_amount": f"{account.name} kassasida yetarli {from_cur} yo'q."}
                 )
 
             exchange = serializer.save(created_by=self.request.user)
-
-            # Debit source currency, credit target currency (different fields —
-            # from_currency != to_currency is enforced by the serializer).
-            if from_cur == "UZS":
-                account.balance_uzs = F("balance_uzs") - from_amount
-            else:
-                account.balance_usd = F("balance_usd") - from_amount
-            if to_cur == "UZS":
-                account.balance_uzs = F("balance_uzs") + to_amount
-            else:
-                account.balance_usd = F("balance_usd") + to_amount
-            account.save(update_fields=["balance_uzs", "balance_usd"])
-
-            base_note = exchange.note or f"{from_amount} {from_cur} → {to_amount} {to_cur}"
-            # Debit leg.
-            KassaTransaction.objects.create(
-                account=exchange.account,
-                kind=KassaTransactionType.EXCHANGE,
-                currency=from_cur,
-                amount=-from_amount,
-                reference_model="finance.KassaExchange",
-                reference_id=exchange.id,
-                note=f"Ayirboshlash → {to_cur} · {base_note}",
-                occurred_at=exchange.occurred_at,
-                created_by=self.request.user,
-            )
-            # Credit leg.
-            KassaTransaction.objects.create(
-                account=exchange.account,
-                kind=KassaTransactionType.EXCHANGE,
-                currency=to_cur,
-                amount=to_amount,
-                reference_model="finance.KassaExchange",
-                reference_id=exchange.id,
-                note=f"Ayirboshlash ← {from_cur} · {base_note}",
-                occurred_at=exchange.occurred_at,
-                created_by=self.request.user,
+            posting.post(
+                exchange, _exchange_legs(exchange),
+                occurred_at=exchange.occurred_at, user=exchange.created_by,
             )
 
     def perform_destroy(self, instance):
         with transaction.atomic():
-            account = KassaAccount.objects.select_for_update().get(pk=instance.account_id)
-            # Reverse: credit back source currency, debit target currency.
-            if instance.from_currency == "UZS":
-                account.balance_uzs = F("balance_uzs") + instance.from_amount
-            else:
-                account.balance_usd = F("balance_usd") + instance.from_amount
-            if instance.to_currency == "UZS":
-                account.balance_uzs = F("balance_uzs") - instance.to_amount
-            else:
-                account.balance_usd = F("balance_usd") - instance.to_amount
-            account.save(update_fields=["balance_uzs", "balance_usd"])
-
-            KassaTransaction.objects.filter(
-                reference_model="finance.KassaExchange",
-                reference_id=instance.id,
-            ).delete()
+            posting.unpost(instance, _exchange_legs(instance), user=self.request.user)
             instance.delete()
 
 
@@ -746,8 +568,8 @@ class DriverHandoverReportView(APIView):
         payment_aggs = (
             Payment.objects.filter(
                 collected_by_id__in=driver_ids,
-                received_at__date__gte=df,
-                received_at__date__lte=dt,
+                business_date__gte=df,
+                business_date__lte=dt,
             )
             .values("collected_by_id", "currency")
             .annotate(total=Sum("amount"), count=Count("id"))
@@ -819,3 +641,45 @@ class DriverHandoverReportView(APIView):
                 "totals": {k: str(v) for k, v in totals.items()},
             }
         )
+
+
+class DriverHandoverMatrixView(APIView):
+    """Feature #25, multi-day: driver × day collected / handed over / pending.
+
+    GET ?date_from=&date_to= (default: the last 7 days, at most 93 days)
+    [&export=xlsx]. Each cell also carries the driver's running unhandled
+    balance, starting from the opening balance before date_from.
+    """
+
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        from datetime import datetime, timedelta
+
+        from apps.reports.excel import make_multi_sheet_workbook
+        from apps.reports.views import _xlsx_response
+
+        p = request.query_params
+        try:
+            date_to = (
+                datetime.strptime(p["date_to"], "%Y-%m-%d").date()
+                if p.get("date_to") else timezone.localdate()
+            )
+            date_from = (
+                datetime.strptime(p["date_from"], "%Y-%m-%d").date()
+                if p.get("date_from") else date_to - timedelta(days=6)
+            )
+        except ValueError:
+            return Response({"detail": "date_from/date_to must be YYYY-MM-DD."}, status=400)
+        if date_from > date_to:
+            return Response({"detail": "date_from must not be after date_to."}, status=400)
+        if (date_to - date_from).days >= driver_matrix.MAX_DAYS:
+            return Response({"detail": f"At most {driver_matrix.MAX_DAYS} days."}, status=400)
+
+        data = driver_matrix.driver_matrix(date_from, date_to)
+        if p.get("export") == "xlsx":
+            buf = make_multi_sheet_workbook(driver_matrix.matrix_sheets(data))
+            return _xlsx_response(
+                buf, f"haydovchi_kassa_{date_from:%Y%m%d}_{date_to:%Y%m%d}.xlsx"
+            )
+        return Response(data)
@@ -1,6 +1,6 @@
 from django.contrib import admin
 
-from .models import Ingredient, ProductRecipe, Purchase, Unit
+from .models import Ingredient, IngredientLot, IngredientMovement, IngredientPriceStats, ProductRecipe, Purchase, Unit
 
 
 @admin.register(Unit)
@@ -29,3 +29,33 @@ class PurchaseAdmin(admin.ModelAdmin):
     list_filter = ["currency"]
     ordering = ["-occurred_at"]
     readonly_fields = ["unit_price", "created_at"]
+
+
+@admin.register(IngredientMovement)
+class IngredientMovementAdmin(admin.ModelAdmin):
+    list_display = ["ingredient", "kind", "quantity", "business_date", "reference_model", "reference_id", "created_by"]
+    list_filter = ["kind"]
+    search_fields = ["ingredient__name", "note"]
+    ordering = ["-occurred_at"]
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+
+@admin.register(IngredientLot)
+class IngredientLotAdmin(admin.ModelAdmin):
+    list_display = ["ingredient", "received_at", "quantity", "remaining", "unit_cost_uzs", "purchase"]
+    search_fields = ["ingredient__name"]
+    ordering = ["ingredient__name", "received_at"]
+    readonly_fields = ["purchase", "quantity", "created_at"]
+
+
+@admin.register(IngredientPriceStats)
+class IngredientPriceStatsAdmin(admin.ModelAdmin):
+    list_display = ["ingredient", "window_days", "day", "purchase_count", "last_price", "avg_price", "volatility_pct"]
+    list_filter = ["window_days"]
+    search_fields = ["ingredient__name"]
+    ordering = ["ingredient__name", "window_days"]
@@ -5,3 +5,9 @@ class InventoryConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "apps.inventory"
     label = "inventory"
+
+    def ready(self):
+        from . import history, price_stats
+
+        history.connect_signals()
+        price_stats.connect_signals()
@@ -0,0 +1,102 @@
+"""Ingredient consumption forecast and reorder planner.
+
+Daily consumption comes from ProductionIngredientUsage over a rolling window
+of complete days (ending yesterday), read in one grouped query: total and
+recent-window sums per ingredient via conditional aggregation. The result is
+cached for the rest of the day (apps.core.cache, version = today's date), so
+the planner only reads current ingredient quantities on a hit.
+
+The planning rate is the larger of the window average and the recent average,
+so a ramp-up in production shows before the long average catches up:
+
+    days_of_cover = quantity / rate
+    reorder_point = rate × lead_days + low_stock_threshold   (threshold = safety stock)
+    target        = rate × (lead_days + cover_days) + low_stock_threshold
+    suggested     = target − quantity, when quantity ≤ reorder_point
+"""
+from datetime import timedelta
+from decimal import ROUND_CEILING, Decimal
+
+from django.db.models import Q, Sum
+from django.utils import timezone
+
+from apps.core.cache import get_or_build
+from apps.production.models import ProductionIngredientUsage
+
+from .models import Ingredient
+
+ZERO = Decimal("0")
+QTY = Decimal("0.001")
+WINDOW_DAYS = 28
+RECENT_DAYS = 7
+LEAD_DAYS = 3
+COVER_DAYS = 14
+DAY_TTL = 24 * 60 * 60
+
+
+def _consumption(day, window: int) -> dict:
+    """{ingredient_id: (window daily average, recent daily average)} for the
+    `window` complete days before `day`."""
+    start = day - timedelta(days=window)
+    recent = min(RECENT_DAYS, window)
+    rows = (
+        ProductionIngredientUsage.objects
+        .filter(production__business_date__gte=start, production__business_date__lt=day)
+        .values("ingredient_id")
+        .annotate(
+            total=Sum("quantity_used"),
+            recent=Sum(
+                "quantity_used",
+                filter=Q(production__business_date__gte=day - timedelta(days=recent)),
+            ),
+        )
+        .order_by()
+    )
+    return {
+        r["ingredient_id"]: ((r["total"] or ZERO) / window, (r["recent"] or ZERO) / recent)
+        for r in rows
+    }
+
+
+def consumption(window: int = WINDOW_DAYS) -> dict:
+    """Cached `_consumption` for today — rebuilt once per day and window."""
+    day = timezone.localdate()
+    return get_or_build(
+        f"inventory:consumption:{window}", day.isoformat(),
+        lambda: _consumption(day, window), ttl=DAY_TTL,
+    )
+
+
+def _qty(value: Decimal) -> Decimal:
+    return value.quantize(QTY, rounding=ROUND_CEILING)
+
+
+def plan(*, window: int = WINDOW_DAYS, lead_days: int = LEAD_DAYS, cover_days: int = COVER_DAYS) -> list[dict]:
+    """Forecast rows for every active ingredient, most urgent first."""
+    rates = consumption(window)
+    rows = []
+    for ing in Ingredient.objects.filter(is_archived=False).select_related("unit"):
+        daily, recent = rates.get(ing.id, (ZERO, ZERO))
+        rate = max(daily, recent)
+        safety = ing.low_stock_threshold
+        reorder_point = rate * lead_days + safety
+        needs = ing.quantity <= reorder_point and reorder_point > 0
+        suggested = max(rate * (lead_days + cover_days) + safety - ing.quantity, ZERO) if needs else ZERO
+        rows.append({
+            "ingredient_id": ing.id,
+            "name": ing.name,
+            "unit": ing.unit.short,
+            "quantity": str(ing.quantity),
+            "daily_usage": str(_qty(daily)),
+            "recent_daily_usage": str(_qty(recent)),
+            "days_of_cover": str((ing.quantity / rate).quantize(Decimal("0.1"))) if rate > 0 else None,
+            "reorder_point": str(_qty(reorder_point)),
+            "needs_reorder": needs,
+            "suggested_quantity": str(_qty(suggested)),
+            "estimated_cost_uzs": str((_qty(suggested) * ing.avg_cost_uzs).quantize(Decimal("0.01"))),
+            "_cover": ing.quantity / rate if rate > 0 else None,
+        })
+    rows.sort(key=lambda r: (not r["needs_reorder"], r["_cover"] is None, r["_cover"] or 0, r["name"]))
+    for r in rows:
+        del r["_cover"]
+    return rows
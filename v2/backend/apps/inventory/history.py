@@ -0,0 +1,209 @@
+"""Ingredient stock history from the IngredientMovement ledger.
+
+An ingredient's stock is the sum of its movement rows; Ingredient.quantity
+caches that sum for now and IngredientStockCheckpoint rows store it at the end
+of each day, so the stock at the end of any day is
+
+    last checkpoint on or before the day + Σ rows since that checkpoint
+
+— an index lookup and a short range sum per ingredient, answered for every
+ingredient in one query (`with_stock_as_of`). Daily history and the movement /
+variance report are grouped range queries on (ingredient, business_date).
+
+Checkpoints are only valid while the history behind them is unchanged.
+apps.inventory.stock drops them for the rows it writes; the post_save /
+post_delete receivers below cover single-row writes elsewhere.
+"""
+from datetime import date, timedelta
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import DecimalField, Min, OuterRef, Q, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+from django.db.models.signals import post_delete, post_save
+from django.utils import timezone
+
+from apps.core.constants import QTY_DECIMAL_PLACES, QTY_MAX_DIGITS
+
+from .models import Ingredient, IngredientMovement, IngredientMovementKind, IngredientStockCheckpoint
+
+ZERO = Decimal("0")
+_QTY = DecimalField(max_digits=QTY_MAX_DIGITS, decimal_places=QTY_DECIMAL_PLACES)
+KINDS = [k for k, _ in IngredientMovementKind.choices]
+
+
+# ─────────────────── As-of queries ───────────────────
+def with_stock_as_of(qs, day):
+    """Annotate `stock_as_of`: each ingredient's stock at the end of local `day`."""
+    checkpoint = IngredientStockCheckpoint.objects.filter(
+        ingredient=OuterRef("pk"), day__lte=day
+    ).order_by("-day")
+    qs = qs.annotate(
+        cp_day=Subquery(checkpoint.values("day")[:1]),
+        cp_quantity=Subquery(checkpoint.values("quantity")[:1], output_field=_QTY),
+    )
+    tail = (
+        IngredientMovement.objects.filter(
+            ingredient=OuterRef("pk"),
+            business_date__lte=day,
+            business_date__gt=Coalesce(OuterRef("cp_day"), Value(date.min)),
+        )
+        .order_by()
+        .values("ingredient")
+        .annotate(s=Sum("quantity"))
+        .values("s")
+    )
+    return qs.annotate(
+        stock_as_of=(
+            Coalesce("cp_quantity", Value(ZERO, output_field=_QTY), output_field=_QTY)
+            + Coalesce(Subquery(tail, output_field=_QTY), Value(ZERO, output_field=_QTY), output_field=_QTY)
+        )
+    )
+
+
+def stock_as_of(day, ids=None) -> dict[int, Decimal]:
+    """{ingredient_id: stock at the end of `day`} in one query."""
+    qs = Ingredient.objects.all()
+    if ids is not None:
+        qs = qs.filter(id__in=ids)
+    return dict(with_stock_as_of(qs, day).values_list("id", "stock_as_of"))
+
+
+def _by_kind(rows, key) -> dict:
+    out: dict = {}
+    for r in rows:
+        out.setdefault(r[key], dict.fromkeys(KINDS, ZERO))[r["kind"]] += r["s"] or ZERO
+    return out
+
+
+def daily_history(ingredient_id: int, date_from, date_to) -> list[dict]:
+    """One row per day of [date_from, date_to]: movements by kind and closing stock."""
+    opening = stock_as_of(date_from - timedelta(days=1), [ingredient_id]).get(ingredient_id, ZERO)
+    days = _by_kind(
+        IngredientMovement.objects.filter(
+            ingredient_id=ingredient_id, business_date__gte=date_from, business_date__lte=date_to
+        ).values("business_date", "kind").annotate(s=Sum("quantity")).order_by(),
+        "business_date",
+    )
+    running, out, day = opening, [], date_from
+    while day <= date_to:
+        moves = days.get(day, dict.fromkeys(KINDS, ZERO))
+        net = sum(moves.values(), ZERO)
+        out.append({
+            "date": day.isoformat(),
+            "opening": str(running),
+            **{k: str(v) for k, v in moves.items()},
+            "net": str(net),
+            "closing": str(running + net),
+        })
+        running += net
+        day += timedelta(days=1)
+    return out
+
+
+def movement_report(date_from, date_to) -> list[dict]:
+    """Per ingredient over the range: opening, Σ by kind, closing, and the
+    revision variance (stock-take corrections) valued at avg_cost_uzs."""
+    totals = _by_kind(
+        IngredientMovement.objects.filter(business_date__gte=date_from, business_date__lte=date_to)
+        .values("ingredient_id", "kind").annotate(s=Sum("quantity")).order_by(),
+        "ingredient_id",
+    )
+    ingredients = with_stock_as_of(
+        Ingredient.objects.select_related("unit"), date_from - timedelta(days=1)
+    ).order_by("name")
+    rows = []
+    for ing in ingredients:
+        moves = totals.get(ing.id, dict.fromkeys(KINDS, ZERO))
+        if ing.is_archived and not any(moves.values()) and not ing.stock_as_of:
+            continue
+        net = sum(moves.values(), ZERO)
+        variance = moves[IngredientMovementKind.REVISION]
+        rows.append({
+            "ingredient_id": ing.id,
+            "name": ing.name,
+            "unit": ing.unit.short,
+            "opening": str(ing.stock_as_of),
+            **{k: str(v) for k, v in moves.items()},
+            "closing": str(ing.stock_as_of + net),
+            "variance_value_uzs": str((variance * ing.avg_cost_uzs).quantize(Decimal("0.01"))),
+        })
+    return rows
+
+
+# ─────────────────── Checkpoints ───────────────────
+def build_checkpoints(until=None) -> int:
+    """Write the missing daily checkpoints of every ingredient up to `until`
+    (default yesterday), continuing from each one's last checkpoint. One grouped
+    query reads the daily totals of all ingredients; returns rows created."""
+    until = until or timezone.localdate() - timedelta(days=1)
+    last = IngredientStockCheckpoint.objects.filter(ingredient=OuterRef("pk")).order_by("-day")
+    first_move = (
+        IngredientMovement.objects.filter(ingredient=OuterRef("pk"))
+        .order_by().values("ingredient").annotate(m=Min("business_date")).values("m")
+    )
+    with transaction.atomic():
+        starts = {}
+        for ing_id, cp_day, cp_qty, first in Ingredient.objects.annotate(
+            cp_day=Subquery(last.values("day")[:1]),
+            cp_quantity=Subquery(last.values("quantity")[:1], output_field=_QTY),
+            first=Subquery(first_move),
+        ).values_list("id", "cp_day", "cp_quantity", "first"):
+            if cp_day is not None:
+                if cp_day < until:
+                    starts[ing_id] = (cp_day + timedelta(days=1), cp_qty)
+            elif first is not None and first <= until:
+                starts[ing_id] = (first, ZERO)
+        if not starts:
+            return 0
+
+        lower = min(start for start, _ in starts.values())
+        totals: dict = {}
+        for r in (
+            IngredientMovement.objects.filter(
+                ingredient_id__in=starts, business_date__gte=lower, business_date__lte=until
+            ).values("ingredient_id", "business_date").annotate(s=Sum("quantity")).order_by()
+        ):
+            totals[(r["ingredient_id"], r["business_date"])] = r["s"]
+
+        rows = []
+        for ing_id, (day, running) in starts.items():
+            while day <= until:
+                running += totals.get((ing_id, day), ZERO)
+                rows.append(IngredientStockCheckpoint(ingredient_id=ing_id, day=day, quantity=running))
+                day += timedelta(days=1)
+        IngredientStockCheckpoint.objects.bulk_create(rows, batch_size=2000, ignore_conflicts=True)
+    return len(rows)
+
+
+# ─────────────────── Invalidation ───────────────────
+def invalidate(ingredient_id: int, day) -> None:
+    """Drop the ingredient's checkpoints from `day` onwards."""
+    IngredientStockCheckpoint.objects.filter(ingredient_id=ingredient_id, day__gte=day).delete()
+
+
+def invalidate_movements(movements) -> None:
+    """Drop checkpoints covering any of the (just written) movement rows — one DELETE."""
+    first: dict = {}
+    for m in movements:
+        if m.ingredient_id not in first or m.business_date < first[m.ingredient_id]:
+            first[m.ingredient_id] = m.business_date
+    if not first:
+        return
+    today = timezone.localdate()
+    stale = Q()
+    for ingredient_id, day in first.items():
+        if day <= today:
+            stale |= Q(ingredient_id=ingredient_id, day__gte=day)
+    if stale:
+        IngredientStockCheckpoint.objects.filter(stale).delete()
+
+
+def _on_change(sender, instance, **kwargs):
+    if instance.business_date is not None:
+        invalidate(instance.ingredient_id, instance.business_date)
+
+
+def connect_signals() -> None:
+    post_save.connect(_on_change, sender=IngredientMovement, dispatch_uid="ingredient_checkpoint_save")
+    post_delete.connect(_on_change, sender=IngredientMovement, dispatch_uid="ingredient_checkpoint_delete")
@@ -0,0 +1,221 @@
+"""FIFO lot costing for ingredients.
+
+Every purchase opens an IngredientLot at its UZS unit cost; stock that arrives
+any other way (a revision finding more than the books, opening stock) opens a
+lot at the ingredient's Ombor price (avg_cost_uzs). Production consumption
+and downward revisions draw the oldest open lots first, and the cost drawn is
+stored on ProductionIngredientUsage.cost_uzs — COS reports sum recorded costs
+instead of re-pricing recipes.
+
+`draw` serves any number of demands with one locked read of the open lots of
+every touched ingredient (FIFO order) and one bulk UPDATE of the lots it cut,
+so a whole shift of production costs two statements, not one per lot per
+ingredient. Demand beyond the open lots (stock driven negative, history from
+before lots) is costed at the Ombor price.
+
+Lock order: callers lock the ingredients (apps.inventory.stock.lock) before
+touching their lots.
+"""
+from collections import deque
+from decimal import Decimal
+
+from django.db.models import DecimalField, ExpressionWrapper, F, OuterRef, Subquery, Sum
+
+from apps.core.constants import MONEY_DECIMAL_PLACES, MONEY_MAX_DIGITS, Currency
+
+from .models import IngredientLot, IngredientMovementKind
+
+ZERO = Decimal("0")
+CENT = Decimal("0.01")
+
+
+def unit_cost(purchase, ingredient) -> Decimal:
+    """UZS cost per unit of a purchase. Non-UZS purchases carry no rate to
+    convert with, so they are costed at the Ombor price like other stock."""
+    if purchase.currency == Currency.UZS:
+        return purchase.unit_price
+    return ingredient.avg_cost_uzs
+
+
+def lot(ingredient_id: int, quantity, unit_cost_uzs, *, received_at, purchase=None, on_hand=None) -> IngredientLot:
+    """An unsaved lot; pass it (with others) to `receive`.
+
+    `on_hand` is the ingredient's stock after the receipt: the part of it that
+    only fills negative stock was already costed (at the Ombor price) when it
+    was drawn, so it is not left open.
+    """
+    quantity = Decimal(str(quantity))
+    remaining = quantity if on_hand is None else max(ZERO, min(quantity, on_hand))
+    return IngredientLot(
+        ingredient_id=ingredient_id,
+        purchase=purchase,
+        received_at=received_at,
+        quantity=quantity,
+        remaining=remaining,
+        unit_cost_uzs=Decimal(str(unit_cost_uzs)).quantize(CENT),
+    )
+
+
+def receive(lots) -> list[IngredientLot]:
+    return IngredientLot.objects.bulk_create([l for l in lots if l.remaining > 0])
+
+
+def draw(demands, ingredients: dict) -> list[Decimal]:
+    """demands: [(ingredient_id, quantity)] → the FIFO cost of each, in order.
+
+    `ingredients` is {id: Ingredient} for every demanded ingredient, already
+    locked by the caller; its avg_cost_uzs prices demand the lots can't cover.
+    """
+    ids = {ing_id for ing_id, qty in demands if qty > 0}
+    queues: dict[int, deque] = {ing_id: deque() for ing_id in ids}
+    for open_lot in (
+        IngredientLot.objects.select_for_update()
+        .filter(ingredient_id__in=ids, remaining__gt=0)
+        .order_by("ingredient_id", "received_at", "id")
+    ):
+        queues[open_lot.ingredient_id].append(open_lot)
+
+    cut, costs = {}, []
+    for ing_id, qty in demands:
+        left, cost = Decimal(str(qty)), ZERO
+        queue = queues.get(ing_id, ())
+        while left > 0 and queue:
+            head = queue[0]
+            take = min(left, head.remaining)
+            head.remaining -= take
+            cost += take * head.unit_cost_uzs
+            left -= take
+            cut[head.id] = head
+            if not head.remaining:
+                queue.popleft()
+        if left > 0:
+            cost += left * ingredients[ing_id].avg_cost_uzs
+        costs.append(cost.quantize(CENT))
+    if cut:
+        IngredientLot.objects.bulk_update(list(cut.values()), ["remaining"])
+    return costs
+
+
+def follow(movements, ingredients: dict) -> None:
+    """Keep lots in step with revision movements (called by stock.apply):
+    surplus opens a lot at the Ombor price, shortage draws FIFO.
+    `ingredients` carries the quantities after the movements."""
+    revisions = [m for m in movements if m.kind == IngredientMovementKind.REVISION]
+    surplus: dict[int, IngredientLot] = {}
+    for m in revisions:
+        if m.quantity > 0:
+            ing = ingredients[m.ingredient_id]
+            if m.ingredient_id in surplus:
+                surplus[m.ingredient_id].quantity += m.quantity
+            else:
+                surplus[m.ingredient_id] = lot(ing.id, m.quantity, ing.avg_cost_uzs, received_at=m.occurred_at)
+    for ing_id, new in surplus.items():
+        new.remaining = max(ZERO, min(new.quantity, ingredients[ing_id].quantity))
+    receive(surplus.values())
+    draw([(m.ingredient_id, -m.quantity) for m in revisions if m.quantity < 0], ingredients)
+
+
+def sync_purchase(purchase, ingredient, *, old_ingredient_id, old_quantity) -> None:
+    """Re-fit a purchase's lot after the purchase was edited (inside atomic,
+    ingredients locked, `ingredient` carrying its stock after the edit). What
+    was already drawn stays drawn — past usages keep the cost they recorded;
+    only the rest follows the new quantity and price."""
+    existing = IngredientLot.objects.select_for_update().filter(purchase=purchase).first()
+    if old_ingredient_id != purchase.ingredient_id:
+        # What was drawn was used as the old ingredient: it stays there as a
+        # closed lot, and the new ingredient receives the purchase afresh.
+        if existing is not None:
+            drawn = existing.quantity - existing.remaining
+            if drawn > 0:
+                existing.purchase = None
+                existing.quantity, existing.remaining = drawn, ZERO
+                existing.save(update_fields=["purchase", "quantity", "remaining", "updated_at"])
+            else:
+                existing.delete()
+        receive([lot(purchase.ingredient_id, purchase.quantity, unit_cost(purchase, ingredient),
+                     received_at=purchase.occurred_at, purchase=purchase, on_hand=ingredient.quantity)])
+        return
+    # A purchase without a lot predates lot costing and was used up long ago.
+    drawn = (existing.quantity - existing.remaining) if existing else Decimal(str(old_quantity))
+    remaining = max(ZERO, purchase.quantity - drawn)
+    if existing is None:
+        if remaining > 0:
+            new = lot(purchase.ingredient_id, purchase.quantity, unit_cost(purchase, ingredient),
+                      received_at=purchase.occurred_at, purchase=purchase)
+            new.remaining = remaining
+            new.save()
+        return
+    existing.received_at = purchase.occurred_at
+    existing.quantity = purchase.quantity
+    existing.remaining = remaining
+    existing.unit_cost_uzs = unit_cost(purchase, ingredient).quantize(CENT)
+    existing.save(update_fields=["received_at", "quantity", "remaining", "unit_cost_uzs", "updated_at"])
+
+
+def open_value(ids=None) -> dict[int, Decimal]:
+    """{ingredient_id: Σ remaining × unit cost} of the open lots — FIFO stock value."""
+    qs = IngredientLot.objects.filter(remaining__gt=0)
+    if ids is not None:
+        qs = qs.filter(ingredient_id__in=ids)
+    value = ExpressionWrapper(
+        F("remaining") * F("unit_cost_uzs"),
+        output_field=DecimalField(max_digits=MONEY_MAX_DIGITS + 4, decimal_places=MONEY_DECIMAL_PLACES + 3),
+    )
+    return {
+        r["ingredient_id"]: r["v"].quantize(CENT)
+        for r in qs.values("ingredient_id").annotate(v=Sum(value)).order_by()
+    }
+
+
+# ─────────────────── Backfill ───────────────────
+def backfill_lots(get_model) -> int:
+    """Open lots for the current stock of ingredients that have none yet.
+
+    Under FIFO what is left is what came in last, so each ingredient's stock
+    is matched against its purchases newest first (UZS ones at their unit
+    price, others at the Ombor price); any stock the purchases don't explain
+    becomes one opening lot at the Ombor price, oldest of all. Historical
+    usages get cost_uzs at the Ombor price — the basis reports used before.
+    `get_model` is `apps.get_model`. Returns the number of lots opened.
+    """
+    Ingredient_ = get_model("inventory", "Ingredient")
+    Lot = get_model("inventory", "IngredientLot")
+    Purchase_ = get_model("inventory", "Purchase")
+    Usage = get_model("production", "ProductionIngredientUsage")
+
+    price = Ingredient_.objects.filter(pk=OuterRef("ingredient_id")).values("avg_cost_uzs")[:1]
+    Usage.objects.filter(cost_uzs=0).update(cost_uzs=ExpressionWrapper(
+        F("quantity_used") * Subquery(price),
+        output_field=DecimalField(max_digits=MONEY_MAX_DIGITS, decimal_places=MONEY_DECIMAL_PLACES),
+    ))
+
+    done = Lot.objects.values("ingredient_id")
+    todo = {
+        ing.id: ing
+        for ing in Ingredient_.objects.filter(quantity__gt=0).exclude(id__in=done)
+        .only("id", "quantity", "avg_cost_uzs", "created_at")
+    }
+    purchases: dict[int, list] = {}
+    for p in Purchase_.objects.filter(ingredient_id__in=todo).order_by("-occurred_at", "-id"):
+        purchases.setdefault(p.ingredient_id, []).append(p)
+
+    rows = []
+    for ing in todo.values():
+        left, oldest = ing.quantity, ing.created_at
+        for p in purchases.get(ing.id, ()):
+            if left <= 0:
+                break
+            take = min(left, p.quantity)
+            rows.append(Lot(
+                ingredient_id=ing.id, purchase_id=p.id, received_at=p.occurred_at,
+                quantity=p.quantity, remaining=take, unit_cost_uzs=unit_cost(p, ing).quantize(CENT),
+            ))
+            left -= take
+            oldest = min(oldest, p.occurred_at)
+        if left > 0:
+            rows.append(Lot(
+                ingredient_id=ing.id, received_at=oldest,
+                quantity=left, remaining=left, unit_cost_uzs=ing.avg_cost_uzs,
+            ))
+    Lot.objects.bulk_create(rows, batch_size=2000)
+    return len(rows)
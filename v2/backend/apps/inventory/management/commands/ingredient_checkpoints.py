@@ -0,0 +1,32 @@
+"""
+Write daily ingredient stock checkpoints (see apps.inventory.history).
+
+Usage:
+    python manage.py ingredient_checkpoints                   # up to yesterday
+    python manage.py ingredient_checkpoints --until 2026-01-31
+
+Run daily after midnight (cron), next to kassa_checkpoints. Continues from
+each ingredient's last checkpoint, so it is cheap to run repeatedly.
+"""
+from datetime import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.inventory.history import build_checkpoints
+
+
+class Command(BaseCommand):
+    help = "Write missing daily IngredientStockCheckpoint rows."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--until", help="Last day to checkpoint (YYYY-MM-DD), default yesterday.")
+
+    def handle(self, *args, **options):
+        until = None
+        if options["until"]:
+            try:
+                until = datetime.strptime(options["until"], "%Y-%m-%d").date()
+            except ValueError:
+                raise CommandError("--until must be YYYY-MM-DD")
+        created = build_checkpoints(until)
+        self.stdout.write(self.style.SUCCESS(f"Created {created} checkpoints."))
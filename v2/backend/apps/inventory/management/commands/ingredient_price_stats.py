@@ -0,0 +1,32 @@
+"""
+Rebuild ingredient purchase price statistics (see apps.inventory.price_stats).
+
+Usage:
+    python manage.py ingredient_price_stats                   # as of today
+    python manage.py ingredient_price_stats --day 2026-01-31
+
+The daily rebuild runs as the `inventory.refresh_price_stats` celery beat
+task (config/celery.py); use this command to backfill or rebuild by hand.
+"""
+from datetime import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.inventory.price_stats import refresh
+
+
+class Command(BaseCommand):
+    help = "Rebuild IngredientPriceStats for every ingredient."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--day", help="As-of day (YYYY-MM-DD), default today.")
+
+    def handle(self, *args, **options):
+        day = None
+        if options["day"]:
+            try:
+                day = datetime.strptime(options["day"], "%Y-%m-%d").date()
+            except ValueError:
+                raise CommandError("--day must be YYYY-MM-DD")
+        written = refresh(day=day)
+        self.stdout.write(self.style.SUCCESS(f"Wrote {written} price stats rows."))
@@ -0,0 +1,41 @@
+# Generated by Django 5.1.15 on 2026-10-19 03:19
+
+from django.conf import settings
+from django.db import migrations, models
+
+from apps.core.models import backfill_business_date
+
+SOURCES = [
+    ("Purchase", "occurred_at"),
+]
+
+
+def backfill(apps, schema_editor):
+    for model_name, source in SOURCES:
+        backfill_business_date(apps.get_model("inventory", model_name), source, schema_editor)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('finance', '0009_business_date'),
+        ('inventory', '0002_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='purchase',
+            name='business_date',
+            field=models.DateField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='purchase',
+            index=models.Index(fields=['business_date', 'currency'], name='inventory_p_busines_4d9e3f_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='purchase',
+            index=models.Index(fields=['ingredient', 'business_date'], name='inventory_p_ingredi_9c0cf9_idx'),
+        ),
+        migrations.RunPython(backfill, migrations.RunPython.noop),
+    ]
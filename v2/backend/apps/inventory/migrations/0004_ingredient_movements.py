@@ -0,0 +1,61 @@
+# Generated by Django 5.1.15 on 2026-10-19 03:33
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+from apps.inventory.stock import backfill_movements
+
+
+def backfill(apps, schema_editor):
+    # Replay purchases, production usages and revisions into the new ledger,
+    # plus one opening row per ingredient for whatever history cannot explain.
+    backfill_movements(apps.get_model)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0003_business_date'),
+        ('production', '0005_business_date'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='IngredientMovement',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(auto_now_add=True, db_index=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('business_date', models.DateField(blank=True, editable=False, null=True)),
+                ('kind', models.CharField(choices=[('purchase', 'Xarid'), ('consumption', 'Ishlab chiqarish'), ('revision', 'Taftish'), ('reversal', 'Bekor qilish')], max_length=16)),
+                ('quantity', models.DecimalField(decimal_places=3, help_text='Positive = in, negative = out', max_digits=14)),
+                ('reference_id', models.PositiveIntegerField(blank=True, null=True)),
+                ('reference_model', models.CharField(blank=True, max_length=64)),
+                ('note', models.CharField(blank=True, max_length=255)),
+                ('occurred_at', models.DateTimeField()),
+                ('created_by', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='ingredient_movements', to=settings.AUTH_USER_MODEL)),
+                ('ingredient', models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='movements', to='inventory.ingredient')),
+            ],
+            options={
+                'ordering': ['-occurred_at', '-id'],
+                'indexes': [models.Index(fields=['ingredient', 'business_date'], name='inventory_i_ingredi_6d8caf_idx'), models.Index(fields=['ingredient', '-occurred_at'], name='inventory_i_ingredi_ca76ba_idx'), models.Index(fields=['business_date', 'kind'], name='inventory_i_busines_127610_idx'), models.Index(fields=['reference_model', 'reference_id'], name='inventory_i_referen_4c299f_idx')],
+            },
+        ),
+        migrations.CreateModel(
+            name='IngredientStockCheckpoint',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('quantity', models.DecimalField(decimal_places=3, max_digits=14)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('ingredient', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='checkpoints', to='inventory.ingredient')),
+            ],
+            options={
+                'ordering': ['ingredient', '-day'],
+                'constraints': [models.UniqueConstraint(fields=('ingredient', 'day'), name='ingredient_checkpoint_day')],
+            },
+        ),
+        migrations.RunPython(backfill, migrations.RunPython.noop),
+    ]
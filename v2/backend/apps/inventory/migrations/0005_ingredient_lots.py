@@ -0,0 +1,32 @@
+# Generated by Django 5.1.15 on 2026-10-19 03:40
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0004_ingredient_movements'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='IngredientLot',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(auto_now_add=True, db_index=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('received_at', models.DateTimeField()),
+                ('quantity', models.DecimalField(decimal_places=3, max_digits=14)),
+                ('remaining', models.DecimalField(decimal_places=3, max_digits=14)),
+                ('unit_cost_uzs', models.DecimalField(decimal_places=2, max_digits=16)),
+                ('ingredient', models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='lots', to='inventory.ingredient')),
+                ('purchase', models.OneToOneField(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='lot', to='inventory.purchase')),
+            ],
+            options={
+                'ordering': ['ingredient', 'received_at', 'id'],
+                'indexes': [models.Index(condition=models.Q(('remaining__gt', 0)), fields=['ingredient', 'received_at', 'id'], name='ingredient_lot_open_fifo')],
+            },
+        ),
+    ]
@@ -0,0 +1,45 @@
+# Generated by Django 5.1.15 on 2026-10-19 03:47
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+from apps.inventory.price_stats import refresh
+
+
+def first_refresh(apps, schema_editor):
+    # Readers only read the table; fill it now instead of at the first beat run.
+    refresh(get_model=apps.get_model)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0005_ingredient_lots'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='IngredientPriceStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('window_days', models.PositiveSmallIntegerField()),
+                ('day', models.DateField(help_text='Last day of the window (as-of date)')),
+                ('purchase_count', models.PositiveIntegerField()),
+                ('last_price', models.DecimalField(decimal_places=2, max_digits=16)),
+                ('last_purchase_at', models.DateTimeField()),
+                ('last_note', models.TextField(blank=True)),
+                ('min_price', models.DecimalField(decimal_places=2, max_digits=16)),
+                ('max_price', models.DecimalField(decimal_places=2, max_digits=16)),
+                ('avg_price', models.DecimalField(decimal_places=2, help_text='Quantity-weighted: Σ total_price / Σ quantity', max_digits=16)),
+                ('stddev_price', models.DecimalField(decimal_places=2, max_digits=16)),
+                ('volatility_pct', models.DecimalField(decimal_places=2, help_text='Coefficient of variation of the unit price, stddev / mean × 100', max_digits=7)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('ingredient', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='price_stats', to='inventory.ingredient')),
+            ],
+            options={
+                'ordering': ['ingredient', 'window_days'],
+                'constraints': [models.UniqueConstraint(fields=('ingredient', 'window_days'), name='ingredient_price_stats_window')],
+            },
+        ),
+        migrations.RunPython(first_refresh, migrations.RunPython.noop),
+    ]
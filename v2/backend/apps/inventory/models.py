@@ -9,7 +9,7 @@ from apps.core.constants import (
     QTY_MAX_DIGITS,
     Currency,
 )
-from apps.core.models import ArchivableModel, TimestampedModel
+from apps.core.models import ArchivableModel, BusinessDateModel, TimestampedModel
 
 
 class Unit(TimestampedModel):
@@ -52,7 +52,7 @@ class Ingredient(TimestampedModel, ArchivableModel):
         return self.name
 
 
-class Purchase(TimestampedModel):
+class Purchase(BusinessDateModel, TimestampedModel):
     """
     Ingredient purchase — unifies v1's two Purchase models (inventory + reports).
 
@@ -90,6 +90,8 @@ class Purchase(TimestampedModel):
         ordering = ["-occurred_at"]
         indexes = [
             models.Index(fields=["ingredient", "-occurred_at"]),
+            models.Index(fields=["business_date", "currency"]),
+            models.Index(fields=["ingredient", "business_date"]),
         ]
 
     def __str__(self) -> str:
@@ -115,3 +117,156 @@ class ProductRecipe(TimestampedModel):
 
     def __str__(self) -> str:
         return f"{self.product.name} ← {self.amount_per_meshok} {self.ingredient.unit.short} {self.ingredient.name}"
+
+
+class IngredientMovementKind(models.TextChoices):
+    PURCHASE = "purchase", "Xarid"
+    CONSUMPTION = "consumption", "Ishlab chiqarish"
+    REVISION = "revision", "Taftish"
+    REVERSAL = "reversal", "Bekor qilish"
+
+
+class IngredientMovement(BusinessDateModel, TimestampedModel):
+    """Append-only ledger of every ingredient stock change.
+
+    Positive quantity = stock in, negative = stock out. Ingredient.quantity
+    caches Σ quantity of an ingredient's rows; apps.inventory.stock writes the
+    rows together with the cached quantity.
+    """
+
+    ingredient = models.ForeignKey(
+        Ingredient, on_delete=models.PROTECT, related_name="movements"
+    )
+    kind = models.CharField(max_length=16, choices=IngredientMovementKind.choices)
+    quantity = models.DecimalField(
+        max_digits=QTY_MAX_DIGITS, decimal_places=QTY_DECIMAL_PLACES,
+        help_text="Positive = in, negative = out",
+    )
+    # Typed loose reference, as on KassaTransaction.
+    reference_id = models.PositiveIntegerField(null=True, blank=True)
+    reference_model = models.CharField(max_length=64, blank=True)
+    note = models.CharField(max_length=255, blank=True)
+    occurred_at = models.DateTimeField()
+    created_by = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name="ingredient_movements",
+    )
+
+    class Meta:
+        ordering = ["-occurred_at", "-id"]
+        indexes = [
+            models.Index(fields=["ingredient", "business_date"]),
+            models.Index(fields=["ingredient", "-occurred_at"]),
+            models.Index(fields=["business_date", "kind"]),
+            models.Index(fields=["reference_model", "reference_id"]),
+        ]
+
+    def __str__(self) -> str:
+        return f"{self.get_kind_display()} {self.quantity:+} · {self.ingredient.name}"
+
+
+class IngredientStockCheckpoint(models.Model):
+    """Ledger stock of one ingredient at the end of a (local) day.
+
+    Written daily by `manage.py ingredient_checkpoints`; the stock on any day
+    is the last checkpoint before it plus the IngredientMovement rows since
+    (apps.inventory.stock). Checkpoints from a day onwards are dropped when a
+    movement dated on or before that day is written or removed.
+    """
+
+    ingredient = models.ForeignKey(
+        Ingredient, on_delete=models.CASCADE, related_name="checkpoints"
+    )
+    day = models.DateField()
+    quantity = models.DecimalField(
+        max_digits=QTY_MAX_DIGITS, decimal_places=QTY_DECIMAL_PLACES
+    )
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ["ingredient", "-day"]
+        constraints = [
+            models.UniqueConstraint(fields=["ingredient", "day"], name="ingredient_checkpoint_day"),
+        ]
+
+
+class IngredientLot(TimestampedModel):
+    """FIFO cost layer — a quantity of an ingredient received at one unit cost.
+
+    Every purchase opens a lot; stock found by a revision opens one at the
+    Ombor price. Consumption and downward revisions draw the oldest open lots
+    first (apps.inventory.lots), so `remaining` falls to 0 as a lot is used up.
+    """
+
+    ingredient = models.ForeignKey(
+        Ingredient, on_delete=models.PROTECT, related_name="lots"
+    )
+    # Null for lots not opened by a purchase (revision surplus, opening stock).
+    purchase = models.OneToOneField(
+        Purchase, on_delete=models.CASCADE, null=True, blank=True, related_name="lot"
+    )
+    received_at = models.DateTimeField()
+    quantity = models.DecimalField(
+        max_digits=QTY_MAX_DIGITS, decimal_places=QTY_DECIMAL_PLACES
+    )
+    remaining = models.DecimalField(
+        max_digits=QTY_MAX_DIGITS, decimal_places=QTY_DECIMAL_PLACES
+    )
+    unit_cost_uzs = models.DecimalField(
+        max_digits=MONEY_MAX_DIGITS, decimal_places=MONEY_DECIMAL_PLACES
+    )
+
+    class Meta:
+        ordering = ["ingredient", "received_at", "id"]
+        indexes = [
+            # Open lots in FIFO order — the only rows a draw reads.
+            models.Index(
+                fields=["ingredient", "received_at", "id"],
+                condition=models.Q(remaining__gt=0),
+                name="ingredient_lot_open_fifo",
+            ),
+        ]
+
+    def __str__(self) -> str:
+        return f"{self.ingredient.name} · {self.remaining}/{self.quantity} @ {self.unit_cost_uzs}"
+
+
+class IngredientPriceStats(models.Model):
+    """Purchase price statistics of one ingredient over the last `window_days`.
+
+    Materialised by apps.inventory.price_stats — rebuilt daily by
+    `manage.py ingredient_price_stats` and per ingredient after a purchase is
+    written — so the Ombor page reads it without scanning purchases. Only UZS
+    purchases are counted; other currencies carry no rate to compare with.
+    """
+
+    ingredient = models.ForeignKey(
+        Ingredient, on_delete=models.CASCADE, related_name="price_stats"
+    )
+    window_days = models.PositiveSmallIntegerField()
+    day = models.DateField(help_text="Last day of the window (as-of date)")
+    purchase_count = models.PositiveIntegerField()
+    last_price = models.DecimalField(max_digits=MONEY_MAX_DIGITS, decimal_places=MONEY_DECIMAL_PLACES)
+    last_purchase_at = models.DateTimeField()
+    last_note = models.TextField(blank=True)
+    min_price = models.DecimalField(max_digits=MONEY_MAX_DIGITS, decimal_places=MONEY_DECIMAL_PLACES)
+    max_price = models.DecimalField(max_digits=MONEY_MAX_DIGITS, decimal_places=MONEY_DECIMAL_PLACES)
+    avg_price = models.DecimalField(
+        max_digits=MONEY_MAX_DIGITS, decimal_places=MONEY_DECIMAL_PLACES,
+        help_text="Quantity-weighted: Σ total_price / Σ quantity",
+    )
+    stddev_price = models.DecimalField(max_digits=MONEY_MAX_DIGITS, decimal_places=MONEY_DECIMAL_PLACES)
+    volatility_pct = models.DecimalField(
+        max_digits=7, decimal_places=2,
+        help_text="Coefficient of variation of the unit price, stddev / mean × 100",
+    )
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ["ingredient", "window_days"]
+        constraints = [
+            models.UniqueConstraint(fields=["ingredient", "window_days"], name="ingredient_price_stats_window"),
+        ]
@@ -0,0 +1,157 @@
+"""Purchase price statistics per ingredient (IngredientPriceStats).
+
+For every ingredient and window of 30 / 90 / 365 days up to `day`:
+
+    last        unit price, time and note (supplier) of the newest purchase
+    min / max   unit price
+    avg         Σ total_price / Σ quantity                (quantity-weighted)
+    stddev      sample standard deviation of the unit price
+    volatility  stddev / mean unit price × 100            (coefficient of variation)
+
+One query over Purchase(ingredient, -occurred_at): window functions
+partitioned by ingredient number the purchases newest first and carry every
+window's conditional count / min / max / Σx / Σx² / Σtotal / Σquantity onto
+each row; keeping row 1 leaves one row per ingredient with everything needed.
+Σx and Σx² instead of a STDDEV window keep the query portable (SQLite has no
+STDDEV window function); the variance is finished in Python.
+
+The result is materialised and readers only read it. `refresh` writes it:
+once from migration 0006, daily from the `inventory.refresh_price_stats`
+beat task (or `manage.py ingredient_price_stats`), and for an ingredient
+once a transaction writing one of its purchases commits. Rows are upserted on
+(ingredient, window_days), and only rows that dropped out are deleted, so
+concurrent refreshes cannot collide on the unique constraint.
+"""
+from datetime import timedelta
+from decimal import Decimal
+
+from django.db.models import Case, Count, DecimalField, F, Max, Min, Q, Sum, When, Window
+from django.db.models.functions import RowNumber
+from django.db.models.signals import post_delete, post_save
+from django.utils import timezone
+
+from apps.core.constants import MONEY_DECIMAL_PLACES, MONEY_MAX_DIGITS, Currency
+from apps.core.deferred import defer
+
+from .models import IngredientPriceStats, Purchase
+
+WINDOWS = (30, 90, 365)
+ZERO = Decimal("0")
+CENT = Decimal("0.01")
+_SQUARES = DecimalField(max_digits=MONEY_MAX_DIGITS * 2, decimal_places=MONEY_DECIMAL_PLACES * 2)
+
+
+def _models(get_model):
+    """(Purchase, IngredientPriceStats) from `get_model` (a migration's
+    historical registry) or the live ones."""
+    if get_model is None:
+        return Purchase, IngredientPriceStats
+    return get_model("inventory", "Purchase"), get_model("inventory", "IngredientPriceStats")
+
+
+def _window_rows(day, ids=None, get_model=None):
+    """One row per ingredient with a UZS purchase in the longest window."""
+    qs = _models(get_model)[0].objects.filter(
+        currency=Currency.UZS, quantity__gt=0,
+        business_date__gt=day - timedelta(days=max(WINDOWS)), business_date__lte=day,
+    )
+    if ids is not None:
+        qs = qs.filter(ingredient_id__in=ids)
+    part = [F("ingredient_id")]
+    stats = {"rn": Window(RowNumber(), partition_by=part, order_by=[F("occurred_at").desc(), F("id").desc()])}
+    for w in WINDOWS:
+        inside = Q(business_date__gt=day - timedelta(days=w))
+        price = Case(When(inside, then=F("unit_price")))
+        stats.update({
+            f"n{w}": Window(Count(price), partition_by=part),
+            f"lo{w}": Window(Min(price), partition_by=part),
+            f"hi{w}": Window(Max(price), partition_by=part),
+            f"sx{w}": Window(Sum(price), partition_by=part),
+            f"sxx{w}": Window(Sum(Case(When(inside, then=F("unit_price") * F("unit_price")),
+                                       output_field=_SQUARES)), partition_by=part),
+            f"total{w}": Window(Sum(Case(When(inside, then=F("total_price")))), partition_by=part),
+            f"qty{w}": Window(Sum(Case(When(inside, then=F("quantity")))), partition_by=part),
+        })
+    return (
+        qs.annotate(**stats).filter(rn=1)
+        .values("ingredient_id", "unit_price", "occurred_at", "note", *stats)
+    )
+
+
+def _stddev(n: int, sx: Decimal, sxx: Decimal) -> Decimal:
+    if n < 2:
+        return ZERO
+    variance = (sxx - sx * sx / n) / (n - 1)
+    return variance.sqrt() if variance > 0 else ZERO
+
+
+def compute(day, ids=None, get_model=None) -> list[IngredientPriceStats]:
+    """Unsaved stats rows as of `day` for `ids` (None = every ingredient)."""
+    Stats = _models(get_model)[1]
+    rows = []
+    for r in _window_rows(day, ids, get_model):
+        for w in WINDOWS:
+            n = r[f"n{w}"]
+            if not n:
+                continue
+            sx, sxx, qty = Decimal(r[f"sx{w}"]), Decimal(r[f"sxx{w}"]), Decimal(r[f"qty{w}"])
+            mean, stddev = sx / n, _stddev(n, sx, sxx)
+            rows.append(Stats(
+                ingredient_id=r["ingredient_id"],
+                window_days=w,
+                day=day,
+                purchase_count=n,
+                last_price=r["unit_price"],
+                last_purchase_at=r["occurred_at"],
+                last_note=r["note"],
+                min_price=r[f"lo{w}"],
+                max_price=r[f"hi{w}"],
+                avg_price=(Decimal(r[f"total{w}"]) / qty).quantize(CENT) if qty else mean.quantize(CENT),
+                stddev_price=stddev.quantize(CENT),
+                volatility_pct=(stddev / mean * 100).quantize(CENT) if mean else ZERO,
+            ))
+    return rows
+
+
+_UPDATE_FIELDS = [
+    "day", "purchase_count", "last_price", "last_purchase_at", "last_note",
+    "min_price", "max_price", "avg_price", "stddev_price", "volatility_pct", "updated_at",
+]
+
+
+def refresh(ids=None, day=None, get_model=None) -> int:
+    """Rewrite the stats of `ids` (None = all) as of `day` (default today).
+
+    `get_model` is `apps.get_model` when called from a migration.
+    """
+    day = day or timezone.localdate()
+    Stats = _models(get_model)[1]
+    # Key order, so concurrent upserts lock rows in the same order.
+    rows = sorted(compute(day, ids, get_model), key=lambda r: (r.ingredient_id, r.window_days))
+    kept = Q(pk__in=[])
+    for w in WINDOWS:
+        kept |= Q(window_days=w, ingredient_id__in=[r.ingredient_id for r in rows if r.window_days == w])
+    gone = Stats.objects.exclude(kept)
+    if ids is not None:
+        gone = gone.filter(ingredient_id__in=ids)
+    gone.delete()
+    Stats.objects.bulk_create(
+        rows, batch_size=2000, update_conflicts=True,
+        unique_fields=["ingredient", "window_days"], update_fields=_UPDATE_FIELDS,
+    )
+    return len(rows)
+
+
+# ─────────────────── Invalidation ───────────────────
+def schedule_refresh(ingredient_ids) -> None:
+    """Refresh these ingredients once the current transaction commits."""
+    defer("inventory.price_stats", ingredient_ids, refresh)
+
+
+def _on_change(sender, instance, **kwargs):
+    schedule_refresh([instance.ingredient_id])
+
+
+def connect_signals() -> None:
+    post_save.connect(_on_change, sender=Purchase, dispatch_uid="ingredient_price_stats_save")
+    post_delete.connect(_on_change, sender=Purchase, dispatch_uid="ingredient_price_stats_delete")
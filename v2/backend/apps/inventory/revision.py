@@ -0,0 +1,81 @@
+"""Batch inventory revision (stock-take) engine.
+
+`validate` checks every row before anything is written — ingredients are read
+in one query — and returns the accepted items plus per-row errors. `apply`
+then writes the whole stock-take in the caller's transaction with a constant
+number of statements: one id-ordered lock (apps.inventory.stock.lock), one
+bulk_create of the InventoryRevisionReport rows sharing a batch_id, then one
+UPDATE ... CASE and one bulk_create of the revision movements (stock.apply).
+"""
+import uuid
+from decimal import Decimal, InvalidOperation
+
+from apps.production.models import InventoryRevisionReport
+
+from . import stock
+from .models import Ingredient, IngredientMovementKind
+
+MAX_ITEMS = 2000
+
+
+def validate(rows, *, note: str = "") -> tuple[list[dict], list[dict]]:
+    """rows: [{"ingredient_id", "new_quantity" [, "note"]}] → (items, errors).
+
+    Each item is {"ingredient_id", "new_quantity", "note"}; a row's own note
+    wins over the session `note`. An ingredient may appear only once.
+    """
+    parsed, errors, seen = [], [], set()
+    for line, row in enumerate(rows, start=1):
+        try:
+            ing_id = int(row["ingredient_id"])
+            new_qty = Decimal(str(row["new_quantity"]))
+            if not new_qty.is_finite():
+                raise InvalidOperation
+        except (KeyError, TypeError, ValueError, InvalidOperation):
+            errors.append({"row": line, "detail": f"ingredient_id yoki new_quantity noto'g'ri: {row}"})
+            continue
+        if new_qty < 0:
+            errors.append({"row": line, "detail": "new_quantity manfiy bo'lishi mumkin emas."})
+            continue
+        if ing_id in seen:
+            errors.append({"row": line, "detail": f"Xomashyo takrorlangan: {ing_id}"})
+            continue
+        seen.add(ing_id)
+        parsed.append((line, {"ingredient_id": ing_id, "new_quantity": new_qty, "note": row.get("note", "") or note}))
+
+    existing = set(Ingredient.objects.filter(id__in=seen).values_list("id", flat=True))
+    items = []
+    for line, item in parsed:
+        if item["ingredient_id"] not in existing:
+            errors.append({"row": line, "detail": f"Xomashyo topilmadi: {item['ingredient_id']}"})
+        else:
+            items.append(item)
+    errors.sort(key=lambda e: e["row"])
+    return items, errors
+
+
+def apply(items: list[dict], *, user=None, batch_id=None) -> list[InventoryRevisionReport]:
+    """Write validated items (inside atomic); returns the created revision rows."""
+    batch_id = batch_id or uuid.uuid4()
+    locked = stock.lock(item["ingredient_id"] for item in items)
+    reports = InventoryRevisionReport.objects.bulk_create([
+        InventoryRevisionReport(
+            item_type=InventoryRevisionReport.ItemType.INGREDIENT,
+            ingredient=locked[item["ingredient_id"]],
+            old_quantity=locked[item["ingredient_id"]].quantity,
+            new_quantity=item["new_quantity"],
+            note=item["note"],
+            batch_id=batch_id,
+            user=user,
+        )
+        for item in items
+    ])
+    stock.apply(
+        [
+            stock.movement(r.ingredient_id, r.new_quantity - r.old_quantity, IngredientMovementKind.REVISION,
+                           reference=r, note=r.note)
+            for r in reports
+        ],
+        user=user, locked=locked,
+    )
+    return reports
@@ -1,6 +1,6 @@
 from rest_framework import serializers
 
-from .models import Ingredient, ProductRecipe, Purchase, Unit
+from .models import Ingredient, IngredientLot, IngredientMovement, IngredientPriceStats, ProductRecipe, Purchase, Unit
 from apps.production.models import InventoryRevisionReport
 
 
@@ -43,6 +43,48 @@ class PurchaseSerializer(serializers.ModelSerializer):
         read_only_fields = ["unit_price", "created_at"]
 
 
+class IngredientMovementSerializer(serializers.ModelSerializer):
+    ingredient_name = serializers.CharField(source="ingredient.name", read_only=True)
+    ingredient_unit = serializers.CharField(source="ingredient.unit.short", read_only=True)
+    kind_display = serializers.CharField(source="get_kind_display", read_only=True)
+    created_by_name = serializers.CharField(source="created_by.display_name", read_only=True, default="")
+
+    class Meta:
+        model = IngredientMovement
+        fields = [
+            "id", "ingredient", "ingredient_name", "ingredient_unit",
+            "kind", "kind_display", "quantity",
+            "reference_model", "reference_id", "note",
+            "occurred_at", "business_date",
+            "created_by", "created_by_name", "created_at",
+        ]
+        read_only_fields = fields
+
+
+class IngredientLotSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = IngredientLot
+        fields = [
+            "id", "ingredient", "purchase", "received_at",
+            "quantity", "remaining", "unit_cost_uzs", "created_at",
+        ]
+        read_only_fields = fields
+
+
+class IngredientPriceStatsSerializer(serializers.ModelSerializer):
+    ingredient_name = serializers.CharField(source="ingredient.name", read_only=True)
+    unit = serializers.CharField(source="ingredient.unit.short", read_only=True)
+
+    class Meta:
+        model = IngredientPriceStats
+        fields = [
+            "ingredient", "ingredient_name", "unit", "window_days", "day", "purchase_count",
+            "last_price", "last_purchase_at", "last_note",
+            "min_price", "max_price", "avg_price", "stddev_price", "volatility_pct",
+        ]
+        read_only_fields = fields
+
+
 class ProductRecipeSerializer(serializers.ModelSerializer):
     ingredient_name = serializers.CharField(source="ingredient.name", read_only=True)
     ingredient_unit = serializers.CharField(source="ingredient.unit.short", read_only=True)
@@ -0,0 +1,174 @@
+"""Ingredient stock writes — the one write path for Ingredient.quantity.
+
+Every stock change (purchase, production consumption, revision, reversal of
+an edited or deleted purchase) is an IngredientMovement row; Ingredient.quantity
+caches Σ of an ingredient's rows. `apply` writes both:
+
+1. lock every touched ingredient with one SELECT ... FOR UPDATE ordered by id,
+   so two transactions touching overlapping ingredients always queue in the
+   same order instead of deadlocking;
+2. write every new quantity with one UPDATE ... CASE;
+3. write the movement rows with one bulk_create and drop the stock
+   checkpoints they make stale (apps.inventory.history);
+4. keep the FIFO cost lots in step with revision rows (apps.inventory.lots) —
+   purchase and consumption callers open / draw their lots themselves, since
+   they carry the price or need the drawn cost.
+
+`set_to` moves ingredients to absolute quantities (revisions, manual edits).
+Callers wrap the record save and the stock write in one transaction.atomic().
+"""
+from decimal import Decimal
+
+from django.db.models import Case, DecimalField, F, Value, When
+from django.utils import timezone
+
+from apps.core.constants import QTY_DECIMAL_PLACES, QTY_MAX_DIGITS
+from apps.core.models import business_date_of
+
+from . import history, lots
+from .models import Ingredient, IngredientMovement, IngredientMovementKind
+
+ZERO = Decimal("0")
+_QTY = DecimalField(max_digits=QTY_MAX_DIGITS, decimal_places=QTY_DECIMAL_PLACES)
+
+
+def lock(ids) -> dict[int, Ingredient]:
+    """{id: Ingredient} for `ids`, row-locked in id order (call inside atomic)."""
+    ids = sorted(set(ids))
+    if not ids:
+        return {}
+    return {
+        ing.id: ing
+        for ing in Ingredient.objects.select_for_update().filter(id__in=ids).order_by("id")
+    }
+
+
+def set_quantities(quantities: dict) -> int:
+    """quantities: {ingredient_id: new quantity} → one UPDATE ... CASE."""
+    if not quantities:
+        return 0
+    whens = [When(pk=pk, then=Value(qty, output_field=_QTY)) for pk, qty in quantities.items()]
+    return Ingredient.objects.filter(pk__in=list(quantities)).update(
+        quantity=Case(*whens, default=F("quantity"), output_field=_QTY)
+    )
+
+
+def movement(ingredient_id: int, quantity, kind: str, *, reference=None, occurred_at=None, note: str = "") -> IngredientMovement:
+    """An unsaved movement row; pass it (with others) to `apply`."""
+    occurred_at = occurred_at or timezone.now()
+    return IngredientMovement(
+        ingredient_id=ingredient_id,
+        kind=kind,
+        quantity=Decimal(str(quantity)),
+        reference_model=reference._meta.label if reference is not None else "",
+        reference_id=reference.pk if reference is not None else None,
+        note=note[:255],
+        occurred_at=occurred_at,
+        business_date=business_date_of(occurred_at),
+    )
+
+
+def apply(movements, *, user=None, locked: dict | None = None) -> dict[int, Ingredient]:
+    """Write movements and the cached quantities they change (inside atomic).
+
+    `locked` may pass ingredients the caller already locked (with their current
+    quantities); the rest are locked here. Returns {id: Ingredient} with
+    `quantity` updated in memory.
+    """
+    movements = [m for m in movements if m.quantity]
+    if not movements:
+        return locked or {}
+    ids = {m.ingredient_id for m in movements}
+    locked = dict(locked or {})
+    locked.update(lock(ids - set(locked)))
+    quantities = {pk: locked[pk].quantity for pk in ids}
+    for m in movements:
+        quantities[m.ingredient_id] += m.quantity
+        if user is not None and user.is_authenticated:
+            m.created_by = user
+    set_quantities(quantities)
+    for pk, qty in quantities.items():
+        locked[pk].quantity = qty
+    IngredientMovement.objects.bulk_create(movements)
+    # bulk_create sends no post_save: drop checkpoints covering backdated rows here.
+    history.invalidate_movements(movements)
+    lots.follow(movements, locked)
+    return locked
+
+
+def set_to(targets: dict, *, kind: str = IngredientMovementKind.REVISION, reference=None, note: str = "", user=None) -> dict[int, Decimal]:
+    """Move ingredients to absolute quantities {id: qty}; returns their old quantities."""
+    locked = lock(targets)
+    old = {pk: ing.quantity for pk, ing in locked.items()}
+    apply(
+        [
+            movement(pk, Decimal(str(qty)) - old[pk], kind, reference=reference, note=note)
+            for pk, qty in targets.items() if pk in old
+        ],
+        user=user, locked=locked,
+    )
+    return old
+
+
+# ─────────────────── Backfill ───────────────────
+def backfill_movements(get_model, note: str = "Boshlang'ich qoldiq") -> int:
+    """Replay stock history into the ledger for ingredients that have no rows yet.
+
+    Purchases, production usages and ingredient revisions become purchase,
+    consumption and revision rows at their original times; whatever the
+    cached quantity differs from that history (opening stock, v1 syncs) is
+    written as one opening revision row at the start. `get_model` is
+    `apps.get_model` — the migration's historical registry or the live one.
+    Returns the number of rows written.
+    """
+    Ingredient_ = get_model("inventory", "Ingredient")
+    Movement = get_model("inventory", "IngredientMovement")
+    Purchase_ = get_model("inventory", "Purchase")
+    Usage = get_model("production", "ProductionIngredientUsage")
+    Revision = get_model("production", "InventoryRevisionReport")
+
+    done = set(Movement.objects.values_list("ingredient_id", flat=True).distinct())
+    todo = Ingredient_.objects.exclude(id__in=done)
+    ids = set(todo.values_list("id", flat=True))
+    if not ids:
+        return 0
+
+    def row(ingredient_id, quantity, kind, model_label, ref_id, at, note=""):
+        return Movement(
+            ingredient_id=ingredient_id, kind=kind, quantity=quantity,
+            reference_model=model_label, reference_id=ref_id, note=note,
+            occurred_at=at, business_date=business_date_of(at),
+        )
+
+    rows = [
+        row(p.ingredient_id, p.quantity, IngredientMovementKind.PURCHASE, "inventory.Purchase", p.id, p.occurred_at)
+        for p in Purchase_.objects.filter(ingredient_id__in=ids).only("ingredient_id", "quantity", "occurred_at")
+    ]
+    rows += [
+        row(u["ingredient_id"], -u["quantity_used"], IngredientMovementKind.CONSUMPTION,
+            "production.Production", u["production_id"], u["production__occurred_at"])
+        for u in Usage.objects.filter(ingredient_id__in=ids).values(
+            "ingredient_id", "quantity_used", "production_id", "production__occurred_at"
+        )
+    ]
+    rows += [
+        row(r.ingredient_id, r.new_quantity - r.old_quantity, IngredientMovementKind.REVISION,
+            "production.InventoryRevisionReport", r.id, r.created_at, r.note[:255])
+        for r in Revision.objects.filter(ingredient_id__in=ids, item_type="ingredient")
+        if r.new_quantity != r.old_quantity
+    ]
+
+    replayed, first = {}, {}
+    for r in rows:
+        replayed[r.ingredient_id] = replayed.get(r.ingredient_id, ZERO) + r.quantity
+        if r.ingredient_id not in first or r.occurred_at < first[r.ingredient_id]:
+            first[r.ingredient_id] = r.occurred_at
+    for ing in todo.only("id", "quantity", "created_at"):
+        gap = ing.quantity - replayed.get(ing.id, ZERO)
+        if gap:
+            at = min(ing.created_at, first.get(ing.id, ing.created_at))
+            rows.append(row(ing.id, gap, IngredientMovementKind.REVISION, "", None, at, note))
+    rows = [r for r in rows if r.quantity]
+    Movement.objects.bulk_create(rows, batch_size=2000)
+    return len(rows)
+
@@ -0,0 +1,14 @@
+"""Celery tasks for the inventory app."""
+from celery import shared_task
+
+from .price_stats import refresh
+
+
+@shared_task(name="inventory.refresh_price_stats")
+def refresh_price_stats() -> int:
+    """Rebuild every ingredient's purchase price statistics as of today.
+
+    Scheduled daily just after midnight (config/celery.py) so the
+    30 / 90 / 365-day windows move on even for ingredients bought nothing new.
+    """
+    return refresh()
@@ -1,6 +1,7 @@
 from rest_framework.routers import DefaultRouter
 
 from .views import (
+    IngredientMovementViewSet,
     IngredientViewSet,
     InventoryRevisionViewSet,
     ProductRecipeViewSet,
@@ -13,6 +14,7 @@ app_name = "inventory"
 router = DefaultRouter()
 router.register(r"units", UnitViewSet, basename="unit")
 router.register(r"ingredients", IngredientViewSet, basename="ingredient")
+router.register(r"movements", IngredientMovementViewSet, basename="movement")
 router.register(r"purchases", PurchaseViewSet, basename="purchase")
 router.register(r"recipes", ProductRecipeViewSet, basename="recipe")
 router.register(r"revisions", InventoryRevisionViewSet, basename="revision")
@@ -1,20 +1,38 @@
 import uuid
+from datetime import date, timedelta
 from decimal import Decimal, InvalidOperation
 
 from django.db import transaction
 from django.db.models import F
+from django.utils import timezone
 from rest_framework import filters, status, viewsets
 from rest_framework.decorators import action
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 from rest_framework.views import APIView
 
-from apps.finance.models import KassaAccount, KassaTransaction, KassaTransactionType
-from apps.products.pricing import recalc_products_using_ingredient
+from apps.core.idempotency import idempotent
+from apps.finance import posting
+from apps.finance.models import KassaTransactionType
+from apps.finance.posting import Leg
+from apps.products.pricing import schedule_recalc
 from apps.production.models import InventoryRevisionReport
 
-from .models import Ingredient, ProductRecipe, Purchase, Unit
+from . import forecast as forecast_mod
+from . import history, lots, price_stats, revision, stock
+from .models import (
+    Ingredient,
+    IngredientMovement,
+    IngredientMovementKind,
+    IngredientPriceStats,
+    ProductRecipe,
+    Purchase,
+    Unit,
+)
 from .serializers import (
+    IngredientLotSerializer,
+    IngredientMovementSerializer,
+    IngredientPriceStatsSerializer,
     IngredientSerializer,
     InventoryRevisionSerializer,
     ProductRecipeSerializer,
@@ -23,6 +41,28 @@ from .serializers import (
 )
 
 
+HISTORY_DAYS = 30
+MAX_HISTORY_DAYS = 366
+
+
+def _date_range(params) -> tuple[date, date]:
+    """?date_from / ?date_to (local dates) → (from, to); the last HISTORY_DAYS
+    days by default. Raises ValueError with a user-facing message."""
+    try:
+        date_to = date.fromisoformat(params["date_to"]) if params.get("date_to") else timezone.localdate()
+        date_from = (
+            date.fromisoformat(params["date_from"]) if params.get("date_from")
+            else date_to - timedelta(days=HISTORY_DAYS - 1)
+        )
+    except ValueError:
+        raise ValueError("Sana YYYY-MM-DD formatida bo'lishi kerak")
+    if date_from > date_to:
+        raise ValueError("date_from date_to dan keyin bo'lishi mumkin emas")
+    if (date_to - date_from).days >= MAX_HISTORY_DAYS:
+        raise ValueError(f"Oraliq {MAX_HISTORY_DAYS} kundan oshmasligi kerak")
+    return date_from, date_to
+
+
 class UnitViewSet(viewsets.ModelViewSet):
     permission_classes = [IsAuthenticated]
     serializer_class = UnitSerializer
@@ -48,9 +88,149 @@ class IngredientViewSet(viewsets.ModelViewSet):
             qs = qs.filter(quantity__lte=F("low_stock_threshold"))
         return qs
 
+    def perform_create(self, serializer):
+        # Opening stock goes through the movement ledger like any other change.
+        with transaction.atomic():
+            qty = serializer.validated_data.pop("quantity", None)
+            ing = serializer.save()
+            if qty:
+                locked = stock.apply(
+                    [stock.movement(ing.pk, qty, IngredientMovementKind.REVISION,
+                                    reference=ing, note="Boshlang'ich qoldiq")],
+                    user=self.request.user,
+                )
+                ing.quantity = locked[ing.pk].quantity
+
+    def perform_update(self, serializer):
+        with transaction.atomic():
+            qty = serializer.validated_data.pop("quantity", None)
+            ing = serializer.save()
+            if qty is not None:
+                stock.set_to({ing.pk: qty}, reference=ing, note="Qo'lda o'zgartirildi", user=self.request.user)
+                ing.quantity = Decimal(str(qty))
+
     def perform_destroy(self, instance):
         instance.archive()
 
+    @action(detail=False, methods=["get"])
+    def forecast(self, request):
+        """Rolling consumption, days of cover and a suggested reorder list.
+
+        ?window= (days of history, default 28), ?lead_days= (supplier lead
+        time, default 3), ?cover_days= (how long an order should last,
+        default 14), ?reorder=1 to return only ingredients to reorder.
+        See apps.inventory.forecast.
+        """
+        params = {}
+        for name, default, lower, upper in (
+            ("window", forecast_mod.WINDOW_DAYS, 1, 365),
+            ("lead_days", forecast_mod.LEAD_DAYS, 0, 90),
+            ("cover_days", forecast_mod.COVER_DAYS, 0, 180),
+        ):
+            try:
+                params[name] = int(request.query_params.get(name, default))
+            except ValueError:
+                return Response({"detail": f"{name} butun son bo'lishi kerak"}, status=400)
+            if not lower <= params[name] <= upper:
+                return Response({"detail": f"{name} {lower}..{upper} oralig'ida bo'lishi kerak"}, status=400)
+
+        rows = forecast_mod.plan(**params)
+        if request.query_params.get("reorder") in ("1", "true"):
+            rows = [r for r in rows if r["needs_reorder"]]
+        to_order = [r for r in rows if r["needs_reorder"]]
+        return Response({
+            "as_of": timezone.localdate().isoformat(),
+            **params,
+            "results": rows,
+            "count": len(rows),
+            "reorder_count": len(to_order),
+            "estimated_cost_uzs": str(sum((Decimal(r["estimated_cost_uzs"]) for r in to_order), Decimal("0"))),
+        })
+
+    @action(detail=True, methods=["get"])
+    def history(self, request, pk=None):
+        """Daily stock of one ingredient: opening, movements by kind, closing.
+        ?date_from / ?date_to (default: the last 30 days). See apps.inventory.history.
+        """
+        ing = self.get_object()
+        try:
+            date_from, date_to = _date_range(request.query_params)
+        except ValueError as exc:
+            return Response({"detail": str(exc)}, status=400)
+        return Response({
+            "ingredient_id": ing.id,
+            "name": ing.name,
+            "unit": ing.unit.short,
+            "date_from": date_from.isoformat(),
+            "date_to": date_to.isoformat(),
+            "results": history.daily_history(ing.id, date_from, date_to),
+        })
+
+    @action(detail=True, methods=["get"], url_path="lots")
+    def open_lots(self, request, pk=None):
+        """Open FIFO cost lots of one ingredient, oldest (next to be used) first."""
+        ing = self.get_object()
+        qs = ing.lots.filter(remaining__gt=0).order_by("received_at", "id")
+        return Response({
+            "ingredient_id": ing.id,
+            "quantity": str(ing.quantity),
+            "fifo_value_uzs": str(lots.open_value([ing.id]).get(ing.id, Decimal("0"))),
+            "results": IngredientLotSerializer(qs, many=True).data,
+        })
+
+    @action(detail=True, methods=["get"], url_path="price-stats")
+    def price_stats_detail(self, request, pk=None):
+        """Purchase price statistics of one ingredient for every window
+        (30 / 90 / 365 days), as last written by apps.inventory.price_stats;
+        each row carries its as-of `day`."""
+        ing = self.get_object()
+        qs = IngredientPriceStats.objects.filter(ingredient=ing).select_related("ingredient__unit")
+        return Response({
+            "ingredient_id": ing.id,
+            "name": ing.name,
+            "unit": ing.unit.short,
+            "results": IngredientPriceStatsSerializer(qs, many=True).data,
+        })
+
+    @action(detail=False, methods=["get"], url_path="price-stats")
+    def price_stats_list(self, request):
+        """Purchase price statistics of every active ingredient over one
+        ?window (30, 90 or 365 days; default 30) — the Ombor page table."""
+        try:
+            window = int(request.query_params.get("window", price_stats.WINDOWS[0]))
+        except ValueError:
+            window = None
+        if window not in price_stats.WINDOWS:
+            allowed = ", ".join(str(w) for w in price_stats.WINDOWS)
+            return Response({"detail": f"window quyidagilardan biri bo'lishi kerak: {allowed}"}, status=400)
+        qs = (
+            IngredientPriceStats.objects
+            .filter(window_days=window, ingredient__is_archived=False)
+            .select_related("ingredient__unit")
+            .order_by("ingredient__name")
+        )
+        return Response({
+            "window_days": window,
+            "results": IngredientPriceStatsSerializer(qs, many=True).data,
+        })
+
+    @action(detail=False, methods=["get"], url_path="stock-report")
+    def stock_report(self, request):
+        """Per-ingredient opening, movements by kind, closing and revision
+        variance over ?date_from / ?date_to (default: the last 30 days).
+        """
+        try:
+            date_from, date_to = _date_range(request.query_params)
+        except ValueError as exc:
+            return Response({"detail": str(exc)}, status=400)
+        rows = history.movement_report(date_from, date_to)
+        return Response({
+            "date_from": date_from.isoformat(),
+            "date_to": date_to.isoformat(),
+            "results": rows,
+            "variance_value_uzs": str(sum((Decimal(r["variance_value_uzs"]) for r in rows), Decimal("0"))),
+        })
+
     @action(detail=True, methods=["post"])
     def unarchive(self, request, pk=None):
         """Restore an archived ingredient."""
@@ -61,10 +241,9 @@ class IngredientViewSet(viewsets.ModelViewSet):
     @action(detail=True, methods=["post"], url_path="adjust")
     def adjust_stock(self, request, pk=None):
         """Manual stock adjustment — sets new absolute quantity. Logs an
-        InventoryRevisionReport row so the change is auditable (old/new/user/note).
+        InventoryRevisionReport row so the change is auditable (old/new/user/note)
+        and a revision movement in the stock ledger.
         """
-        from apps.production.models import InventoryRevisionReport
-
         ing = self.get_object()
         raw = request.data.get("new_quantity")
         note = request.data.get("note", "")
@@ -80,19 +259,22 @@ class IngredientViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_400_BAD_REQUEST,
             )
         with transaction.atomic():
-            locked = Ingredient.objects.select_for_update().get(pk=ing.pk)
-            old_qty = locked.quantity
-            locked.quantity = new_qty
-            locked.save(update_fields=["quantity"])
-            InventoryRevisionReport.objects.create(
+            locked = stock.lock([ing.pk])
+            old_qty = locked[ing.pk].quantity
+            report = InventoryRevisionReport.objects.create(
                 item_type=InventoryRevisionReport.ItemType.INGREDIENT,
-                ingredient=locked,
+                ingredient=locked[ing.pk],
                 old_quantity=old_qty,
                 new_quantity=new_qty,
                 note=note,
                 user=request.user if request.user.is_authenticated else None,
             )
-        return Response(IngredientSerializer(locked).data)
+            stock.apply(
+                [stock.movement(ing.pk, new_qty - old_qty, IngredientMovementKind.REVISION,
+                                reference=report, note=note)],
+                user=request.user, locked=locked,
+            )
+        return Response(IngredientSerializer(locked[ing.pk]).data)
 
     @action(detail=True, methods=["post"], url_path="set-price")
     def set_price(self, request, pk=None):
@@ -117,10 +299,20 @@ class IngredientViewSet(viewsets.ModelViewSet):
             locked = Ingredient.objects.select_for_update().get(pk=ing.pk)
             locked.avg_cost_uzs = new_price
             locked.save(update_fields=["avg_cost_uzs"])
-            recalc_products_using_ingredient(locked.id)
+            schedule_recalc(ingredients=[locked.id])
         return Response(IngredientSerializer(locked).data)
 
 
+def _purchase_legs(purchase: Purchase) -> list[Leg]:
+    return [Leg(
+        account_id=purchase.account_id,
+        currency=purchase.currency,
+        amount=-purchase.total_price,
+        kind=KassaTransactionType.INVENTORY_PURCHASE,
+        note=f"Xomashyo · {purchase.ingredient.name}",
+    )]
+
+
 class PurchaseViewSet(viewsets.ModelViewSet):
     permission_classes = [IsAuthenticated]
     serializer_class = PurchaseSerializer
@@ -135,11 +327,15 @@ class PurchaseViewSet(viewsets.ModelViewSet):
         if currency := p.get("currency"):
             qs = qs.filter(currency=currency)
         if date_from := p.get("date_from"):
-            qs = qs.filter(occurred_at__date__gte=date_from)
+            qs = qs.filter(business_date__gte=date_from)
         if date_to := p.get("date_to"):
-            qs = qs.filter(occurred_at__date__lte=date_to)
+            qs = qs.filter(business_date__lte=date_to)
         return qs
 
+    @idempotent
+    def create(self, request, *args, **kwargs):
+        return super().create(request, *args, **kwargs)
+
     def perform_create(self, serializer):
         with transaction.atomic():
             qty = Decimal(str(serializer.validated_data["quantity"]))
@@ -149,8 +345,9 @@ class PurchaseViewSet(viewsets.ModelViewSet):
                 unit_price=unit_price,
                 created_by=self.request.user,
             )
-            # Increment ingredient stock + update rolling avg cost.
-            ing = Ingredient.objects.select_for_update().get(pk=purchase.ingredient_id)
+            # Update rolling avg cost + increment ingredient stock (purchase movement).
+            locked = stock.lock([purchase.ingredient_id])
+            ing = locked[purchase.ingredient_id]
             old_qty = ing.quantity
             new_qty = old_qty + purchase.quantity
             if purchase.currency == "UZS" and new_qty > 0:
@@ -158,40 +355,34 @@ class PurchaseViewSet(viewsets.ModelViewSet):
                 ing.avg_cost_uzs = (
                     (ing.avg_cost_uzs * old_qty) + (purchase.unit_price * purchase.quantity)
                 ) / new_qty
-            ing.quantity = new_qty
-            ing.save(update_fields=["quantity", "avg_cost_uzs"])
+                ing.save(update_fields=["avg_cost_uzs"])
+            stock.apply(
+                [stock.movement(ing.pk, purchase.quantity, IngredientMovementKind.PURCHASE,
+                                reference=purchase, occurred_at=purchase.occurred_at)],
+                user=purchase.created_by, locked=locked,
+            )
+            # Open the purchase's FIFO cost lot.
+            lots.receive([lots.lot(ing.pk, purchase.quantity, lots.unit_cost(purchase, ing),
+                                   received_at=purchase.occurred_at, purchase=purchase,
+                                   on_hand=ing.quantity)])
 
             # Deduct from kassa + log.
-            account = KassaAccount.objects.select_for_update().get(pk=purchase.account_id)
-            if purchase.currency == "UZS":
-                account.balance_uzs = F("balance_uzs") - purchase.total_price
-            else:
-                account.balance_usd = F("balance_usd") - purchase.total_price
-            account.save(update_fields=["balance_uzs", "balance_usd"])
-
-            KassaTransaction.objects.create(
-                account=purchase.account,
-                kind=KassaTransactionType.INVENTORY_PURCHASE,
-                currency=purchase.currency,
-                amount=-purchase.total_price,
-                reference_model="inventory.Purchase",
-                reference_id=purchase.id,
-                note=f"Xomashyo · {purchase.ingredient.name}",
-                occurred_at=purchase.occurred_at,
-                created_by=self.request.user,
+            posting.post(
+                purchase, _purchase_legs(purchase),
+                occurred_at=purchase.occurred_at, user=purchase.created_by,
             )
 
-            # Feature #24: avg_cost_uzs changed → recompute cost for every product using this ingredient.
+            # Feature #24: avg_cost_uzs changed → recompute cost for every product
+            # using this ingredient, once the purchase has committed.
             if purchase.currency == "UZS":
-                recalc_products_using_ingredient(purchase.ingredient_id)
+                schedule_recalc(ingredients=[purchase.ingredient_id])
 
     def perform_update(self, serializer):
         with transaction.atomic():
             old = serializer.instance
-            old_currency = old.currency
-            old_account_id = old.account_id
-            old_total = Decimal(str(old.total_price))
+            old_legs = _purchase_legs(old)
             old_qty = Decimal(str(old.quantity))
+            old_ingredient_id, old_occurred_at = old.ingredient_id, old.occurred_at
 
             # Recompute new unit_price before saving.
             new_quantity = serializer.validated_data.get("quantity", old.quantity)
@@ -201,66 +392,72 @@ class PurchaseViewSet(viewsets.ModelViewSet):
             new_unit_price = (new_total_dec / new_qty) if new_qty else Decimal("0")
             purchase = serializer.save(unit_price=new_unit_price)
 
-            # Reverse old ingredient stock change.
-            ing = Ingredient.objects.select_for_update().get(pk=purchase.ingredient_id)
-            ing.quantity = ing.quantity - old_qty + new_qty
-            ing.save(update_fields=["quantity"])
+            # Reverse the old stock movement and write the new one — on the old
+            # ingredient/date too, if either was changed.
+            locked = stock.lock([old_ingredient_id, purchase.ingredient_id])
+            if (old_ingredient_id, old_qty, old_occurred_at) != (
+                purchase.ingredient_id, new_qty, purchase.occurred_at
+            ):
+                stock.apply([
+                    stock.movement(old_ingredient_id, -old_qty, IngredientMovementKind.REVERSAL,
+                                   reference=purchase, occurred_at=old_occurred_at,
+                                   note="Xarid tahrirlandi"),
+                    stock.movement(purchase.ingredient_id, new_qty, IngredientMovementKind.PURCHASE,
+                                   reference=purchase, occurred_at=purchase.occurred_at),
+                ], user=self.request.user, locked=locked)
+            lots.sync_purchase(purchase, locked[purchase.ingredient_id],
+                               old_ingredient_id=old_ingredient_id, old_quantity=old_qty)
 
             # Reverse old kassa deduction, apply new.
-            old_account = KassaAccount.objects.select_for_update().get(pk=old_account_id)
-            if old_currency == "UZS":
-                old_account.balance_uzs = F("balance_uzs") + old_total
-            else:
-                old_account.balance_usd = F("balance_usd") + old_total
-            old_account.save(update_fields=["balance_uzs", "balance_usd"])
-
-            new_account = KassaAccount.objects.select_for_update().get(pk=purchase.account_id)
-            if purchase.currency == "UZS":
-                new_account.balance_uzs = F("balance_uzs") - purchase.total_price
-            else:
-                new_account.balance_usd = F("balance_usd") - purchase.total_price
-            new_account.save(update_fields=["balance_uzs", "balance_usd"])
-
-            # Update linked KassaTransaction.
-            KassaTransaction.objects.filter(
-                reference_model="inventory.Purchase",
-                reference_id=purchase.id,
-            ).update(
-                account=purchase.account,
-                currency=purchase.currency,
-                amount=-purchase.total_price,
-                occurred_at=purchase.occurred_at,
+            posting.repost(
+                purchase, old_legs, _purchase_legs(purchase),
+                occurred_at=purchase.occurred_at, user=purchase.created_by,
             )
 
             if purchase.currency == "UZS":
-                recalc_products_using_ingredient(purchase.ingredient_id)
+                schedule_recalc(ingredients=[purchase.ingredient_id])
+            if old_ingredient_id != purchase.ingredient_id:
+                schedule_recalc(ingredients=[old_ingredient_id])
+                # The save signal refreshes the new ingredient's price stats only.
+                price_stats.schedule_refresh([old_ingredient_id])
 
     def perform_destroy(self, instance):
         with transaction.atomic():
             # Reverse kassa.
-            account = KassaAccount.objects.select_for_update().get(pk=instance.account_id)
-            if instance.currency == "UZS":
-                account.balance_uzs = F("balance_uzs") + instance.total_price
-            else:
-                account.balance_usd = F("balance_usd") + instance.total_price
-            account.save(update_fields=["balance_uzs", "balance_usd"])
-
-            # Reverse ingredient stock.
-            ing = Ingredient.objects.select_for_update().get(pk=instance.ingredient_id)
-            ing.quantity = ing.quantity - instance.quantity
-            ing.save(update_fields=["quantity"])
-
-            # Remove KassaTransaction.
-            KassaTransaction.objects.filter(
-                reference_model="inventory.Purchase",
-                reference_id=instance.id,
-            ).delete()
+            posting.unpost(instance, _purchase_legs(instance), user=self.request.user)
+
+            # Reverse ingredient stock; the purchase's lot goes with it (cascade).
+            stock.apply(
+                [stock.movement(instance.ingredient_id, -instance.quantity, IngredientMovementKind.REVERSAL,
+                                reference=instance, occurred_at=instance.occurred_at,
+                                note="Xarid o'chirildi")],
+                user=self.request.user,
+            )
 
             ingredient_id = instance.ingredient_id
             instance.delete()
 
-            if True:  # always recalc after any purchase removal
-                recalc_products_using_ingredient(ingredient_id)
+            # always recalc after any purchase removal
+            schedule_recalc(ingredients=[ingredient_id])
+
+
+class IngredientMovementViewSet(viewsets.ReadOnlyModelViewSet):
+    """Stock ledger rows (read-only — written by apps.inventory.stock)."""
+    permission_classes = [IsAuthenticated]
+    serializer_class = IngredientMovementSerializer
+
+    def get_queryset(self):
+        qs = IngredientMovement.objects.select_related("ingredient", "ingredient__unit", "created_by")
+        p = self.request.query_params
+        if ing := p.get("ingredient"):
+            qs = qs.filter(ingredient_id=ing)
+        if kind := p.get("kind"):
+            qs = qs.filter(kind=kind)
+        if date_from := p.get("date_from"):
+            qs = qs.filter(business_date__gte=date_from)
+        if date_to := p.get("date_to"):
+            qs = qs.filter(business_date__lte=date_to)
+        return qs.order_by("-occurred_at", "-id")
 
 
 class ProductRecipeViewSet(viewsets.ModelViewSet):
@@ -274,20 +471,18 @@ class ProductRecipeViewSet(viewsets.ModelViewSet):
         return qs
 
     def perform_create(self, serializer):
-        from apps.products.pricing import recalc_product_cost
         item = serializer.save()
-        recalc_product_cost(item.product)
+        schedule_recalc(products=[item.product_id])
 
     def perform_update(self, serializer):
-        from apps.products.pricing import recalc_product_cost
+        old_product_id = serializer.instance.product_id
         item = serializer.save()
-        recalc_product_cost(item.product)
+        schedule_recalc(products=[old_product_id, item.product_id])
 
     def perform_destroy(self, instance):
-        from apps.products.pricing import recalc_product_cost
-        product = instance.product
+        product_id = instance.product_id
         instance.delete()
-        recalc_product_cost(product)
+        schedule_recalc(products=[product_id])
 
 
 class InventoryRevisionViewSet(viewsets.ReadOnlyModelViewSet):
@@ -321,43 +516,32 @@ class InventoryRevisionViewSet(viewsets.ReadOnlyModelViewSet):
         items_data = request.data.get("items", [])
         session_note = request.data.get("note", "")
 
-        if not items_data:
+        if not items_data or not isinstance(items_data, list):
             return Response({"detail": "items talab qilinadi."}, status=status.HTTP_400_BAD_REQUEST)
+        if len(items_data) > revision.MAX_ITEMS:
+            return Response({"detail": f"Ko'pi bilan {revision.MAX_ITEMS} ta"}, status=status.HTTP_400_BAD_REQUEST)
+        if not all(isinstance(row, dict) for row in items_data):
+            return Response({"detail": "items elementlari obyekt bo'lishi kerak"}, status=status.HTTP_400_BAD_REQUEST)
+
+        # Validate every row first — a bad row rejects the batch before any write.
+        items, errors = revision.validate(items_data, note=session_note)
+        if errors:
+            return Response(
+                {"detail": errors[0]["detail"], "errors": errors},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
 
         batch_id = uuid.uuid4()
-        created = []
-
         with transaction.atomic():
-            for row in items_data:
-                try:
-                    ing_id = int(row["ingredient_id"])
-                    new_qty = Decimal(str(row["new_quantity"]))
-                except (KeyError, ValueError, InvalidOperation):
-                    return Response(
-                        {"detail": f"ingredient_id yoki new_quantity noto'g'ri: {row}"},
-                        status=status.HTTP_400_BAD_REQUEST,
-                    )
-                if new_qty < 0:
-                    return Response(
-                        {"detail": "new_quantity manfiy bo'lishi mumkin emas."},
-                        status=status.HTTP_400_BAD_REQUEST,
-                    )
-
-                ing = Ingredient.objects.select_for_update().get(pk=ing_id)
-                old_qty = ing.quantity
-                ing.quantity = new_qty
-                ing.save(update_fields=["quantity"])
-
-                rev = InventoryRevisionReport.objects.create(
-                    item_type=InventoryRevisionReport.ItemType.INGREDIENT,
-                    ingredient=ing,
-                    old_quantity=old_qty,
-                    new_quantity=new_qty,
-                    note=row.get("note", "") or session_note,
-                    batch_id=batch_id,
-                    user=request.user if request.user.is_authenticated else None,
-                )
-                created.append(rev)
+            revision.apply(
+                items,
+                user=request.user if request.user.is_authenticated else None,
+                batch_id=batch_id,
+            )
+        created = list(
+            InventoryRevisionReport.objects.select_related("ingredient", "ingredient__unit", "user")
+            .filter(batch_id=batch_id).order_by("ingredient__name")
+        )
 
         return Response(
             {
@@ -0,0 +1,183 @@
+"""Driver loading manifest — what each driver loads, where they stop, what they collect.
+
+Built from one grouped query over the day's undelivered OrderItem quantities,
+joined to Shop for the driver assignment (Shop.assigned_driver). The result is
+cached per date and keyed on the day's order fingerprint, so it is rebuilt only
+after one of those orders (or a shop assignment) changes.
+"""
+from decimal import Decimal
+
+from django.db.models import Count, DecimalField, ExpressionWrapper, F, Max, Sum
+from django.utils import timezone
+
+from apps.core.cache import fingerprint, get_or_build
+from apps.shops.models import Shop
+
+from .models import Order, OrderItem, OrderPriority, OrderStatus
+
+UNASSIGNED = "Biriktirilmagan"
+
+_PRIORITY_RANK = {
+    OrderPriority.URGENT: 0,
+    OrderPriority.HIGH: 1,
+    OrderPriority.NORMAL: 2,
+    OrderPriority.LOW: 3,
+}
+
+
+def _manifest_version(day) -> str:
+    orders = Order.objects.filter(order_date=day).aggregate(m=Max("updated_at"), n=Count("id"))
+    shops = Shop.objects.aggregate(m=Max("updated_at"))
+    return fingerprint(orders["m"], orders["n"], shops["m"])
+
+
+def _build_manifest(day) -> dict:
+    remaining = F("quantity") - F("delivered_quantity")
+    rows = (
+        OrderItem.objects
+        .filter(
+            order__order_date=day,
+            order__status__in=[OrderStatus.PENDING, OrderStatus.PARTIALLY_DELIVERED],
+            quantity__gt=F("delivered_quantity"),
+        )
+        .values(
+            "order_id",
+            "order__delivery_time",
+            "order__priority",
+            "order__currency",
+            "order__shop_id",
+            "order__shop__name",
+            "order__shop__address",
+            "order__shop__phone",
+            "order__shop__assigned_driver_id",
+            "order__shop__assigned_driver__username",
+            "order__shop__assigned_driver__full_name",
+            "product_id",
+            "product__name",
+            "product__sort_order",
+        )
+        .annotate(
+            qty=Sum(remaining),
+            value=Sum(
+                ExpressionWrapper(remaining * F("unit_price"), output_field=DecimalField())
+            ),
+        )
+    )
+
+    drivers: dict = {}
+    for r in rows:
+        driver_id = r["order__shop__assigned_driver_id"]
+        d = drivers.setdefault(driver_id, {
+            "driver_id": driver_id,
+            "driver_name": (
+                r["order__shop__assigned_driver__full_name"]
+                or r["order__shop__assigned_driver__username"]
+                or UNASSIGNED
+            ),
+            "products": {},
+            "stops": {},
+            "expected_cash": {"UZS": Decimal("0"), "USD": Decimal("0")},
+        })
+        p = d["products"].setdefault(r["product_id"], {
+            "product_id": r["product_id"],
+            "product_name": r["product__name"],
+            "sort": r["product__sort_order"],
+            "quantity": 0,
+        })
+        p["quantity"] += r["qty"]
+
+        stop = d["stops"].setdefault(r["order_id"], {
+            "order_id": r["order_id"],
+            "shop_id": r["order__shop_id"],
+            "shop_name": r["order__shop__name"],
+            "address": r["order__shop__address"],
+            "phone": r["order__shop__phone"],
+            "delivery_time": r["order__delivery_time"],
+            "priority": r["order__priority"],
+            "currency": r["order__currency"],
+            "items": [],
+            "amount": Decimal("0"),
+        })
+        stop["items"].append({
+            "product_id": r["product_id"],
+            "product_name": r["product__name"],
+            "quantity": r["qty"],
+        })
+        stop["amount"] += r["value"] or 0
+        d["expected_cash"][r["order__currency"]] += r["value"] or 0
+
+    results = []
+    for d in sorted(drivers.values(), key=lambda x: (x["driver_id"] is None, x["driver_name"])):
+        stops = sorted(
+            d["stops"].values(),
+            key=lambda s: (
+                s["delivery_time"] is None,
+                s["delivery_time"] or 0,
+                _PRIORITY_RANK.get(s["priority"], 2),
+                s["shop_name"],
+            ),
+        )
+        results.append({
+            "driver_id": d["driver_id"],
+            "driver_name": d["driver_name"],
+            "products": [
+                {k: v for k, v in p.items() if k != "sort"}
+                for p in sorted(d["products"].values(), key=lambda p: (p["sort"], p["product_name"]))
+            ],
+            "stops": [
+                {
+                    **s,
+                    "delivery_time": (
+                        timezone.localtime(s["delivery_time"]).isoformat()
+                        if s["delivery_time"] else None
+                    ),
+                    "amount": str(s["amount"]),
+                }
+                for s in stops
+            ],
+            "stop_count": len(stops),
+            "expected_cash": {
+                "uzs": str(d["expected_cash"]["UZS"]),
+                "usd": str(d["expected_cash"]["USD"]),
+            },
+        })
+    return {"date": day.isoformat(), "drivers": results}
+
+
+def build_manifest(day) -> dict:
+    """Per-driver product totals, ordered stop list and expected cash for `day`."""
+    return get_or_build(
+        f"orders:manifest:{day.isoformat()}",
+        _manifest_version(day),
+        lambda: _build_manifest(day),
+    )
+
+
+def manifest_sheets(manifest: dict) -> list[tuple[str, list[str], list[list]]]:
+    """Flatten a manifest into (title, headers, rows) sheets for the xlsx export."""
+    load_rows, stop_rows = [], []
+    for d in manifest["drivers"]:
+        for p in d["products"]:
+            load_rows.append([d["driver_name"], p["product_name"], p["quantity"]])
+        for n, s in enumerate(d["stops"], start=1):
+            stop_rows.append([
+                d["driver_name"],
+                n,
+                s["shop_name"],
+                s["address"],
+                s["phone"],
+                s["delivery_time"][11:16] if s["delivery_time"] else "",
+                s["priority"],
+                ", ".join(f"{i['product_name']} × {i['quantity']}" for i in s["items"]),
+                s["currency"],
+                float(s["amount"]),
+            ])
+    return [
+        ("Yuklash", ["Haydovchi", "Mahsulot", "Soni"], load_rows),
+        (
+            "Manzillar",
+            ["Haydovchi", "№", "Do'kon", "Manzil", "Telefon", "Vaqt", "Prioritet",
+             "Mahsulotlar", "Valyuta", "Summa"],
+            stop_rows,
+        ),
+    ]
@@ -63,6 +63,7 @@ class Order(TimestampedModel):
             models.Index(fields=["shop", "-order_date"]),
             models.Index(fields=["status", "-order_date"]),
             models.Index(fields=["priority", "-order_date"]),
+            models.Index(fields=["updated_at"]),  # delta sync feed
         ]
 
     def total_amount(self):
@@ -76,7 +76,8 @@ class OrderDetailSerializer(OrderListSerializer):
 
 class OrderItemCreateSerializer(serializers.Serializer):
     product = serializers.IntegerField()
-    unit_price = serializers.DecimalField(max_digits=16, decimal_places=2)
+    # Optional — omitted lines take the shop's effective price (override or default).
+    unit_price = serializers.DecimalField(max_digits=16, decimal_places=2, required=False)
     quantity = serializers.IntegerField(min_value=1)
     # Optional — how much of this line was delivered on creation (partial/delivered
     # orders entered inline). Omitted/None means "use the status default".
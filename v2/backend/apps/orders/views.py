@@ -1,3 +1,4 @@
+from datetime import date as date_cls
 from decimal import Decimal
 
 from django.db import transaction
@@ -8,9 +9,14 @@ from rest_framework.decorators import action
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 
+from apps.core.idempotency import idempotent
+from apps.core.pagination import CursorOrPagePagination
 from apps.production.models import BakeryProductStock
-from apps.shops.models import Shop
+from apps.shops.ledger import order_moment, post_entry
+from apps.shops.models import Shop, ShopLedgerKind
+from apps.shops.pricing import get_price_sheet
 
+from .manifest import build_manifest, manifest_sheets
 from .models import Order, OrderItem, OrderStatus
 from .serializers import (
     ConfirmDeliveryItemSerializer,
@@ -25,6 +31,10 @@ class OrderViewSet(viewsets.ModelViewSet):
     filter_backends = [filters.SearchFilter, filters.OrderingFilter]
     search_fields = ["shop__name", "note"]
     ordering_fields = ["order_date", "priority", "status", "created_at"]
+    pagination_class = CursorOrPagePagination
+    # The cursor keys on the first field only (ties are paged by OFFSET), so
+    # it must be near-unique: order_date is shared by a whole day's orders.
+    cursor_ordering = ("-created_at", "-id")
 
     def get_queryset(self):
         qs = (
@@ -62,12 +72,27 @@ class OrderViewSet(viewsets.ModelViewSet):
             return OrderDetailSerializer
         return OrderListSerializer
 
+    @idempotent
     def create(self, request):
         ser = OrderCreateSerializer(data=request.data)
         ser.is_valid(raise_exception=True)
         data = ser.validated_data
         chosen_status = data.get("status", OrderStatus.PENDING)
 
+        # Lines sent without a unit_price are priced from the shop's sheet.
+        if any("unit_price" not in i for i in data["items"]):
+            prices = get_price_sheet(data["shop"], data.get("currency", "UZS"))["prices"]
+            for item_data in data["items"]:
+                if "unit_price" in item_data:
+                    continue
+                price = prices.get(item_data["product"])
+                if price is None:
+                    return Response(
+                        {"items": f"Mahsulot #{item_data['product']} uchun narx topilmadi."},
+                        status=status.HTTP_400_BAD_REQUEST,
+                    )
+                item_data["unit_price"] = Decimal(price)
+
         with transaction.atomic():
             order = Order.objects.create(
                 shop_id=data["shop"],
@@ -112,12 +137,10 @@ class OrderViewSet(viewsets.ModelViewSet):
                         quantity=F("quantity") - Decimal(str(delivered))
                     )
                     balance_delta += Decimal(str(delivered)) * oi.unit_price
-                if balance_delta != 0:
-                    if order.currency == "UZS":
-                        shop.loan_balance_uzs = F("loan_balance_uzs") + balance_delta
-                    else:
-                        shop.loan_balance_usd = F("loan_balance_usd") + balance_delta
-                    shop.save(update_fields=["loan_balance_uzs", "loan_balance_usd"])
+                post_entry(
+                    shop, order.currency, balance_delta, ShopLedgerKind.DELIVERY,
+                    reference=order, user=request.user, occurred_at=order_moment(order.order_date),
+                )
 
                 # Recompute status from actual delivered amounts (e.g. a "partial"
                 # where every line was filled becomes DELIVERED, and vice versa).
@@ -132,7 +155,7 @@ class OrderViewSet(viewsets.ModelViewSet):
                 )
                 if new_status != order.status:
                     order.status = new_status
-                    order.save(update_fields=["status"])
+                    order.save(update_fields=["status", "updated_at"])
 
         return Response(
             OrderDetailSerializer(order).data,
@@ -195,17 +218,18 @@ class OrderViewSet(viewsets.ModelViewSet):
                 delta = new_delivered_value - old_delivered_value
                 if delta != 0:
                     shop = Shop.objects.select_for_update().get(pk=order_locked.shop_id)
-                    if order_locked.currency == "UZS":
-                        shop.loan_balance_uzs = F("loan_balance_uzs") + delta
-                    else:
-                        shop.loan_balance_usd = F("loan_balance_usd") + delta
-                    shop.save(update_fields=["loan_balance_uzs", "loan_balance_usd"])
+                    post_entry(
+                        shop, order_locked.currency, delta, ShopLedgerKind.ADJUSTMENT,
+                        reference=order_locked, note="Buyurtma tahrirlandi", user=request.user,
+                        occurred_at=order_moment(order_locked.order_date),
+                    )
 
             updated_order.refresh_from_db()
 
         return Response(OrderDetailSerializer(updated_order).data)
 
     @action(detail=True, methods=["post"])
+    @idempotent
     def confirm_delivery(self, request, pk=None):
         """
         Confirm how much of each item was delivered (and optionally returned — feature #17).
@@ -224,7 +248,9 @@ class OrderViewSet(viewsets.ModelViewSet):
             shop = Shop.objects.select_for_update().get(pk=order.shop_id)
 
             items_by_id = {i.id: i for i in order.items.all()}
-            balance_delta = Decimal("0")
+            # Deliveries and returns are posted as separate ledger rows.
+            delivered_delta = Decimal("0")
+            returned_delta = Decimal("0")
 
             for row in ser.validated_data:
                 item = items_by_id.get(row["item_id"])
@@ -235,6 +261,8 @@ class OrderViewSet(viewsets.ModelViewSet):
                 old_net = max(item.delivered_quantity - item.returned_quantity, 0)
                 new_net = max(delivered - returned, 0)
                 qty_delta = new_net - old_net
+                delivered_delta += (delivered - item.delivered_quantity) * item.unit_price
+                returned_delta += (returned - item.returned_quantity) * item.unit_price
                 item.delivered_quantity = delivered
                 item.returned_quantity = returned
                 item.save(update_fields=["delivered_quantity", "returned_quantity"])
@@ -247,8 +275,6 @@ class OrderViewSet(viewsets.ModelViewSet):
                     BakeryProductStock.objects.filter(pk=stock.pk).update(
                         quantity=F("quantity") - qty_delta
                     )
-                    # Accumulate shop loan balance delta (what we newly delivered).
-                    balance_delta += Decimal(str(qty_delta)) * item.unit_price
 
             # Recompute this order's status from items.
             items = list(order.items.all())
@@ -262,21 +288,49 @@ class OrderViewSet(viewsets.ModelViewSet):
                 order.status = OrderStatus.PARTIALLY_DELIVERED
             else:
                 order.status = OrderStatus.PENDING
-            order.save(update_fields=["status"])
+            # updated_at is bumped too — cached read models (loading manifest)
+            # key on it to notice delivery changes.
+            order.save(update_fields=["status", "updated_at"])
 
             # Apply delta to shop loan balance — delta-based so historical data
             # (e.g. V1-migrated orders without corresponding V2 payments) doesn't
             # corrupt the running balance. Payments use the same approach.
-            if balance_delta != 0:
-                if order.currency == "UZS":
-                    shop.loan_balance_uzs = F("loan_balance_uzs") + balance_delta
-                else:
-                    shop.loan_balance_usd = F("loan_balance_usd") + balance_delta
-                shop.save(update_fields=["loan_balance_uzs", "loan_balance_usd"])
+            at = order_moment(order.order_date)
+            post_entry(
+                shop, order.currency, delivered_delta, ShopLedgerKind.DELIVERY,
+                reference=order, user=request.user, occurred_at=at,
+            )
+            post_entry(
+                shop, order.currency, -returned_delta, ShopLedgerKind.RETURN,
+                reference=order, user=request.user, occurred_at=at,
+            )
 
         return Response(OrderDetailSerializer(order).data)
 
+    @action(detail=False, methods=["get"])
+    def manifest(self, request):
+        """GET /orders/manifest/?date=YYYY-MM-DD[&export=xlsx] — driver loading manifest.
+
+        Per driver (via Shop.assigned_driver): product × quantity still to
+        deliver, the stop list in delivery_time / priority order, and the cash
+        expected on the route. Shops with no driver are grouped separately.
+        """
+        from apps.reports.excel import make_multi_sheet_workbook
+        from apps.reports.views import _xlsx_response
+
+        raw = request.query_params.get("date")
+        try:
+            day = date_cls.fromisoformat(raw) if raw else timezone.localdate()
+        except ValueError:
+            return Response({"detail": "Invalid date. Use YYYY-MM-DD."}, status=400)
+        data = build_manifest(day)
+        if request.query_params.get("export") == "xlsx":
+            buf = make_multi_sheet_workbook(manifest_sheets(data))
+            return _xlsx_response(buf, f"manifest_{day.strftime('%Y%m%d')}.xlsx")
+        return Response(data)
+
     @action(detail=True, methods=["post"])
+    @idempotent
     def repeat(self, request, pk=None):
         """Feature #3 — clone this order as a new PENDING order for the same shop."""
         source = self.get_object()
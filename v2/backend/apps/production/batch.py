@@ -0,0 +1,154 @@
+"""Shift-level batch production entry.
+
+A shift's runs arrive as one list. `build` validates them against products,
+bakers and groups read with one query each and returns unsaved Production
+rows; `save` writes them as set operations in the caller's transaction: one
+bulk_create of the runs, finished-goods stock for every product in one
+UPDATE ... CASE, and the recipe deduction for all runs together
+(consumption.deduct_ingredients — recipes in one query, each ingredient
+locked and updated once).
+"""
+from decimal import ROUND_HALF_UP, Decimal, InvalidOperation
+
+from django.contrib.auth import get_user_model
+from django.db.models import Case, DecimalField, F, Value, When
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from apps.core.constants import QTY_DECIMAL_PLACES, QTY_MAX_DIGITS
+from apps.core.models import business_date_of
+from apps.products.models import Product
+from apps.users.models import EmployeeGroup
+
+from .consumption import deduct_ingredients
+from .models import BakeryProductStock, Production
+
+MAX_RUNS = 200
+ZERO = Decimal("0")
+_QTY = DecimalField(max_digits=QTY_MAX_DIGITS, decimal_places=QTY_DECIMAL_PLACES)
+
+
+def _pk(value):
+    try:
+        return int(value) if value not in (None, "") else None
+    except (TypeError, ValueError):
+        return False
+
+
+def _quantity(value, field: str) -> Decimal:
+    """Run quantity → Decimal rounded to `field`'s decimal places; ValueError
+    when it is not a finite number the column can hold."""
+    spec = Production._meta.get_field(field)
+    try:
+        qty = Decimal(str(value))
+    except (InvalidOperation, TypeError, ValueError):
+        raise ValueError(value)
+    if not qty.is_finite() or abs(qty) >= Decimal(10) ** (spec.max_digits - spec.decimal_places):
+        raise ValueError(value)
+    return qty.quantize(Decimal(1).scaleb(-spec.decimal_places), rounding=ROUND_HALF_UP)
+
+
+def _moment(value):
+    if value in (None, ""):
+        return None
+    dt = parse_datetime(str(value))
+    if dt is None:
+        raise ValueError(value)
+    return dt if timezone.is_aware(dt) else timezone.make_aware(dt)
+
+
+def build(runs, *, defaults: dict) -> tuple[list[Production], list[dict]]:
+    """Validate runs → (unsaved productions, errors).
+
+    Each run: product, nonvoy or group, meshok_count, unit_count
+    [, occurred_at, note]; `defaults` fills nonvoy, group, occurred_at and
+    note left empty. Same rules as ProductionSerializer: exactly one of
+    nonvoy / group.
+    """
+    def cell(run, key):
+        value = run.get(key)
+        return defaults.get(key) if value in (None, "") else value
+
+    products = Product.objects.in_bulk({_pk(r.get("product")) for r in runs} - {None, False})
+    bakers = get_user_model().objects.filter(role="nonvoy").in_bulk(
+        {_pk(cell(r, "nonvoy")) for r in runs} - {None, False}
+    )
+    groups = EmployeeGroup.objects.in_bulk({_pk(cell(r, "group")) for r in runs} - {None, False})
+    now = timezone.now()
+
+    productions, errors = [], []
+    for line, run in enumerate(runs, start=1):
+        def fail(detail):
+            errors.append({"row": line, "detail": detail})
+
+        product = products.get(_pk(run.get("product")))
+        if product is None:
+            fail(f"Mahsulot topilmadi: {run.get('product')}")
+            continue
+        nonvoy, group = cell(run, "nonvoy"), cell(run, "group")
+        if nonvoy not in (None, "") and group not in (None, ""):
+            fail("Faqat bittasini tanlang: nonvoy yoki guruh.")
+            continue
+        if nonvoy in (None, "") and group in (None, ""):
+            fail("Nonvoy yoki guruh tanlanishi kerak.")
+            continue
+        nonvoy_id, group_id = _pk(nonvoy), _pk(group)
+        if nonvoy not in (None, "") and nonvoy_id not in bakers:
+            fail(f"Nonvoy topilmadi: {nonvoy}")
+            continue
+        if group not in (None, "") and group_id not in groups:
+            fail(f"Guruh topilmadi: {group}")
+            continue
+        try:
+            meshok = _quantity(run.get("meshok_count"), "meshok_count")
+            units = _quantity(run.get("unit_count") or 0, "unit_count")
+        except ValueError:
+            fail(f"Miqdor noto'g'ri: {run.get('meshok_count')} / {run.get('unit_count')}")
+            continue
+        if meshok < 0 or units < 0:
+            fail("Miqdor manfiy bo'lmasligi kerak")
+            continue
+        try:
+            occurred_at = _moment(cell(run, "occurred_at")) or now
+        except ValueError:
+            fail(f"Vaqt noto'g'ri: {cell(run, 'occurred_at')}")
+            continue
+        productions.append(Production(
+            product=product,
+            nonvoy_id=nonvoy_id,
+            group_id=group_id,
+            meshok_count=meshok,
+            unit_count=units,
+            occurred_at=occurred_at,
+            business_date=business_date_of(occurred_at),
+            note=str(cell(run, "note") or ""),
+        ))
+    return productions, errors
+
+
+def _add_stock(deltas: dict) -> None:
+    """deltas: {product_id: units} → create missing stock rows, then one UPDATE."""
+    deltas = {pk: qty for pk, qty in deltas.items() if qty}
+    if not deltas:
+        return
+    have = set(BakeryProductStock.objects.filter(product_id__in=deltas).values_list("product_id", flat=True))
+    BakeryProductStock.objects.bulk_create(
+        [BakeryProductStock(product_id=pk) for pk in deltas if pk not in have],
+        ignore_conflicts=True,
+    )
+    whens = [When(product_id=pk, then=Value(qty, output_field=_QTY)) for pk, qty in deltas.items()]
+    BakeryProductStock.objects.filter(product_id__in=deltas).update(
+        quantity=F("quantity") + Case(*whens, default=Value(ZERO, output_field=_QTY), output_field=_QTY)
+    )
+
+
+def save(productions: list[Production]) -> list[Production]:
+    """Write validated runs with their stock and ingredient effects (inside atomic)."""
+    productions = Production.objects.bulk_create(productions)
+    units: dict[int, Decimal] = {}
+    for p in productions:
+        if p.unit_count > 0:
+            units[p.product_id] = units.get(p.product_id, ZERO) + p.unit_count
+    _add_stock(units)
+    deduct_ingredients(productions)
+    return productions
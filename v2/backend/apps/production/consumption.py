@@ -0,0 +1,55 @@
+"""Recipe deduction for production runs.
+
+`deduct_ingredients` takes any number of saved Production rows, reads their
+recipes in one query, locks the touched ingredients once (id order), draws
+every usage's cost from the FIFO lots in one pass (apps.inventory.lots) and
+writes one consumption movement per recipe line through apps.inventory.stock
+plus the costed usage rows in one bulk_create: a constant number of
+statements however long the recipes or the shift are.
+"""
+from decimal import Decimal
+
+from apps.inventory import lots, stock
+from apps.inventory.models import IngredientMovementKind, ProductRecipe
+
+from .models import ProductionIngredientUsage
+
+
+def deduct_ingredients(productions) -> list[ProductionIngredientUsage]:
+    """Deduct recipe amount × meshok_count for every production (inside atomic)."""
+    productions = [p for p in productions if p.meshok_count]
+    if not productions:
+        return []
+    recipes: dict[int, list] = {}
+    for item in ProductRecipe.objects.filter(
+        product_id__in={p.product_id for p in productions}
+    ).order_by("id"):
+        recipes.setdefault(item.product_id, []).append(item)
+
+    usages = []
+    for prod in productions:
+        meshok = Decimal(str(prod.meshok_count))
+        for item in recipes.get(prod.product_id, ()):
+            usages.append(ProductionIngredientUsage(
+                production=prod,
+                ingredient_id=item.ingredient_id,
+                quantity_used=Decimal(str(item.amount_per_meshok)) * meshok,
+            ))
+    if not usages:
+        return []
+
+    locked = stock.lock(u.ingredient_id for u in usages)
+    costs = lots.draw([(u.ingredient_id, u.quantity_used) for u in usages], locked)
+    for u, cost in zip(usages, costs):
+        u.cost_uzs = cost
+    stock.apply(
+        [
+            stock.movement(
+                u.ingredient_id, -u.quantity_used, IngredientMovementKind.CONSUMPTION,
+                reference=u.production, occurred_at=u.production.occurred_at,
+            )
+            for u in usages
+        ],
+        locked=locked,
+    )
+    return ProductionIngredientUsage.objects.bulk_create(usages)
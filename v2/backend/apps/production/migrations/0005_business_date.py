@@ -0,0 +1,42 @@
+# Generated by Django 5.1.15 on 2026-10-19 03:19
+
+from django.conf import settings
+from django.db import migrations, models
+
+from apps.core.models import backfill_business_date
+
+SOURCES = [
+    ("Production", "occurred_at"),
+]
+
+
+def backfill(apps, schema_editor):
+    for model_name, source in SOURCES:
+        backfill_business_date(apps.get_model("production", model_name), source, schema_editor)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('production', '0004_inventoryrevisionreport_batch_id'),
+        ('products', '0005_product_updated_at_index'),
+        ('users', '0004_user_archived_state'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='production',
+            name='business_date',
+            field=models.DateField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='production',
+            index=models.Index(fields=['business_date', 'product'], name='production__busines_2b4c7a_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='production',
+            index=models.Index(fields=['nonvoy', 'business_date'], name='production__nonvoy__e1d452_idx'),
+        ),
+        migrations.RunPython(backfill, migrations.RunPython.noop),
+    ]
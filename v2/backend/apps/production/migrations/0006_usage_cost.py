@@ -0,0 +1,28 @@
+# Generated by Django 5.1.15 on 2026-10-19 03:40
+
+from django.db import migrations, models
+
+from apps.inventory.lots import backfill_lots
+
+
+def backfill(apps, schema_editor):
+    # Price past usages at the Ombor price and open FIFO lots for current stock
+    # from the latest purchases (plus one opening lot for the unexplained rest).
+    backfill_lots(apps.get_model)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0005_ingredient_lots'),
+        ('production', '0005_business_date'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='productioningredientusage',
+            name='cost_uzs',
+            field=models.DecimalField(decimal_places=2, default=0, max_digits=16),
+        ),
+        migrations.RunPython(backfill, migrations.RunPython.noop),
+    ]
@@ -11,11 +11,11 @@ from django.conf import settings
 from django.core.exceptions import ValidationError
 from django.db import models
 
-from apps.core.constants import QTY_DECIMAL_PLACES, QTY_MAX_DIGITS
-from apps.core.models import TimestampedModel
+from apps.core.constants import MONEY_DECIMAL_PLACES, MONEY_MAX_DIGITS, QTY_DECIMAL_PLACES, QTY_MAX_DIGITS
+from apps.core.models import BusinessDateModel, TimestampedModel
 
 
-class Production(TimestampedModel):
+class Production(BusinessDateModel, TimestampedModel):
     """
     One production run — a nonvoy (or group) produced N qop of a product.
 
@@ -60,6 +60,8 @@ class Production(TimestampedModel):
         indexes = [
             models.Index(fields=["product", "-occurred_at"]),
             models.Index(fields=["nonvoy", "-occurred_at"]),
+            models.Index(fields=["business_date", "product"]),
+            models.Index(fields=["nonvoy", "business_date"]),
         ]
     def clean(self):
         if not self.nonvoy_id and not self.group_id:
@@ -93,6 +95,10 @@ class ProductionIngredientUsage(models.Model):
     quantity_used = models.DecimalField(
         max_digits=QTY_MAX_DIGITS, decimal_places=QTY_DECIMAL_PLACES
     )
+    # FIFO cost of quantity_used, drawn from the ingredient's lots (apps.inventory.lots).
+    cost_uzs = models.DecimalField(
+        max_digits=MONEY_MAX_DIGITS, decimal_places=MONEY_DECIMAL_PLACES, default=0
+    )
     recorded_at = models.DateTimeField(auto_now_add=True)
 
     class Meta:
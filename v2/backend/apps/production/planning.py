@@ -0,0 +1,104 @@
+"""Material requirements planning (MRP) from pending orders.
+
+For a delivery date:
+
+    demand[p]      = Σ (quantity − delivered_quantity) of pending / partial order items
+    shortfall[p]   = max(demand[p] − BakeryProductStock.quantity, 0)
+    meshok[p]      = shortfall[p] / meshok_size[p]           (rounded up to whole meshok)
+    required[i]    = Σ_p meshok[p] × recipe[p, i]             (recipe × meshok vector)
+    shortage[i]    = max(required[i] − Ingredient.quantity, 0)
+
+Three queries: demand with stock and meshok size grouped per product, the
+recipe rows of the products to bake (the sparse recipe matrix), and the
+current quantities of the ingredients they use. The explosion is one pass
+over the recipe rows — a sparse matrix × meshok vector product.
+"""
+from decimal import ROUND_CEILING, Decimal
+
+from django.db.models import F, Sum
+
+from apps.inventory.models import Ingredient, ProductRecipe
+from apps.orders.models import OrderItem, OrderStatus
+
+ZERO = Decimal("0")
+QTY = Decimal("0.001")
+OPEN_STATUSES = (OrderStatus.PENDING, OrderStatus.PARTIALLY_DELIVERED)
+
+
+def _qty(value: Decimal) -> Decimal:
+    return value.quantize(QTY, rounding=ROUND_CEILING)
+
+
+def _demand(day) -> list[dict]:
+    """Open quantity per product for `day`, with finished stock and meshok size."""
+    return list(
+        OrderItem.objects
+        .filter(order__order_date=day, order__status__in=OPEN_STATUSES)
+        .values("product_id", "product__name", "product__meshok_size", "product__stock__quantity")
+        .annotate(open_qty=Sum(F("quantity") - F("delivered_quantity")))
+        .filter(open_qty__gt=0)
+        .order_by("product__sort_order", "product__name")
+    )
+
+
+def plan(day, *, whole_meshok: bool = True) -> dict:
+    """Products to bake and ingredients they need for the orders of `day`."""
+    products, meshok = [], {}
+    for row in _demand(day):
+        pid = row["product_id"]
+        open_qty = Decimal(row["open_qty"])
+        in_stock = row["product__stock__quantity"] or ZERO
+        shortfall = max(open_qty - in_stock, ZERO)
+        size = row["product__meshok_size"] or ZERO
+        exact = shortfall / size if size > 0 else ZERO
+        to_bake = exact.to_integral_value(rounding=ROUND_CEILING) if whole_meshok else _qty(exact)
+        if to_bake > 0:
+            meshok[pid] = to_bake
+        products.append({
+            "product_id": pid,
+            "name": row["product__name"],
+            "ordered": str(open_qty),
+            "in_stock": str(_qty(in_stock)),
+            "shortfall": str(_qty(shortfall)),
+            "meshok_size": str(size),
+            "meshok_exact": str(_qty(exact)),
+            "meshok_to_bake": str(to_bake),
+            "units_to_bake": str(to_bake * size),
+            "missing_meshok_size": shortfall > 0 and size <= 0,
+        })
+
+    # required = recipe matrix × meshok vector (one pass over the sparse rows).
+    required: dict[int, Decimal] = {}
+    used_by: dict[int, list] = {}
+    for ing_id, pid, amount in ProductRecipe.objects.filter(product_id__in=list(meshok)).values_list(
+        "ingredient_id", "product_id", "amount_per_meshok"
+    ):
+        required[ing_id] = required.get(ing_id, ZERO) + amount * meshok[pid]
+        used_by.setdefault(ing_id, []).append(pid)
+
+    ingredients = []
+    for ing in Ingredient.objects.filter(id__in=list(required)).select_related("unit").order_by("name"):
+        need = _qty(required[ing.id])
+        short = max(need - ing.quantity, ZERO)
+        ingredients.append({
+            "ingredient_id": ing.id,
+            "name": ing.name,
+            "unit": ing.unit.short,
+            "required": str(need),
+            "on_hand": str(ing.quantity),
+            "shortage": str(_qty(short)),
+            "sufficient": short == 0,
+            "shortage_cost_uzs": str((short * ing.avg_cost_uzs).quantize(Decimal("0.01"))),
+            "products": sorted(used_by[ing.id]),
+        })
+    ingredients.sort(key=lambda r: (r["sufficient"], r["name"]))
+
+    return {
+        "date": day.isoformat(),
+        "whole_meshok": whole_meshok,
+        "products": products,
+        "ingredients": ingredients,
+        "total_meshok": str(sum(meshok.values(), ZERO)),
+        "can_produce": all(r["sufficient"] for r in ingredients),
+        "shortage_cost_uzs": str(sum((Decimal(r["shortage_cost_uzs"]) for r in ingredients), ZERO)),
+    }
@@ -1,20 +1,21 @@
+from datetime import date, timedelta
 from decimal import Decimal
 
 from django.db import transaction
 from django.db.models import F
+from django.utils import timezone
 from rest_framework import filters, status, viewsets
 from rest_framework.decorators import action
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 
-from apps.inventory.models import Ingredient
+from apps.core.idempotency import idempotent
 from apps.products.models import Product
 
-from .models import (
-    BakeryProductStock,
-    Production,
-    ProductionIngredientUsage,
-)
+from . import batch as batch_mod
+from . import planning
+from .consumption import deduct_ingredients
+from .models import BakeryProductStock, Production
 from .serializers import BakeryProductStockSerializer, ProductionSerializer
 
 
@@ -34,11 +35,15 @@ class ProductionViewSet(viewsets.ModelViewSet):
         if group := p.get("group"):
             qs = qs.filter(group_id=group)
         if date_from := p.get("date_from"):
-            qs = qs.filter(occurred_at__date__gte=date_from)
+            qs = qs.filter(business_date__gte=date_from)
         if date_to := p.get("date_to"):
-            qs = qs.filter(occurred_at__date__lte=date_to)
+            qs = qs.filter(business_date__lte=date_to)
         return qs
 
+    @idempotent
+    def create(self, request, *args, **kwargs):
+        return super().create(request, *args, **kwargs)
+
     def perform_create(self, serializer):
         """
         Create production run:
@@ -50,7 +55,6 @@ class ProductionViewSet(viewsets.ModelViewSet):
         with transaction.atomic():
             prod = serializer.save()
             product = Product.objects.get(pk=prod.product_id)
-            meshok = Decimal(str(prod.meshok_count))
             unit_count = Decimal(str(prod.unit_count))
 
             # (2) bump finished-goods stock by submitted unit_count (may be 0)
@@ -60,27 +64,62 @@ class ProductionViewSet(viewsets.ModelViewSet):
                     quantity=F("quantity") + unit_count
                 )
 
-            # (3) deduct recipe ingredients + audit usage rows
-            recipe_items = list(
-                product.recipe_items.select_related("ingredient").all()
-            )
-            usages = []
-            for item in recipe_items:
-                needed = Decimal(str(item.amount_per_meshok)) * meshok
-                ing = Ingredient.objects.select_for_update().get(
-                    pk=item.ingredient_id
-                )
-                ing.quantity = ing.quantity - needed
-                ing.save(update_fields=["quantity"])
-                usages.append(
-                    ProductionIngredientUsage(
-                        production=prod,
-                        ingredient=ing,
-                        quantity_used=needed,
-                    )
-                )
-            if usages:
-                ProductionIngredientUsage.objects.bulk_create(usages)
+            # (3) deduct recipe ingredients + audit usage rows — one id-ordered
+            # lock, one UPDATE and one bulk_create for the whole recipe.
+            deduct_ingredients([prod])
+
+    @action(detail=False, methods=["get"])
+    def mrp(self, request):
+        """What to bake for a day's open orders and whether the ingredients cover it.
+
+        ?date=YYYY-MM-DD (default tomorrow), ?whole_meshok=0 for fractional
+        meshok. See apps.production.planning.
+        """
+        raw = request.query_params.get("date")
+        try:
+            day = date.fromisoformat(raw) if raw else timezone.localdate() + timedelta(days=1)
+        except ValueError:
+            return Response({"detail": "date YYYY-MM-DD formatida bo'lishi kerak"}, status=400)
+        whole = request.query_params.get("whole_meshok") not in ("0", "false")
+        return Response(planning.plan(day, whole_meshok=whole))
+
+    @action(detail=False, methods=["post"], url_path="batch")
+    @idempotent
+    def batch(self, request):
+        """Record a whole shift's runs at once.
+
+        Body: {"runs": [{"product", "nonvoy" | "group", "meshok_count",
+        "unit_count" [, "occurred_at", "note"]}], "nonvoy"?, "group"?,
+        "occurred_at"?, "note"?} — top-level values fill empty run fields.
+        Any bad run rejects the batch; otherwise every run, its stock bump and
+        its recipe deduction are written in one transaction (see .batch).
+        """
+        runs = request.data.get("runs")
+        if not isinstance(runs, list) or not runs:
+            return Response({"detail": "runs ro'yxati bo'sh bo'lmasligi kerak"}, status=status.HTTP_400_BAD_REQUEST)
+        if len(runs) > batch_mod.MAX_RUNS:
+            return Response({"detail": f"Ko'pi bilan {batch_mod.MAX_RUNS} ta"}, status=status.HTTP_400_BAD_REQUEST)
+        if not all(isinstance(r, dict) for r in runs):
+            return Response({"detail": "runs elementlari obyekt bo'lishi kerak"}, status=status.HTTP_400_BAD_REQUEST)
+        defaults = {
+            k: request.data.get(k)
+            for k in ("nonvoy", "group", "occurred_at", "note")
+            if request.data.get(k) not in (None, "")
+        }
+        productions, errors = batch_mod.build(runs, defaults=defaults)
+        if errors:
+            return Response({"detail": "Xatolar bor", "errors": errors}, status=status.HTTP_400_BAD_REQUEST)
+
+        with transaction.atomic():
+            productions = batch_mod.save(productions)
+        saved = (
+            Production.objects.select_related("product", "nonvoy", "group")
+            .filter(pk__in=[p.pk for p in productions]).order_by("occurred_at", "id")
+        )
+        return Response(
+            {"count": len(productions), "results": ProductionSerializer(saved, many=True).data},
+            status=status.HTTP_201_CREATED,
+        )
 
     def perform_update(self, serializer):
         """
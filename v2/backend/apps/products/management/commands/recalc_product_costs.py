@@ -0,0 +1,28 @@
+"""
+Recompute Product.cost_price_uzs for the whole catalogue (see apps.products.pricing).
+
+Usage:
+    python manage.py recalc_product_costs            # every product
+    python manage.py recalc_product_costs --active   # skip archived products
+
+Normal writes keep costs current on commit; run this after bulk imports or
+direct database edits to ingredient prices or recipes.
+"""
+from django.core.management.base import BaseCommand
+
+from apps.products.models import Product
+from apps.products.pricing import recalc_costs
+
+
+class Command(BaseCommand):
+    help = "Recompute cost_price_uzs of every product from recipes and ingredient prices."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--active", action="store_true", help="Only non-archived products.")
+
+    def handle(self, *args, **options):
+        ids = None
+        if options["active"]:
+            ids = Product.objects.filter(is_archived=False).values_list("id", flat=True)
+        updated = recalc_costs(ids)
+        self.stdout.write(self.style.SUCCESS(f"Recalculated {updated} product costs."))
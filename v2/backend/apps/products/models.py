@@ -59,6 +59,7 @@ class Product(TimestampedModel, ArchivableModel):
 
     class Meta:
         ordering = ["sort_order", "name"]
+        indexes = [models.Index(fields=["updated_at"])]  # delta sync feed
 
     def __str__(self) -> str:
         return self.name
@@ -1,36 +1,79 @@
 """Cost price (tan narx) calculation — feature #24.
 
 per-unit cost = sum(recipe.amount_per_meshok * ingredient.avg_cost_uzs) / product.meshok_size
+
+`recalc_costs` prices any set of products with one grouped recipe × ingredient
+query and writes them with one bulk_update. Writes that change a cost input
+(purchases, set-price, recipe edits) call `schedule_recalc` instead: the
+affected product ids are collected (apps.core.deferred) and recomputed once,
+after the transaction commits — a request touching the same product many
+times recomputes it once, and the purchase transaction holds no product rows.
 """
 from decimal import Decimal
 
+from django.db.models import DecimalField, ExpressionWrapper, F, Sum
 from django.utils import timezone
 
+from apps.core.constants import MONEY_DECIMAL_PLACES, MONEY_MAX_DIGITS
+from apps.core.deferred import defer
+
 from .models import Product
 
+CENT = Decimal("0.01")
+_COST = DecimalField(max_digits=MONEY_MAX_DIGITS + 8, decimal_places=MONEY_DECIMAL_PLACES + 3)
 
-def recalc_product_cost(product: Product) -> Decimal:
-    """Recompute and persist cost_price_uzs for a single product."""
-    total = Decimal("0")
-    for item in product.recipe_items.select_related("ingredient").all():
-        total += Decimal(item.amount_per_meshok) * Decimal(item.ingredient.avg_cost_uzs)
-    meshok = Decimal(product.meshok_size or 0)
-    per_unit = (total / meshok) if meshok > 0 else Decimal("0")
-    product.cost_price_uzs = per_unit
-    product.cost_price_updated_at = timezone.now()
-    product.save(update_fields=["cost_price_uzs", "cost_price_updated_at"])
-    return per_unit
-
-
-def recalc_products_using_ingredient(ingredient_id: int) -> int:
-    """Recompute cost for every product whose recipe references this ingredient."""
-    products = (
-        Product.objects
-        .filter(recipe_items__ingredient_id=ingredient_id)
-        .distinct()
+
+def recalc_costs(product_ids=None) -> int:
+    """Recompute and persist cost_price_uzs for `product_ids` (None = every product)."""
+    from apps.inventory.models import ProductRecipe
+
+    products = Product.objects.only("id", "meshok_size", "cost_price_uzs", "cost_price_updated_at")
+    recipes = ProductRecipe.objects.all()
+    if product_ids is not None:
+        product_ids = set(product_ids)
+        if not product_ids:
+            return 0
+        products = products.filter(id__in=product_ids)
+        recipes = recipes.filter(product_id__in=product_ids)
+    material = dict(
+        recipes.values("product_id")
+        .annotate(t=Sum(ExpressionWrapper(F("amount_per_meshok") * F("ingredient__avg_cost_uzs"), output_field=_COST)))
+        .order_by()
+        .values_list("product_id", "t")
     )
-    n = 0
+    now = timezone.now()
+    products = list(products)
     for p in products:
-        recalc_product_cost(p)
-        n += 1
-    return n
+        meshok = Decimal(p.meshok_size or 0)
+        total = material.get(p.id) or Decimal("0")
+        p.cost_price_uzs = (total / meshok).quantize(CENT) if meshok > 0 else Decimal("0")
+        p.cost_price_updated_at = now
+    Product.objects.bulk_update(products, ["cost_price_uzs", "cost_price_updated_at"], batch_size=500)
+    return len(products)
+
+
+def recalc_product_cost(product: Product) -> Decimal:
+    """Recompute and persist cost_price_uzs for a single product, now."""
+    recalc_costs([product.id])
+    product.refresh_from_db(fields=["cost_price_uzs", "cost_price_updated_at"])
+    return product.cost_price_uzs
+
+
+def schedule_recalc(*, products=(), ingredients=()) -> None:
+    """Recompute these products — and every product whose recipe uses these
+    ingredients — once the current transaction commits (immediately outside one)."""
+    keys = [("product", pk) for pk in products] + [("ingredient", pk) for pk in ingredients]
+    defer("products.cost_recalc", keys, _flush)
+
+
+def _flush(keys) -> None:
+    from apps.inventory.models import ProductRecipe
+
+    ids = {pk for kind, pk in keys if kind == "product"}
+    ingredients = {pk for kind, pk in keys if kind == "ingredient"}
+    if ingredients:
+        ids.update(
+            ProductRecipe.objects.filter(ingredient_id__in=ingredients)
+            .values_list("product_id", flat=True)
+        )
+    recalc_costs(ids)
@@ -4,7 +4,7 @@ from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 
 from .models import Product
-from .pricing import recalc_product_cost
+from .pricing import recalc_costs, recalc_product_cost
 from .serializers import ProductSerializer
 
 
@@ -39,14 +39,10 @@ class ProductViewSet(viewsets.ModelViewSet):
         """Feature #24 — recompute cost_price_uzs from the current recipe."""
         product = self.get_object()
         recalc_product_cost(product)
-        product.refresh_from_db()
         return Response(ProductSerializer(product).data)
 
     @action(detail=False, methods=["post"], url_path="recalc-costs")
     def recalc_all_costs(self, request):
         """Recompute cost for every active product — useful after a price shift."""
-        updated = 0
-        for p in Product.objects.filter(is_archived=False):
-            recalc_product_cost(p)
-            updated += 1
+        updated = recalc_costs(Product.objects.filter(is_archived=False).values_list("id", flat=True))
         return Response({"updated": updated})
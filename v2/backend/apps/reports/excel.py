@@ -11,10 +11,24 @@ CENTER = Alignment(horizontal="center", vertical="center")
 
 
 def make_workbook(sheet_title: str, headers: list[str], rows: list[list]) -> BytesIO:
+    return make_multi_sheet_workbook([(sheet_title, headers, rows)])
+
+
+def make_multi_sheet_workbook(sheets: list[tuple[str, list[str], list[list]]]) -> BytesIO:
+    """One workbook, one styled sheet per (title, headers, rows) tuple."""
     wb = Workbook()
-    ws = wb.active
-    ws.title = sheet_title[:31]  # Excel limit
+    for i, (sheet_title, headers, rows) in enumerate(sheets):
+        ws = wb.active if i == 0 else wb.create_sheet()
+        ws.title = sheet_title[:31]  # Excel limit
+        _write_sheet(ws, headers, rows)
+
+    buf = BytesIO()
+    wb.save(buf)
+    buf.seek(0)
+    return buf
 
+
+def _write_sheet(ws, headers: list[str], rows: list[list]) -> None:
     for col, h in enumerate(headers, start=1):
         cell = ws.cell(row=1, column=col, value=h)
         cell.fill = HEADER_FILL
@@ -30,8 +44,3 @@ def make_workbook(sheet_title: str, headers: list[str], rows: list[list]) -> Byt
 
     for col in range(1, len(headers) + 1):
         ws.column_dimensions[ws.cell(row=1, column=col).column_letter].width = 18
-
-    buf = BytesIO()
-    wb.save(buf)
-    buf.seek(0)
-    return buf
@@ -10,22 +10,22 @@ Special structured endpoints:
 - GET /reports/cos/   → COS breakdown per product (live ingredient prices)
 - GET /reports/sofp/  → Financial position snapshot
 """
-from datetime import datetime, timedelta
+from datetime import date, datetime, timedelta
 from decimal import Decimal
 
-from django.db.models import OuterRef, Q, Subquery, Sum
-from django.db.models.functions import TruncDate
+from django.db.models import F, OuterRef, Q, Subquery, Sum
 from django.http import HttpResponse
 from django.utils import timezone
-from django.utils.timezone import get_current_timezone
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 from rest_framework.views import APIView
 
+from apps.finance.balances import with_live_balances
 from apps.finance.models import GeneralExpense, KassaAccount, Payment
+from apps.inventory import history
 from apps.inventory.models import Ingredient, Purchase
 from apps.orders.models import Order, OrderItem
-from apps.production.models import Production
+from apps.production.models import Production, ProductionIngredientUsage
 from apps.products.models import Product
 from apps.salary.models import SalaryPayment
 from apps.shops.models import Shop
@@ -56,9 +56,9 @@ def _dec(v) -> float:
 def build_payments(date_from=None, date_to=None):
     qs = Payment.objects.select_related("shop", "account", "collected_by").order_by("-received_at")
     if date_from:
-        qs = qs.filter(received_at__date__gte=date_from)
+        qs = qs.filter(business_date__gte=date_from)
     if date_to:
-        qs = qs.filter(received_at__date__lte=date_to)
+        qs = qs.filter(business_date__lte=date_to)
 
     headers = [
         "Sana", "Do'kon", "Tur", "Valyuta", "Summa", "Skidka",
@@ -91,9 +91,9 @@ def build_payments(date_from=None, date_to=None):
 def build_production(date_from=None, date_to=None, product=None, products=None):
     qs = Production.objects.select_related("product", "nonvoy", "group").order_by("-occurred_at")
     if date_from:
-        qs = qs.filter(occurred_at__date__gte=date_from)
+        qs = qs.filter(business_date__gte=date_from)
     if date_to:
-        qs = qs.filter(occurred_at__date__lte=date_to)
+        qs = qs.filter(business_date__lte=date_to)
     if products:
         qs = qs.filter(product_id__in=products)
     elif product:
@@ -120,11 +120,11 @@ def build_expenses(date_from=None, date_to=None):
     purchases = Purchase.objects.select_related("ingredient", "account")
     expenses = GeneralExpense.objects.select_related("category", "account")
     if date_from:
-        purchases = purchases.filter(occurred_at__date__gte=date_from)
-        expenses = expenses.filter(occurred_at__date__gte=date_from)
+        purchases = purchases.filter(business_date__gte=date_from)
+        expenses = expenses.filter(business_date__gte=date_from)
     if date_to:
-        purchases = purchases.filter(occurred_at__date__lte=date_to)
-        expenses = expenses.filter(occurred_at__date__lte=date_to)
+        purchases = purchases.filter(business_date__lte=date_to)
+        expenses = expenses.filter(business_date__lte=date_to)
 
     headers = ["Sana", "Tur", "Nomi", "Valyuta", "Miqdor", "Kassa", "Izoh"]
     rows = []
@@ -166,9 +166,9 @@ def build_expenses(date_from=None, date_to=None):
 def build_salary(date_from=None, date_to=None):
     qs = SalaryPayment.objects.select_related("user", "account").order_by("-occurred_at")
     if date_from:
-        qs = qs.filter(occurred_at__date__gte=date_from)
+        qs = qs.filter(business_date__gte=date_from)
     if date_to:
-        qs = qs.filter(occurred_at__date__lte=date_to)
+        qs = qs.filter(business_date__lte=date_to)
 
     headers = ["Sana", "Xodim", "Tur", "Valyuta", "Miqdor", "Kassa", "Davr", "Izoh"]
     rows = []
@@ -305,6 +305,37 @@ def _build_price_map() -> dict:
     return {r["id"]: float(r["avg_cost_uzs"] or 0) for r in rows}
 
 
+def _build_actual_material_map(start, end) -> dict:
+    """Return {product_id: actual material cost per unit produced (float)}.
+
+    The FIFO cost recorded on every ProductionIngredientUsage (cost_uzs, drawn
+    from the ingredient lots when the run was saved — see apps.inventory.lots)
+    summed over runs with business_date in [start, end], divided by the units
+    those runs produced: two grouped queries, no re-pricing. Products with no
+    costed run in the range are absent; callers fall back to the recipe ×
+    Ombor price standard cost from _compute_product_cos.
+    """
+    cost = {
+        r["production__product_id"]: r["c"]
+        for r in ProductionIngredientUsage.objects
+        .filter(production__business_date__gte=start, production__business_date__lte=end)
+        .values("production__product_id")
+        .annotate(c=Sum("cost_uzs"))
+        .order_by()
+    }
+    units = (
+        Production.objects
+        .filter(business_date__gte=start, business_date__lte=end, product_id__in=list(cost))
+        .values("product_id")
+        .annotate(u=Sum("unit_count"))
+        .order_by()
+    )
+    return {
+        r["product_id"]: round(float(cost[r["product_id"]]) / float(r["u"]), 2)
+        for r in units if r["u"] and cost[r["product_id"]]
+    }
+
+
 def _build_labour_map(days: int = 90) -> dict:
     """Return {product_id: production_labour_per_meshok_float}.
 
@@ -354,7 +385,7 @@ def _build_labour_map(days: int = 90) -> dict:
     by_producer: dict = {}
     runs = (
         Production.objects
-        .filter(occurred_at__date__gte=cutoff)
+        .filter(business_date__gte=cutoff)
         .values(
             "product_id", "nonvoy_id", "group_id", "meshok_count", "unit_count",
             "product__production_salary_per_unit_uzs",
@@ -464,13 +495,15 @@ def _compute_product_cos(product, price_map: dict, labour_map: dict | None = Non
 
 # ─────────────────── Daily P&L builder ───────────────────
 
-def _collect_pnl_data(start, end, tz):
+def _collect_pnl_data(start, end):
     """Accrual-matched P&L inputs for pnl_daily and gross_overall.
 
     Revenue = net delivered value (delivered − returned) at the locked unit
         price, bucketed by order date. Cancelled orders excluded.
-    Cost of sales = MATERIAL recipe cost of those delivered units, ingredients
-        valued at the Ombor manual price (avg_cost_uzs). This matches revenue on
+    Cost of sales = MATERIAL cost of those delivered units: the actual FIFO
+        cost of the ingredients consumed per unit produced in the range
+        (_build_actual_material_map), falling back to the recipe at the Ombor
+        manual price (avg_cost_uzs) for products not produced. This matches revenue on
         an accrual basis (cost of what was actually sold), unlike the old
         cash-basis "ingredients bought this day" which swung wildly with
         purchase timing. Returned as the material component only; callers add the
@@ -481,15 +514,17 @@ def _collect_pnl_data(start, end, tz):
           Tan narxi so gross profit reflects the true cost of making the goods.
         - other_sal: all other roles = period overhead, kept on the Oylik line.
     """
-    # Material + communal cost per unit for every product: materials at the manual
-    # Ombor price, plus the per-unit communal (gas/electricity) rate. Both are
-    # folded into Tan narxi (COGS); nonvoy labour is added separately below.
+    # Material + communal cost per unit for every product: actual consumed
+    # material cost (standard recipe cost as fallback), plus the per-unit communal
+    # (gas/electricity) rate. Both are folded into Tan narxi (COGS); nonvoy labour
+    # is added separately below.
     price_map = _build_price_map()
+    actual = _build_actual_material_map(start, end)
     mat_per_unit = {}
     for p in Product.objects.prefetch_related("recipe_items__ingredient__unit"):
         info = _compute_product_cos(p, price_map)
         mat_per_unit[p.id] = (
-            info["ingredient_per_unit"] + info["communal_per_unit"] + info["other_per_unit"]
+            actual.get(p.id, info["ingredient_per_unit"]) + info["communal_per_unit"] + info["other_per_unit"]
         )
 
     # Revenue + material COGS from net-delivered order items (accrual, matched).
@@ -512,9 +547,9 @@ def _collect_pnl_data(start, end, tz):
     # Expenses — categories flagged include_in_pnl=False are left out of the P&L.
     exp_qs = (
         GeneralExpense.objects
-        .filter(occurred_at__date__gte=start, occurred_at__date__lte=end, currency="UZS")
+        .filter(business_date__gte=start, business_date__lte=end, currency="UZS")
         .exclude(category__include_in_pnl=False)
-        .annotate(d=TruncDate("occurred_at", tzinfo=tz))
+        .annotate(d=F("business_date"))
         .values("d")
         .annotate(total=Sum("amount"))
     )
@@ -529,9 +564,9 @@ def _collect_pnl_data(start, end, tz):
     # exactly one bucket, so nothing is double-counted and Sof foyda is unchanged.
     sal_rows = (
         SalaryPayment.objects
-        .filter(occurred_at__date__gte=start, occurred_at__date__lte=end, currency="UZS")
+        .filter(business_date__gte=start, business_date__lte=end, currency="UZS")
         .exclude(kind="advance")
-        .annotate(d=TruncDate("occurred_at", tzinfo=tz))
+        .annotate(d=F("business_date"))
         .values("d", "kind", "user__role")
         .annotate(total=Sum("amount"))
     )
@@ -571,9 +606,7 @@ def build_pnl_daily(date_from=None, date_to=None):
     today = timezone.localdate()
     start = datetime.strptime(date_from, "%Y-%m-%d").date() if date_from else today.replace(day=1)
     end = datetime.strptime(date_to, "%Y-%m-%d").date() if date_to else today
-    tz = get_current_timezone()
-
-    day_data, t = _collect_pnl_data(start, end, tz)
+    day_data, t = _collect_pnl_data(start, end)
 
     headers = ["Sana", "Savdo", "Tan narxi", "Yalpi foyda", "Xarajatlar", "Op. foyda", "Oylik", "Sof foyda"]
     rows = []
@@ -610,9 +643,7 @@ def build_gross_overall(date_from=None, date_to=None):
     today = timezone.localdate()
     start = datetime.strptime(date_from, "%Y-%m-%d").date() if date_from else today.replace(day=1)
     end = datetime.strptime(date_to, "%Y-%m-%d").date() if date_to else today
-    tz = get_current_timezone()
-
-    day_data, t = _collect_pnl_data(start, end, tz)
+    day_data, t = _collect_pnl_data(start, end)
 
     headers = ["Hafta", "Savdo", "Tan narxi", "Yalpi foyda", "Xarajatlar", "Op. foyda", "Oylik", "Sof foyda"]
     rows = []
@@ -804,6 +835,7 @@ class GrossDailyView(APIView):
             .prefetch_related("recipe_items__ingredient__unit")
         )
         cos_map = {p.id: _compute_product_cos(p, price_map, labour_map) for p in product_objs}
+        actual_material = _build_actual_material_map(date, date)
 
         # ── Order items for this date (only delivered, excluding cancelled) ──
         items = (
@@ -817,7 +849,7 @@ class GrossDailyView(APIView):
         # Build products list and client × product matrix
         products_map = {}   # product_id → {"id", "name"}
         shops_map = {}      # shop_id → {"shop", "cells": {product_id: {qty, price, total}}, "total"}
-        cost_of_sales = 0.0  # material recipe cost of goods delivered today
+        cost_of_sales = 0.0  # material cost of goods delivered today (actual FIFO, recipe fallback)
 
         for item in items:
             pid = item.product_id
@@ -839,7 +871,7 @@ class GrossDailyView(APIView):
             total = qty * price
             _cinfo = cos_map.get(pid, {})
             cost_of_sales += (
-                _cinfo.get("ingredient_per_unit", 0.0)
+                actual_material.get(pid, _cinfo.get("ingredient_per_unit", 0.0))
                 + _cinfo.get("communal_per_unit", 0.0)
                 + _cinfo.get("other_per_unit", 0.0)
             ) * net_qty
@@ -875,7 +907,7 @@ class GrossDailyView(APIView):
         # ── Production batches for this day ───────────────────────────────
         prod_qs = (
             Production.objects
-            .filter(occurred_at__date=date)
+            .filter(business_date=date)
             .select_related("product")
             .values("product_id", "product__name")
             .annotate(total_meshoks=Sum("meshok_count"))
@@ -905,7 +937,7 @@ class GrossDailyView(APIView):
         # Categories flagged include_in_pnl=False are left out of the P&L.
         exp_total = float(
             GeneralExpense.objects
-            .filter(occurred_at__date=date, currency="UZS")
+            .filter(business_date=date, currency="UZS")
             .exclude(category__include_in_pnl=False)
             .aggregate(t=Sum("amount"))["t"] or 0
         )
@@ -916,7 +948,7 @@ class GrossDailyView(APIView):
         other_sal_total = 0.0
         for r in (
             SalaryPayment.objects
-            .filter(occurred_at__date=date, currency="UZS")
+            .filter(business_date=date, currency="UZS")
             .exclude(kind="advance")
             .values("kind", "user__role")
             .annotate(t=Sum("amount"))
@@ -929,7 +961,7 @@ class GrossDailyView(APIView):
             else:
                 other_sal_total += amt
 
-        # Tan narxi = MATERIAL recipe cost of goods delivered today (accrual,
+        # Tan narxi = MATERIAL cost of goods delivered today (accrual,
         # matched to sales) PLUS today's nonvoy (production) wages — the direct
         # cost of making the goods. Remaining wages sit on the Oylik line below.
         cos_display = cost_of_sales + prod_sal_total
@@ -982,10 +1014,11 @@ class PnlDetailView(APIView):
             return Response({"detail": "Invalid date. Use YYYY-MM-DD."}, status=400)
 
         price_map = _build_price_map()
+        actual = _build_actual_material_map(start, end)
         ing_per_unit, communal_per_unit, other_per_unit, names = {}, {}, {}, {}
         for p in Product.objects.prefetch_related("recipe_items__ingredient__unit"):
             info = _compute_product_cos(p, price_map)
-            ing_per_unit[p.id] = info["ingredient_per_unit"]
+            ing_per_unit[p.id] = actual.get(p.id, info["ingredient_per_unit"])
             communal_per_unit[p.id] = info["communal_per_unit"]
             other_per_unit[p.id] = info["other_per_unit"]
             names[p.id] = p.name
@@ -1039,7 +1072,7 @@ class PnlDetailView(APIView):
         # Expenses — line items (categories flagged include_in_pnl=False excluded).
         exp_qs = (
             GeneralExpense.objects
-            .filter(occurred_at__date__gte=start, occurred_at__date__lte=end, currency="UZS")
+            .filter(business_date__gte=start, business_date__lte=end, currency="UZS")
             .exclude(category__include_in_pnl=False)
             .select_related("category").order_by("-occurred_at")
         )
@@ -1057,7 +1090,7 @@ class PnlDetailView(APIView):
         # every other role stays on the Oylik line.
         sal_qs = (
             SalaryPayment.objects
-            .filter(occurred_at__date__gte=start, occurred_at__date__lte=end, currency="UZS")
+            .filter(business_date__gte=start, business_date__lte=end, currency="UZS")
             .exclude(kind="advance").select_related("user").order_by("-occurred_at")
         )
         prod_sal_items, other_sal_items = [], []
@@ -1159,21 +1192,33 @@ class CosBreakdownView(APIView):
 
 # ────────────────── SOFP endpoint ──────────────────
 class SofpView(APIView):
-    """GET /reports/sofp/ — Statement of financial position (assets snapshot)."""
+    """GET /reports/sofp/ — Statement of financial position (assets snapshot).
+
+    ?date=YYYY-MM-DD values inventory at that day's closing stock (movement
+    ledger, apps.inventory.history); cash, receivables and liabilities are
+    always current.
+    """
 
     permission_classes = [IsAuthenticated]
 
     def get(self, request):
+        today = timezone.localdate()
+        try:
+            inv_date = date.fromisoformat(request.query_params["date"]) if request.query_params.get("date") else today
+        except ValueError:
+            return Response({"detail": "date YYYY-MM-DD formatida bo'lishi kerak"}, status=400)
+        if inv_date > today:
+            inv_date = today
         price_map = _build_price_map()
 
         # Cash — kassa balances
-        accounts = list(KassaAccount.objects.all())
+        accounts = list(with_live_balances(KassaAccount.objects.all()))
         cash_items = [
-            {"name": a.name, "uzs": float(a.balance_uzs), "usd": float(a.balance_usd)}
+            {"name": a.name, "uzs": float(a.live_balance_uzs), "usd": float(a.live_balance_usd)}
             for a in accounts
         ]
-        total_cash_uzs = sum(float(a.balance_uzs) for a in accounts)
-        total_cash_usd = sum(float(a.balance_usd) for a in accounts)
+        total_cash_uzs = sum(float(a.live_balance_uzs) for a in accounts)
+        total_cash_usd = sum(float(a.live_balance_usd) for a in accounts)
 
         # Receivables (asset) = shops that OWE us (positive balance). Credits
         # (negative balance = we owe the shop) are a liability, shown separately
@@ -1201,12 +1246,15 @@ class SofpView(APIView):
             total_credit_uzs += max(0.0, -bal_uzs)
             total_credit_usd += max(0.0, -bal_usd)
 
-        # Inventory — current stock valued at the manual Ombor price (avg_cost_uzs)
+        # Inventory — stock (current, or as of ?date) valued at the manual Ombor
+        # price (avg_cost_uzs; there is no price history, so past days use today's).
         ingredients = Ingredient.objects.filter(is_archived=False).select_related("unit")
+        if inv_date < today:
+            ingredients = history.with_stock_as_of(ingredients, inv_date)
         inv_items = []
         total_inv = 0.0
         for ing in ingredients:
-            qty = float(ing.quantity)
+            qty = float(ing.stock_as_of if inv_date < today else ing.quantity)
             price = price_map.get(ing.id, 0.0)
             val = qty * price
             total_inv += val
@@ -1256,7 +1304,7 @@ class SofpView(APIView):
                 "total_usd": total_recv_usd,
             },
             # Inventory is valued from the manual Ombor price (avg_cost_uzs, UZS only).
-            "inventory": {"items": inv_items, "total_uzs": total_inv},
+            "inventory": {"items": inv_items, "total_uzs": total_inv, "as_of": inv_date.isoformat()},
             # Liabilities — customer credits (overpaid shops) + salary owed to staff.
             "liabilities": {
                 "customer_credits": {
@@ -0,0 +1,41 @@
+# Generated by Django 5.1.15 on 2026-10-19 03:19
+
+from django.conf import settings
+from django.db import migrations, models
+
+from apps.core.models import backfill_business_date
+
+SOURCES = [
+    ("SalaryPayment", "occurred_at"),
+]
+
+
+def backfill(apps, schema_editor):
+    for model_name, source in SOURCES:
+        backfill_business_date(apps.get_model("salary", model_name), source, schema_editor)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('finance', '0009_business_date'),
+        ('salary', '0005_salaryrate_week_start_day'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='salarypayment',
+            name='business_date',
+            field=models.DateField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='salarypayment',
+            index=models.Index(fields=['user', 'business_date'], name='salary_sala_user_id_67cd26_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='salarypayment',
+            index=models.Index(fields=['business_date', 'kind'], name='salary_sala_busines_ce797a_idx'),
+        ),
+        migrations.RunPython(backfill, migrations.RunPython.noop),
+    ]
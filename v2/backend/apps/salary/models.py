@@ -7,7 +7,7 @@ from apps.core.constants import (
     MONEY_MAX_DIGITS,
     Currency,
 )
-from apps.core.models import TimestampedModel
+from apps.core.models import BusinessDateModel, TimestampedModel
 
 
 class RateType(models.TextChoices):
@@ -78,7 +78,7 @@ class PaymentKind(models.TextChoices):
     DEDUCTION = "deduction", "Ushlab qolish"
 
 
-class SalaryPayment(TimestampedModel):
+class SalaryPayment(BusinessDateModel, TimestampedModel):
     """A payment to an employee. `kind` keeps salary vs advance vs bonus separate."""
 
     user = models.ForeignKey(
@@ -118,6 +118,8 @@ class SalaryPayment(TimestampedModel):
         indexes = [
             models.Index(fields=["user", "-occurred_at"]),
             models.Index(fields=["kind", "-occurred_at"]),
+            models.Index(fields=["user", "business_date"]),
+            models.Index(fields=["business_date", "kind"]),
         ]
 
     def __str__(self) -> str:
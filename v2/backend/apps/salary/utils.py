@@ -74,11 +74,11 @@ def _production_contributions(user, d_from=None, d_to=None, reset_date=None):
         .select_related("product", "group")
     )
     if d_from:
-        individual = individual.filter(occurred_at__date__gte=d_from)
-        group = group.filter(occurred_at__date__gte=d_from)
+        individual = individual.filter(business_date__gte=d_from)
+        group = group.filter(business_date__gte=d_from)
     if d_to:
-        individual = individual.filter(occurred_at__date__lte=d_to)
-        group = group.filter(occurred_at__date__lte=d_to)
+        individual = individual.filter(business_date__lte=d_to)
+        group = group.filter(business_date__lte=d_to)
 
     for p in individual:
         yield Decimal(p.meshok_count or 0), Decimal(p.unit_count or 0), p.product
@@ -191,7 +191,7 @@ def salary_outstanding(user, rate_obj=None) -> Decimal:
     earned_total = calculate_earned(user, rate_obj)
     owed_pay = SalaryPayment.objects.filter(user=user, settled=False).exclude(kind="bonus")
     if reset:
-        owed_pay = owed_pay.filter(occurred_at__date__gte=reset)
+        owed_pay = owed_pay.filter(business_date__gte=reset)
     paid_total = owed_pay.aggregate(t=Sum("amount"))["t"] or Decimal("0.00")
     return earned_total - paid_total
 
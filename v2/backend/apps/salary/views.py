@@ -2,16 +2,17 @@ from decimal import Decimal
 
 from django.contrib.auth import get_user_model
 from django.db import transaction
-from django.db.models import F, Sum
-from django.db.models.functions import TruncDate
-from django.utils import timezone
+from django.db.models import Sum
 from rest_framework import filters, viewsets
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 from rest_framework.views import APIView
 
+from apps.core.idempotency import idempotent
 from apps.core.permissions import ReadOrManagerWrite
-from apps.finance.models import KassaAccount, KassaTransaction, KassaTransactionType
+from apps.finance import posting
+from apps.finance.models import KassaTransactionType
+from apps.finance.posting import Leg
 from apps.production.models import Production
 
 from .models import PaymentKind, SalaryPayment, SalaryRate
@@ -52,15 +53,18 @@ def _cash_delta(kind: str, amount) -> Decimal:
     return -Decimal(amount)
 
 
-def _bump_account_balance(account, currency: str, delta) -> None:
-    """Apply *delta* to the cached per-currency balance via an F() expression."""
+def _salary_legs(payment) -> list[Leg]:
+    """The payment's cash out of the kassa; none for a non-cash deduction."""
+    delta = _cash_delta(payment.kind, payment.amount)
     if delta == 0:
-        return
-    if currency == "UZS":
-        account.balance_uzs = F("balance_uzs") + delta
-    else:
-        account.balance_usd = F("balance_usd") + delta
-    account.save(update_fields=["balance_uzs", "balance_usd"])
+        return []
+    return [Leg(
+        account_id=payment.account_id,
+        currency=payment.currency,
+        amount=delta,
+        kind=KIND_TO_KASSA_KIND.get(payment.kind, KassaTransactionType.SALARY),
+        note=f"{payment.get_kind_display()} · {payment.user.display_name}",
+    )]
 
 
 class SalaryPaymentViewSet(viewsets.ModelViewSet):
@@ -77,29 +81,21 @@ class SalaryPaymentViewSet(viewsets.ModelViewSet):
         if kind := p.get("kind"):
             qs = qs.filter(kind=kind)
         if date_from := p.get("date_from"):
-            qs = qs.filter(occurred_at__date__gte=date_from)
+            qs = qs.filter(business_date__gte=date_from)
         if date_to := p.get("date_to"):
-            qs = qs.filter(occurred_at__date__lte=date_to)
+            qs = qs.filter(business_date__lte=date_to)
         return qs
 
+    @idempotent
+    def create(self, request, *args, **kwargs):
+        return super().create(request, *args, **kwargs)
+
     def perform_create(self, serializer):
         with transaction.atomic():
             payment = serializer.save(created_by=self.request.user)
-            delta = _cash_delta(payment.kind, payment.amount)
-            if delta == 0:
-                return  # deduction: non-cash, no kassa movement, no ledger row
-            account = KassaAccount.objects.select_for_update().get(pk=payment.account_id)
-            _bump_account_balance(account, payment.currency, delta)
-            KassaTransaction.objects.create(
-                account=payment.account,
-                kind=KIND_TO_KASSA_KIND.get(payment.kind, KassaTransactionType.SALARY),
-                currency=payment.currency,
-                amount=delta,
-                reference_model="salary.SalaryPayment",
-                reference_id=payment.id,
-                note=f"{payment.get_kind_display()} · {payment.user.display_name}",
-                occurred_at=payment.occurred_at,
-                created_by=self.request.user,
+            posting.post(
+                payment, _salary_legs(payment),
+                occurred_at=payment.occurred_at, user=payment.created_by,
             )
 
     def perform_update(self, serializer):
@@ -108,53 +104,21 @@ class SalaryPaymentViewSet(viewsets.ModelViewSet):
             # payments (V1-synced) have no linked KassaTransaction, but their
             # cash-out IS already baked into the account's absolute balance, so
             # the balance is always maintained incrementally from the payment
-            # fields (NOT from the ledger row, which may not exist).
-            old = serializer.instance
-            old_delta = _cash_delta(old.kind, old.amount)
-            old_currency = old.currency
-            old_account_id = old.account_id
-
+            # fields (NOT from the ledger row, which may not exist). Their
+            # ledger stays row-less (rewrite_missing=False); a change to a
+            # non-cash deduction drops the row.
+            old_legs = _salary_legs(serializer.instance)
             payment = serializer.save()
-            new_delta = _cash_delta(payment.kind, payment.amount)
-
-            # Reverse the old effect, then apply the new one (handles a changed
-            # account, currency, amount, or kind — including to/from deduction,
-            # whose cash delta is 0).
-            if old_delta != 0:
-                old_account = KassaAccount.objects.select_for_update().get(pk=old_account_id)
-                _bump_account_balance(old_account, old_currency, -old_delta)
-            if new_delta != 0:
-                new_account = KassaAccount.objects.select_for_update().get(pk=payment.account_id)
-                _bump_account_balance(new_account, payment.currency, new_delta)
-
-            # Keep the linked ledger row (if any) consistent with the new state;
-            # drop it when the payment becomes a non-cash deduction.
-            linked = KassaTransaction.objects.filter(
-                reference_model="salary.SalaryPayment", reference_id=payment.id,
+            posting.repost(
+                payment, old_legs, _salary_legs(payment),
+                occurred_at=payment.occurred_at, user=payment.created_by,
+                rewrite_missing=False,
             )
-            if new_delta != 0:
-                linked.update(
-                    account=payment.account,
-                    kind=KIND_TO_KASSA_KIND.get(payment.kind, KassaTransactionType.SALARY),
-                    currency=payment.currency,
-                    amount=new_delta,
-                    occurred_at=payment.occurred_at,
-                    note=f"{payment.get_kind_display()} · {payment.user.display_name}",
-                )
-            else:
-                linked.delete()
 
     def perform_destroy(self, instance):
         with transaction.atomic():
-            delta = _cash_delta(instance.kind, instance.amount)
-            # Reverse the payment's cash effect (0 for a non-cash deduction).
-            if delta != 0:
-                account = KassaAccount.objects.select_for_update().get(pk=instance.account_id)
-                _bump_account_balance(account, instance.currency, -delta)
-            KassaTransaction.objects.filter(
-                reference_model="salary.SalaryPayment",
-                reference_id=instance.id,
-            ).delete()
+            # Reverse the payment's cash effect (none for a non-cash deduction).
+            posting.unpost(instance, _salary_legs(instance), user=self.request.user)
             instance.delete()
 
 
@@ -179,49 +143,51 @@ class ProductionBreakdownView(APIView):
 
         # Both individual and group productions count the FULL quantity for this
         # user — matching the salary calculation (no split among group members).
-        individual = Production.objects.filter(nonvoy_id=user_id).select_related("product")
-        group_qs = Production.objects.filter(
-            group__members__id=user_id, nonvoy__isnull=True
-        ).select_related("product", "group")
+        # Grouped by the stored Tashkent business_date, so a run entered near
+        # midnight lands on its local day without converting rows in Python.
+        individual = Production.objects.filter(nonvoy_id=user_id)
+        group_qs = Production.objects.filter(group__members__id=user_id, nonvoy__isnull=True)
         if reset:
-            individual = individual.filter(occurred_at__date__gte=reset)
-            group_qs = group_qs.filter(occurred_at__date__gte=reset)
-        individual = list(individual.order_by("-occurred_at"))
-        group_prods = list(group_qs.order_by("-occurred_at"))
-
-        rows = [p for p in individual] + [p for p in group_prods]
+            individual = individual.filter(business_date__gte=reset)
+            group_qs = group_qs.filter(business_date__gte=reset)
 
         by_date: dict[str, dict] = {}
-        for p in rows:
-            # Use Tashkent-local date, not the UTC date — a production entered
-            # near midnight (stored ~19:00 UTC the previous day) otherwise shows
-            # up one day behind in the daily breakdown.
-            d = timezone.localtime(p.occurred_at).date().isoformat()
-            entry = by_date.setdefault(
-                d,
-                {
-                    "date": d,
-                    "total_meshok": Decimal("0"),
-                    "total_units": Decimal("0"),
-                    "products": {},
-                },
-            )
-            meshok = Decimal(p.meshok_count or 0)
-            units = Decimal(p.unit_count or 0)
-            entry["total_meshok"] += meshok
-            entry["total_units"] += units
-            prod_entry = entry["products"].setdefault(
-                p.product_id,
-                {
-                    "product_id": p.product_id,
-                    "product_name": p.product.name,
-                    "meshok": Decimal("0"),
-                    "units": Decimal("0"),
-                    "salary_per_unit": str(p.product.production_salary_per_unit_uzs or 0),
-                },
+        for qs in (individual, group_qs):
+            rows = (
+                qs.values(
+                    "business_date", "product_id", "product__name",
+                    "product__production_salary_per_unit_uzs",
+                )
+                .annotate(meshok=Sum("meshok_count"), units=Sum("unit_count"))
+                .order_by("product__sort_order", "product__name")
             )
-            prod_entry["meshok"] += meshok
-            prod_entry["units"] += units
+            for r in rows:
+                d = r["business_date"].isoformat()
+                entry = by_date.setdefault(
+                    d,
+                    {
+                        "date": d,
+                        "total_meshok": Decimal("0"),
+                        "total_units": Decimal("0"),
+                        "products": {},
+                    },
+                )
+                meshok = Decimal(r["meshok"] or 0)
+                units = Decimal(r["units"] or 0)
+                entry["total_meshok"] += meshok
+                entry["total_units"] += units
+                prod_entry = entry["products"].setdefault(
+                    r["product_id"],
+                    {
+                        "product_id": r["product_id"],
+                        "product_name": r["product__name"],
+                        "meshok": Decimal("0"),
+                        "units": Decimal("0"),
+                        "salary_per_unit": str(r["product__production_salary_per_unit_uzs"] or 0),
+                    },
+                )
+                prod_entry["meshok"] += meshok
+                prod_entry["units"] += units
 
         results = []
         for d in sorted(by_date.keys(), reverse=True):
@@ -286,9 +252,9 @@ class SalaryEmployeeSummaryView(APIView):
             )
             period_pay = SalaryPayment.objects.filter(user=u, settled=False)
             if date_from:
-                period_pay = period_pay.filter(occurred_at__date__gte=date_from)
+                period_pay = period_pay.filter(business_date__gte=date_from)
             if date_to:
-                period_pay = period_pay.filter(occurred_at__date__lte=date_to)
+                period_pay = period_pay.filter(business_date__lte=date_to)
             by_kind = {k: Decimal("0.00") for k in ["salary", "advance", "bonus", "deduction"]}
             for row in period_pay.values("kind").annotate(total=Sum("amount")):
                 by_kind[row["kind"]] = row["total"] or Decimal("0.00")
@@ -310,7 +276,7 @@ class SalaryEmployeeSummaryView(APIView):
             earned_total = calculate_earned(u, rate_obj) if rate_obj else Decimal("0.00")
             owed_pay = SalaryPayment.objects.filter(user=u, settled=False).exclude(kind="bonus")
             if reset:
-                owed_pay = owed_pay.filter(occurred_at__date__gte=reset)
+                owed_pay = owed_pay.filter(business_date__gte=reset)
             # salary + advance + deduction all reduce what we owe (a deduction is a
             # non-cash withholding); bonus is discretionary and excluded above.
             paid_total = owed_pay.aggregate(t=Sum("amount"))["t"] or Decimal("0.00")
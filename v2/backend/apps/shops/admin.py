@@ -1,6 +1,13 @@
 from django.contrib import admin
 
-from .models import Region, Shop, ShopProductPrice
+from .models import (
+    Region,
+    Shop,
+    ShopLedgerEntry,
+    ShopPriceBatch,
+    ShopPriceChange,
+    ShopProductPrice,
+)
 
 
 @admin.register(Region)
@@ -27,6 +34,8 @@ class ShopAdmin(admin.ModelAdmin):
         "loan_limit_uzs", "loan_limit_usd",
         "is_archived",
     ]
+    # Balances move only through the shop ledger (apps.shops.ledger).
+    readonly_fields = ["loan_balance_uzs", "loan_balance_usd"]
 
 
 @admin.register(ShopProductPrice)
@@ -34,3 +43,27 @@ class ShopProductPriceAdmin(admin.ModelAdmin):
     list_display = ["shop", "product", "price", "currency"]
     list_filter = ["currency"]
     ordering = ["shop__name", "product__name"]
+
+
+@admin.register(ShopLedgerEntry)
+class ShopLedgerEntryAdmin(admin.ModelAdmin):
+    list_display = ["shop", "occurred_at", "kind", "amount", "balance_after", "currency"]
+    list_filter = ["kind", "currency"]
+    search_fields = ["shop__name", "note"]
+    ordering = ["-occurred_at", "-id"]
+
+
+class ShopPriceChangeInline(admin.TabularInline):
+    model = ShopPriceChange
+    extra = 0
+    can_delete = False
+    readonly_fields = ["shop", "product", "currency", "old_price", "new_price"]
+
+
+@admin.register(ShopPriceBatch)
+class ShopPriceBatchAdmin(admin.ModelAdmin):
+    list_display = ["created_at", "source", "currency", "change_count", "created_by", "note"]
+    list_filter = ["source", "currency"]
+    ordering = ["-created_at"]
+    readonly_fields = ["source", "currency", "rule", "change_count", "created_by"]
+    inlines = [ShopPriceChangeInline]
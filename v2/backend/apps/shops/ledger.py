@@ -0,0 +1,213 @@
+"""Shop debt ledger — the only writer of Shop.loan_balance_* (feature #17, #16).
+
+Every delivery, return, payment and manual adjustment goes through
+`post_entry` / `post_many`, which move the cached balance on the (locked)
+shop row and append ShopLedgerEntry rows carrying the balance after each
+change. Entries are stamped with the business time of the document behind
+them (`occurred_at`: a payment's received_at, noon of a past order's
+order_date, otherwise now); the posting time stays in `created_at`. Rows are
+kept in (occurred_at, id) order, so each row's `balance_after` is the
+balance as of that moment:
+
+- balance as of T  → the last entry with occurred_at <= T (one index lookup);
+- timeline/statement → the entries inside the window (one index range scan),
+  opened by the balance as of the window start.
+
+A backdated entry lands before rows already posted; the `balance_after` of
+those later rows is moved by its amount in the same transaction.
+"""
+from datetime import datetime, time, timedelta
+from decimal import Decimal
+
+from django.utils import timezone
+
+from .models import Shop, ShopLedgerEntry, ShopLedgerKind
+
+ZERO = Decimal("0")
+# Business time of a delivery on a past order date (the 0005 backfill uses it too).
+ORDER_TIME = time(12)
+
+
+def _balance_field(currency: str) -> str:
+    return "loan_balance_uzs" if currency == "UZS" else "loan_balance_usd"
+
+
+def order_moment(order_date):
+    """Business time of a delivery / return on an order: noon of its
+    order_date when that day is past, otherwise now."""
+    now = timezone.now()
+    if order_date is None or order_date >= timezone.localdate(now):
+        return now
+    return timezone.make_aware(datetime.combine(order_date, ORDER_TIME))
+
+
+def post_entry(
+    shop: Shop,
+    currency: str,
+    amount,
+    kind: str,
+    *,
+    reference=None,
+    note: str = "",
+    user=None,
+    occurred_at=None,
+) -> ShopLedgerEntry | None:
+    """Apply `amount` to the shop's debt and append the ledger row.
+
+    The caller must hold `select_for_update()` on `shop` inside a transaction;
+    the in-memory balance is then the committed one and is updated in place.
+    `reference` is the model instance that caused the change, if any, and
+    `occurred_at` its business time (default now). Zero amounts are ignored.
+    """
+    rows = post_many({shop.pk: shop}, [{
+        "shop_id": shop.pk, "currency": currency, "amount": amount, "kind": kind,
+        "reference": reference, "note": note, "occurred_at": occurred_at,
+    }], user=user)
+    return rows[0] if rows else None
+
+
+def post_many(shops: dict, entries: list[dict], *, user=None) -> list[ShopLedgerEntry]:
+    """Batch form of `post_entry` for several shops / currencies at once.
+
+    `shops` maps id → Shop rows already locked by the caller; each entry is
+    {"shop_id", "currency", "amount", "kind", "reference", "note",
+    "occurred_at"} (occurred_at optional, default now). Balances are written
+    with one bulk_update, the ledger rows with one bulk_create. Zero amounts
+    are skipped.
+    """
+    now = timezone.now()
+    groups, touched = {}, {}
+    for e in entries:
+        amount = Decimal(str(e["amount"]))
+        if amount == 0:
+            continue
+        shop = shops[e["shop_id"]]
+        field = _balance_field(e["currency"])
+        setattr(shop, field, getattr(shop, field) + amount)
+        shop.updated_at = now
+        touched[shop.pk] = shop
+        reference = e.get("reference")
+        groups.setdefault((shop.pk, e["currency"]), []).append(ShopLedgerEntry(
+            shop=shop,
+            currency=e["currency"],
+            kind=e["kind"],
+            amount=amount,
+            occurred_at=e.get("occurred_at") or now,
+            reference_model=reference._meta.label if reference is not None else "",
+            reference_id=reference.pk if reference is not None else None,
+            note=(e.get("note") or "")[:255],
+            created_by=user if user is not None and user.is_authenticated else None,
+        ))
+    if not touched:
+        return []
+    rows, shifted = [], []
+    for (shop_id, currency), new in groups.items():
+        rows.extend(_chain(shop_id, currency, new, shifted))
+    Shop.objects.bulk_update(
+        list(touched.values()), ["loan_balance_uzs", "loan_balance_usd", "updated_at"]
+    )
+    if shifted:
+        ShopLedgerEntry.objects.bulk_update(shifted, ["balance_after"], batch_size=500)
+    ShopLedgerEntry.objects.bulk_create(rows)
+    return rows
+
+
+def _chain(shop_id: int, currency: str, new: list, shifted: list) -> list:
+    """Set balance_after on the `new` rows of one shop / currency (returned in
+    insert order) and on the already-posted rows dated after the earliest of
+    them, which are appended to `shifted`. Usually nothing is dated later and
+    this costs the balance lookup only."""
+    new.sort(key=lambda r: r.occurred_at)  # stable: same-time rows keep entry order
+    first = new[0].occurred_at
+    balance = balance_as_of(shop_id, currency, first)
+    later = list(
+        ShopLedgerEntry.objects
+        .filter(shop_id=shop_id, currency=currency, occurred_at__gt=first)
+        .order_by("occurred_at", "id")
+    )
+    # At equal times, posted rows come first: the new rows get higher ids.
+    timeline = sorted(
+        [(r.occurred_at, 0, i, r) for i, r in enumerate(later)]
+        + [(r.occurred_at, 1, i, r) for i, r in enumerate(new)],
+        key=lambda t: t[:3],
+    )
+    for _, is_new, _, row in timeline:
+        balance += row.amount
+        if not is_new and row.balance_after != balance:
+            shifted.append(row)
+        row.balance_after = balance
+    return new
+
+
+def _day_start(d):
+    return timezone.make_aware(datetime.combine(d, time.min))
+
+
+def _day_end(d):
+    return timezone.make_aware(datetime.combine(d, time.max))
+
+
+def balance_as_of(shop_id: int, currency: str, at) -> Decimal:
+    """Debt in `currency` right after everything posted up to `at`."""
+    last = (
+        ShopLedgerEntry.objects
+        .filter(shop_id=shop_id, currency=currency, occurred_at__lte=at)
+        .order_by("-occurred_at", "-id")
+        .values_list("balance_after", flat=True)
+        .first()
+    )
+    return last if last is not None else ZERO
+
+
+def statement(shop_id: int, currency: str, date_from, date_to) -> dict:
+    """Opening balance, the window's entries (oldest first) and closing balance."""
+    start = _day_start(date_from)
+    opening = balance_as_of(shop_id, currency, start - timedelta(microseconds=1))
+    entries = list(
+        ShopLedgerEntry.objects
+        .filter(
+            shop_id=shop_id,
+            currency=currency,
+            occurred_at__gte=start,
+            occurred_at__lte=_day_end(date_to),
+        )
+        .order_by("occurred_at", "id")
+        .values(
+            "id", "kind", "amount", "balance_after", "occurred_at",
+            "reference_model", "reference_id", "note",
+        )
+    )
+    closing = entries[-1]["balance_after"] if entries else opening
+    return {"opening": opening, "entries": entries, "closing": closing}
+
+
+def daily_timeline(shop_id: int, currency: str, date_from, date_to) -> list[dict]:
+    """Per-day delivered / returned / paid / adjusted totals and closing balance.
+
+    Only days with entries are returned, newest first.
+    """
+    days: dict = {}
+    for e in statement(shop_id, currency, date_from, date_to)["entries"]:
+        day = timezone.localtime(e["occurred_at"]).date()
+        row = days.setdefault(day, {
+            "delivered": ZERO, "returned": ZERO, "paid": ZERO, "adjusted": ZERO,
+        })
+        kind = e["kind"]
+        if kind == ShopLedgerKind.DELIVERY:
+            row["delivered"] += e["amount"]
+        elif kind == ShopLedgerKind.RETURN:
+            row["returned"] -= e["amount"]
+        elif kind == ShopLedgerKind.PAYMENT:
+            row["paid"] -= e["amount"]
+        else:
+            row["adjusted"] += e["amount"]
+        row["balance_after"] = e["balance_after"]
+
+    return [
+        {
+            "date": day.isoformat(),
+            **row,
+            "net": row["delivered"] - row["returned"] - row["paid"] + row["adjusted"],
+        }
+        for day, row in sorted(days.items(), reverse=True)
+    ]
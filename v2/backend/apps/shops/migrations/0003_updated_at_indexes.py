@@ -0,0 +1,24 @@
+# Generated by Django 5.1.15 on 2026-10-19 02:56
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0005_product_updated_at_index'),
+        ('shops', '0002_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='shop',
+            index=models.Index(fields=['updated_at'], name='shops_shop_updated_dcc75b_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='shopproductprice',
+            index=models.Index(fields=['updated_at'], name='shops_shopp_updated_aad971_idx'),
+        ),
+    ]
@@ -0,0 +1,38 @@
+# Generated by Django 5.1.15 on 2026-10-19 02:58
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('shops', '0003_updated_at_indexes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ShopLedgerEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(auto_now_add=True, db_index=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('currency', models.CharField(choices=[('UZS', "UZS (so'm)"), ('USD', 'USD (dollar)')], max_length=3)),
+                ('kind', models.CharField(choices=[('opening', "Boshlang'ich qoldiq"), ('delivery', 'Yetkazib berish'), ('return', 'Vozvrat'), ('payment', "To'lov"), ('adjustment', "Qo'lda tuzatish")], max_length=16)),
+                ('amount', models.DecimalField(decimal_places=2, help_text='Positive = debt up, negative = debt down', max_digits=16)),
+                ('balance_after', models.DecimalField(decimal_places=2, max_digits=16)),
+                ('occurred_at', models.DateTimeField()),
+                ('reference_id', models.PositiveIntegerField(blank=True, null=True)),
+                ('reference_model', models.CharField(blank=True, max_length=64)),
+                ('note', models.CharField(blank=True, max_length=255)),
+                ('created_by', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to=settings.AUTH_USER_MODEL)),
+                ('shop', models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='ledger_entries', to='shops.shop')),
+            ],
+            options={
+                'ordering': ['shop', 'currency', 'occurred_at', 'id'],
+                'indexes': [models.Index(fields=['shop', 'currency', 'occurred_at', 'id'], name='shops_shopl_shop_id_494c26_idx'), models.Index(fields=['reference_model', 'reference_id'], name='shops_shopl_referen_abf56e_idx')],
+            },
+        ),
+    ]
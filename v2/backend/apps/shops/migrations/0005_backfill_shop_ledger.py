@@ -0,0 +1,81 @@
+"""Seed ShopLedgerEntry from existing orders and payments.
+
+Per shop and currency: one delivery row (and one return row) per order at
+noon of its order_date, one payment row per payment at received_at, and an
+opening row before them for whatever the history does not explain (e.g.
+balances carried over from v1). Running balances therefore end exactly at
+the shop's current cached loan balance.
+"""
+from collections import defaultdict
+from datetime import datetime, time, timedelta
+from decimal import Decimal
+
+from django.db import migrations
+from django.db.models import DecimalField, F, Sum
+from django.utils import timezone
+
+
+def backfill(apps, schema_editor):
+    Shop = apps.get_model("shops", "Shop")
+    ShopLedgerEntry = apps.get_model("shops", "ShopLedgerEntry")
+    OrderItem = apps.get_model("orders", "OrderItem")
+    Payment = apps.get_model("finance", "Payment")
+
+    events = defaultdict(list)  # (shop_id, currency) -> [(at, kind, amount, model, id)]
+    money = DecimalField(max_digits=16, decimal_places=2)
+    orders = (
+        OrderItem.objects
+        .exclude(order__status="cancelled")
+        .values("order_id", "order__shop_id", "order__currency", "order__order_date")
+        .annotate(
+            delivered=Sum(F("delivered_quantity") * F("unit_price"), output_field=money),
+            returned=Sum(F("returned_quantity") * F("unit_price"), output_field=money),
+        )
+    )
+    for r in orders:
+        at = timezone.make_aware(datetime.combine(r["order__order_date"], time(12)))
+        key = (r["order__shop_id"], r["order__currency"])
+        if r["delivered"]:
+            events[key].append((at, "delivery", r["delivered"], "orders.Order", r["order_id"]))
+        if r["returned"]:
+            events[key].append((at, "return", -r["returned"], "orders.Order", r["order_id"]))
+    for p in Payment.objects.values("id", "shop_id", "currency", "amount", "discount", "received_at"):
+        events[(p["shop_id"], p["currency"])].append(
+            (p["received_at"], "payment", -(p["amount"] + p["discount"]), "finance.Payment", p["id"])
+        )
+
+    now = timezone.now()
+    rows = []
+    for shop in Shop.objects.only("id", "loan_balance_uzs", "loan_balance_usd"):
+        for currency, current in (("UZS", shop.loan_balance_uzs), ("USD", shop.loan_balance_usd)):
+            history = sorted(events.get((shop.id, currency), []), key=lambda e: (e[0], e[4]))
+            opening = current - sum((e[2] for e in history), Decimal("0"))
+            if opening:
+                first_at = history[0][0] - timedelta(seconds=1) if history else now
+                history.insert(0, (first_at, "opening", opening, "", None))
+            balance = Decimal("0")
+            for at, kind, amount, ref_model, ref_id in history:
+                balance += amount
+                rows.append(ShopLedgerEntry(
+                    shop_id=shop.id, currency=currency, kind=kind, amount=amount,
+                    balance_after=balance, occurred_at=at,
+                    reference_model=ref_model, reference_id=ref_id,
+                ))
+    ShopLedgerEntry.objects.bulk_create(rows, batch_size=2000)
+
+
+def unbackfill(apps, schema_editor):
+    apps.get_model("shops", "ShopLedgerEntry").objects.all().delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("shops", "0004_shop_ledger"),
+        ("orders", "0004_order_updated_at_index"),
+        ("finance", "0006_payment_updated_at_index"),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill, unbackfill),
+    ]
@@ -0,0 +1,49 @@
+# Generated by Django 5.1.15 on 2026-10-19 03:04
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0005_product_updated_at_index'),
+        ('shops', '0005_backfill_shop_ledger'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ShopPriceBatch',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(auto_now_add=True, db_index=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('source', models.CharField(choices=[('import', 'Excel import'), ('rule', "Foizli o'zgartirish")], max_length=16)),
+                ('currency', models.CharField(choices=[('UZS', "UZS (so'm)"), ('USD', 'USD (dollar)')], help_text='Default currency of the batch', max_length=3)),
+                ('rule', models.JSONField(blank=True, default=dict, help_text='Rule parameters or import file name')),
+                ('change_count', models.PositiveIntegerField(default=0)),
+                ('note', models.CharField(blank=True, max_length=255)),
+                ('created_by', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ['-created_at', '-id'],
+            },
+        ),
+        migrations.CreateModel(
+            name='ShopPriceChange',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('currency', models.CharField(choices=[('UZS', "UZS (so'm)"), ('USD', 'USD (dollar)')], max_length=3)),
+                ('old_price', models.DecimalField(blank=True, decimal_places=2, help_text='Empty when the shop had no override', max_digits=16, null=True)),
+                ('new_price', models.DecimalField(decimal_places=2, max_digits=16)),
+                ('batch', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='changes', to='shops.shoppricebatch')),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='products.product')),
+                ('shop', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='shops.shop')),
+            ],
+            options={
+                'ordering': ['batch', 'shop', 'product'],
+            },
+        ),
+    ]
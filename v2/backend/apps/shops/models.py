@@ -1,10 +1,11 @@
-"""Shops + Regions + per-shop pricing + loan limits."""
+"""Shops + Regions + per-shop pricing + loan limits + shop debt ledger."""
 from django.conf import settings
 from django.db import models
 
 from apps.core.constants import (
     MONEY_DECIMAL_PLACES,
     MONEY_MAX_DIGITS,
+    Currency,
 )
 from apps.core.models import ArchivableModel, TimestampedModel
 
@@ -66,6 +67,7 @@ class Shop(TimestampedModel, ArchivableModel):
         indexes = [
             models.Index(fields=["region", "is_archived"]),
             models.Index(fields=["assigned_driver"]),
+            models.Index(fields=["updated_at"]),  # delta sync feed
         ]
 
     def __str__(self) -> str:
@@ -102,6 +104,117 @@ class ShopProductPrice(TimestampedModel):
     class Meta:
         unique_together = ("shop", "product", "currency")
         ordering = ["shop", "product"]
+        indexes = [models.Index(fields=["updated_at"])]  # delta sync feed
 
     def __str__(self) -> str:
         return f"{self.shop.name} · {self.product.name}: {self.price} {self.currency}"
+
+
+class ShopPriceBatch(TimestampedModel):
+    """One bulk price change — a spreadsheet import or a percentage rule.
+
+    The batch row records who changed what and how; the per-price old/new
+    values are in its ShopPriceChange rows.
+    """
+
+    class Source(models.TextChoices):
+        IMPORT = "import", "Excel import"
+        RULE = "rule", "Foizli o'zgartirish"
+
+    source = models.CharField(max_length=16, choices=Source.choices)
+    currency = models.CharField(
+        max_length=3, choices=Currency.CHOICES, help_text="Default currency of the batch"
+    )
+    rule = models.JSONField(default=dict, blank=True, help_text="Rule parameters or import file name")
+    change_count = models.PositiveIntegerField(default=0)
+    note = models.CharField(max_length=255, blank=True)
+    created_by = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name="+",
+    )
+
+    class Meta:
+        ordering = ["-created_at", "-id"]
+
+    def __str__(self) -> str:
+        return f"{self.get_source_display()} · {self.change_count} narx · {self.created_at:%Y-%m-%d}"
+
+
+class ShopPriceChange(models.Model):
+    """Old → new price of one (shop, product, currency) within a batch."""
+
+    batch = models.ForeignKey(ShopPriceBatch, on_delete=models.CASCADE, related_name="changes")
+    shop = models.ForeignKey(Shop, on_delete=models.CASCADE, related_name="+")
+    product = models.ForeignKey("products.Product", on_delete=models.CASCADE, related_name="+")
+    currency = models.CharField(max_length=3, choices=Currency.CHOICES)
+    old_price = models.DecimalField(
+        max_digits=MONEY_MAX_DIGITS, decimal_places=MONEY_DECIMAL_PLACES,
+        null=True, blank=True, help_text="Empty when the shop had no override",
+    )
+    new_price = models.DecimalField(
+        max_digits=MONEY_MAX_DIGITS, decimal_places=MONEY_DECIMAL_PLACES
+    )
+
+    class Meta:
+        ordering = ["batch", "shop", "product"]
+
+    def __str__(self) -> str:
+        return f"{self.shop_id} · {self.product_id}: {self.old_price} → {self.new_price}"
+
+
+class ShopLedgerKind(models.TextChoices):
+    OPENING = "opening", "Boshlang'ich qoldiq"
+    DELIVERY = "delivery", "Yetkazib berish"
+    RETURN = "return", "Vozvrat"
+    PAYMENT = "payment", "To'lov"
+    ADJUSTMENT = "adjustment", "Qo'lda tuzatish"
+
+
+class ShopLedgerEntry(TimestampedModel):
+    """Append-only history of a shop's debt, one row per balance change.
+
+    Positive amounts increase the debt (deliveries), negative ones reduce it
+    (returns, payments). `occurred_at` is the business time of the document
+    behind the row (posting time is `created_at`), and `balance_after` the
+    shop's loan balance in that currency as of then, in (occurred_at, id)
+    order, so any past balance is a single indexed lookup. Written only
+    through apps.shops.ledger.
+    """
+
+    shop = models.ForeignKey(Shop, on_delete=models.PROTECT, related_name="ledger_entries")
+    currency = models.CharField(max_length=3, choices=Currency.CHOICES)
+    kind = models.CharField(max_length=16, choices=ShopLedgerKind.choices)
+    amount = models.DecimalField(
+        max_digits=MONEY_MAX_DIGITS, decimal_places=MONEY_DECIMAL_PLACES,
+        help_text="Positive = debt up, negative = debt down",
+    )
+    balance_after = models.DecimalField(
+        max_digits=MONEY_MAX_DIGITS, decimal_places=MONEY_DECIMAL_PLACES
+    )
+    occurred_at = models.DateTimeField()
+
+    # Same loose reference scheme as finance.KassaTransaction.
+    reference_id = models.PositiveIntegerField(null=True, blank=True)
+    reference_model = models.CharField(max_length=64, blank=True)
+
+    note = models.CharField(max_length=255, blank=True)
+    created_by = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name="+",
+    )
+
+    class Meta:
+        ordering = ["shop", "currency", "occurred_at", "id"]
+        indexes = [
+            models.Index(fields=["shop", "currency", "occurred_at", "id"]),
+            models.Index(fields=["reference_model", "reference_id"]),
+        ]
+
+    def __str__(self) -> str:
+        return f"{self.shop.name} · {self.get_kind_display()} {self.amount} {self.currency}"
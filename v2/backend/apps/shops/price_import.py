@@ -0,0 +1,215 @@
+"""Bulk shop price changes — spreadsheet import and percentage rules (feature #2).
+
+Both paths build the full list of (shop, product) → new price first, read the
+current overrides for those keys in one query, then write every changed price
+with a single `bulk_create(update_conflicts=True)` upsert on the
+(shop, product, currency) unique key. Each applied change set is recorded as
+one ShopPriceBatch with its ShopPriceChange rows, so a mass change can be
+reviewed (and reverted by hand) later.
+"""
+from decimal import ROUND_HALF_UP, Decimal
+
+from django.db import transaction
+
+from apps.core.money import MONEY_LIMIT, parse_money
+from apps.core.sheets import SheetError, lookup, read_rows
+from apps.products.models import Product
+
+from .models import Shop, ShopPriceBatch, ShopPriceChange, ShopProductPrice
+
+MAX_IMPORT_ROWS = 20000
+
+# Accepted header names (lower-cased) for each spreadsheet column.
+_COLUMNS = {
+    "shop": ("shop", "shop_id", "do'kon", "dokon"),
+    "product": ("product", "product_id", "mahsulot"),
+    "price": ("price", "narx"),
+    "currency": ("currency", "valyuta"),
+}
+
+
+class PriceImportError(ValueError):
+    """The spreadsheet or rule cannot be applied; message is user-facing."""
+
+
+def _money(value) -> Decimal:
+    return Decimal(value).quantize(Decimal("0.01"), rounding=ROUND_HALF_UP)
+
+
+def parse_sheet(file, currency: str) -> tuple[dict, list[dict]]:
+    """Read an .xlsx price sheet → ({(shop_id, product_id, currency): price}, errors).
+
+    The first row is the header; columns are found by name (see _COLUMNS), the
+    currency column is optional and defaults to `currency`. Shops and products
+    may be given by id or by exact name. The workbook is streamed in read-only
+    mode, so large sheets are not loaded into memory at once.
+    """
+    try:
+        raw = read_rows(file, _COLUMNS, required=("shop", "product", "price"), max_rows=MAX_IMPORT_ROWS)
+    except SheetError as exc:
+        raise PriceImportError(str(exc))
+
+    shops = lookup(Shop.objects.all(), {c["shop"] for _, c in raw})
+    products = lookup(Product.objects.all(), {c["product"] for _, c in raw})
+
+    prices, errors = {}, []
+    for line, cells in raw:
+        shop_id = shops.get(cells["shop"])
+        product_id = products.get(cells["product"])
+        cur = str(cells.get("currency") or currency).upper()
+        if shop_id is None:
+            errors.append({"row": line, "detail": f"Do'kon topilmadi: {cells['shop']}"})
+            continue
+        if product_id is None:
+            errors.append({"row": line, "detail": f"Mahsulot topilmadi: {cells['product']}"})
+            continue
+        if cur not in ("UZS", "USD"):
+            errors.append({"row": line, "detail": f"Valyuta noto'g'ri: {cur}"})
+            continue
+        try:
+            price = parse_money(cells["price"])
+        except ValueError:
+            errors.append({"row": line, "detail": f"Narx noto'g'ri: {cells['price']}"})
+            continue
+        if price < 0:
+            errors.append({"row": line, "detail": "Narx manfiy bo'lishi mumkin emas"})
+            continue
+        prices[(shop_id, product_id, cur)] = price
+    return prices, errors
+
+
+def rule_prices(
+    currency: str,
+    percent,
+    *,
+    products=None,
+    regions=None,
+    shops=None,
+    include_defaults: bool = False,
+    round_to=None,
+) -> dict:
+    """New prices for a "+/- N %" rule → {(shop_id, product_id, currency): price}.
+
+    Applies to the existing overrides of the selected shops (every active shop
+    of `regions`, or `shops`, or all) and products. With `include_defaults`,
+    shops still on the product default get an override at default × (1 + N%).
+    Results are rounded to the nearest `round_to` (e.g. 100 so'm) when given.
+    """
+    factor = 1 + Decimal(str(percent)) / 100
+    step = Decimal(str(round_to)) if round_to else None
+
+    def adjust(price: Decimal) -> Decimal:
+        value = price * factor
+        if step:
+            value = (value / step).quantize(Decimal("1"), rounding=ROUND_HALF_UP) * step
+        if value >= MONEY_LIMIT:
+            raise PriceImportError(f"Narx juda katta bo'lib ketadi: {price}")
+        return _money(max(value, Decimal("0")))
+
+    shop_qs = Shop.objects.filter(is_archived=False)
+    if shops:
+        shop_qs = shop_qs.filter(id__in=shops)
+    if regions:
+        shop_qs = shop_qs.filter(region_id__in=regions)
+    shop_ids = list(shop_qs.values_list("id", flat=True))
+
+    product_qs = Product.objects.filter(is_archived=False)
+    if products:
+        product_qs = product_qs.filter(id__in=products)
+    price_field = "default_price_uzs" if currency == "UZS" else "default_price_usd"
+    defaults = dict(product_qs.values_list("id", price_field))
+
+    current = current_prices(shop_ids, defaults.keys(), currency)
+    prices = {}
+    for shop_id in shop_ids:
+        for product_id, default in defaults.items():
+            key = (shop_id, product_id, currency)
+            base = current.get(key)
+            if base is None:
+                if not include_defaults:
+                    continue
+                base = default
+            prices[key] = adjust(base)
+    return prices
+
+
+def current_prices(shop_ids, product_ids, currency: str) -> dict:
+    return {
+        (s, p, currency): price
+        for s, p, price in ShopProductPrice.objects.filter(
+            shop_id__in=list(shop_ids), product_id__in=list(product_ids), currency=currency,
+        ).values_list("shop_id", "product_id", "price")
+    }
+
+
+def diff(prices: dict) -> list[dict]:
+    """Only the entries that actually change, with their current override (if any)."""
+    by_currency: dict = {}
+    for shop_id, product_id, cur in prices:
+        s, p = by_currency.setdefault(cur, (set(), set()))
+        s.add(shop_id)
+        p.add(product_id)
+    current = {}
+    for cur, (shop_ids, product_ids) in by_currency.items():
+        current.update(current_prices(shop_ids, product_ids, cur))
+    return [
+        {
+            "shop": shop_id,
+            "product": product_id,
+            "currency": cur,
+            "old_price": current.get((shop_id, product_id, cur)),
+            "new_price": price,
+        }
+        for (shop_id, product_id, cur), price in sorted(prices.items())
+        if current.get((shop_id, product_id, cur)) != price
+    ]
+
+
+def apply(
+    changes: list[dict],
+    *,
+    source: str,
+    currency: str,
+    rule: dict | None = None,
+    note: str = "",
+    user=None,
+) -> ShopPriceBatch | None:
+    """Upsert `changes` (as returned by `diff`) and record the batch.
+
+    Returns None when there is nothing to change.
+    """
+    if not changes:
+        return None
+    with transaction.atomic():
+        ShopProductPrice.objects.bulk_create(
+            [
+                ShopProductPrice(
+                    shop_id=c["shop"], product_id=c["product"],
+                    currency=c["currency"], price=c["new_price"],
+                )
+                for c in changes
+            ],
+            batch_size=1000,
+            update_conflicts=True,
+            unique_fields=["shop", "product", "currency"],
+            update_fields=["price", "updated_at"],
+        )
+        batch = ShopPriceBatch.objects.create(
+            source=source,
+            currency=currency,
+            rule=rule or {},
+            change_count=len(changes),
+            note=note[:255],
+            created_by=user if user is not None and user.is_authenticated else None,
+        )
+        ShopPriceChange.objects.bulk_create(
+            [
+                ShopPriceChange(
+                    batch=batch, shop_id=c["shop"], product_id=c["product"],
+                    currency=c["currency"], old_price=c["old_price"], new_price=c["new_price"],
+                )
+                for c in changes
+            ],
+            batch_size=2000,
+        )
+    return batch
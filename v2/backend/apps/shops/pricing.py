@@ -0,0 +1,94 @@
+"""Effective shop price sheets (feature #2).
+
+An order line's price is the shop's ShopProductPrice override when one exists,
+otherwise the product's default price in that currency. Order entry needs that
+merge for every product of a shop (and often for many shops at once), so it is
+resolved here once per (shop, currency) and kept in the process cache.
+
+Cache keys embed a price-table version derived from the two source tables, so
+any edit (in any worker) produces a new key and stale sheets are never served —
+they simply age out.
+"""
+from decimal import Decimal
+
+from django.core.cache import cache
+from django.db.models import Count, Max, Q
+
+from apps.core.cache import fingerprint
+from apps.products.models import Product
+
+from .models import ShopProductPrice
+
+SHEET_TTL = 60 * 60  # seconds; the version in the key already handles staleness
+
+
+def price_table_version() -> str:
+    """Cheap fingerprint of ShopProductPrice + Product pricing state.
+
+    Two aggregate queries. updated_at catches edits, the counts catch deletes
+    and archive/unarchive (which save without touching updated_at).
+    """
+    overrides = ShopProductPrice.objects.aggregate(m=Max("updated_at"), n=Count("id"))
+    products = Product.objects.aggregate(
+        m=Max("updated_at"),
+        a=Max("archived_at"),
+        n=Count("id", filter=Q(is_archived=False)),
+    )
+    return fingerprint(overrides["m"], overrides["n"], products["m"], products["a"], products["n"])
+
+
+def _sheet_key(version: str, shop_id: int, currency: str) -> str:
+    return f"shops:price-sheet:{version}:{currency}:{shop_id}"
+
+
+def _build_sheets(shop_ids: list[int], currency: str) -> dict[int, dict]:
+    """Resolve sheets for many shops in two queries (defaults + overrides)."""
+    price_field = "default_price_uzs" if currency == "UZS" else "default_price_usd"
+    defaults = {
+        pid: str(price)
+        for pid, price in Product.objects.filter(is_archived=False).values_list("id", price_field)
+    }
+    sheets = {
+        sid: {"prices": dict(defaults), "overrides": []}
+        for sid in shop_ids
+    }
+    overrides = ShopProductPrice.objects.filter(
+        shop_id__in=shop_ids, currency=currency, product_id__in=defaults.keys()
+    ).values_list("shop_id", "product_id", "price")
+    for shop_id, product_id, price in overrides:
+        sheet = sheets[shop_id]
+        sheet["prices"][product_id] = str(price)
+        sheet["overrides"].append(product_id)
+    return sheets
+
+
+def get_price_sheets(shop_ids, currency: str = "UZS") -> dict[int, dict]:
+    """{shop_id: {"prices": {product_id: "price"}, "overrides": [product_id, ...]}}.
+
+    Cached sheets are served as-is; only the missing shops are resolved, in one
+    batch, and written back.
+    """
+    shop_ids = sorted({int(s) for s in shop_ids})
+    if not shop_ids:
+        return {}
+    version = price_table_version()
+    keys = {sid: _sheet_key(version, sid, currency) for sid in shop_ids}
+    cached = cache.get_many(keys.values())
+    result = {sid: cached[key] for sid, key in keys.items() if key in cached}
+
+    missing = [sid for sid in shop_ids if sid not in result]
+    if missing:
+        built = _build_sheets(missing, currency)
+        cache.set_many({keys[sid]: sheet for sid, sheet in built.items()}, SHEET_TTL)
+        result.update(built)
+    return result
+
+
+def get_price_sheet(shop_id: int, currency: str = "UZS") -> dict:
+    return get_price_sheets([shop_id], currency)[int(shop_id)]
+
+
+def resolve_price(shop_id: int, product_id: int, currency: str = "UZS") -> Decimal | None:
+    """Effective unit price for one line, or None for an unknown/archived product."""
+    price = get_price_sheet(shop_id, currency)["prices"].get(int(product_id))
+    return Decimal(price) if price is not None else None
@@ -0,0 +1,121 @@
+"""Region board — per-region order, delivery, debt and collection stats for a date.
+
+Four grouped queries regardless of the number of regions:
+
+1. regions with their shop counts (all / active) and outstanding debt;
+2. the date's orders counted by region and status;
+3. the date's delivered value (net of returns) by region and currency;
+4. cash collected on the date by region and currency.
+
+The board is cached per date under a fingerprint of the date's orders, the
+day's payments and shop balances (apps.core.cache), so polling clients hit
+the cache until one of those changes.
+"""
+from decimal import Decimal
+
+from django.db.models import Count, DecimalField, ExpressionWrapper, F, Max, Q, Sum
+
+from apps.core.cache import fingerprint, get_or_build
+from apps.finance.models import Payment
+from apps.orders.models import Order, OrderItem, OrderStatus
+
+from .models import Region, Shop
+
+ZERO = Decimal("0")
+STATUS_KEYS = ("pending", "partial", "delivered", "cancelled")
+
+
+def _payments_on(day):
+    return Payment.objects.filter(business_date=day)
+
+
+def _board_version(day) -> str:
+    orders = Order.objects.filter(order_date=day).aggregate(m=Max("updated_at"), n=Count("id"))
+    payments = _payments_on(day).aggregate(m=Max("updated_at"), n=Count("id"))
+    shops = Shop.objects.aggregate(m=Max("updated_at"), n=Count("id"))
+    regions = Region.objects.aggregate(m=Max("updated_at"), n=Count("id", filter=Q(is_archived=False)))
+    return fingerprint(
+        orders["m"], orders["n"], payments["m"], payments["n"],
+        shops["m"], shops["n"], regions["m"], regions["n"],
+    )
+
+
+def _money(value) -> str:
+    return str((value or ZERO).quantize(Decimal("0.01")))
+
+
+def _money_pair():
+    return {"uzs": ZERO, "usd": ZERO}
+
+
+def _build_board(day) -> list[dict]:
+    active = Q(shops__is_archived=False)
+    regions = (
+        Region.objects.filter(is_archived=False)
+        .annotate(
+            shop_count=Count("shops"),
+            active_shop_count=Count("shops", filter=active),
+            debt_uzs=Sum("shops__loan_balance_uzs", filter=active),
+            debt_usd=Sum("shops__loan_balance_usd", filter=active),
+        )
+        .order_by("name")
+    )
+
+    counts: dict = {}
+    for row in (
+        Order.objects.filter(order_date=day)
+        .values("shop__region_id", "status")
+        .annotate(n=Count("id"))
+    ):
+        bucket = counts.setdefault(row["shop__region_id"], dict.fromkeys(("total", *STATUS_KEYS), 0))
+        bucket["total"] += row["n"]
+        bucket[row["status"]] = bucket.get(row["status"], 0) + row["n"]
+
+    delivered: dict = {}
+    net = ExpressionWrapper(
+        (F("delivered_quantity") - F("returned_quantity")) * F("unit_price"),
+        output_field=DecimalField(),
+    )
+    for row in (
+        OrderItem.objects.filter(order__order_date=day)
+        .exclude(order__status=OrderStatus.CANCELLED)
+        .values("order__shop__region_id", "order__currency")
+        .annotate(v=Sum(net))
+    ):
+        pair = delivered.setdefault(row["order__shop__region_id"], _money_pair())
+        pair[row["order__currency"].lower()] += row["v"] or ZERO
+
+    collected: dict = {}
+    for row in _payments_on(day).values("shop__region_id", "currency").annotate(v=Sum("amount")):
+        pair = collected.setdefault(row["shop__region_id"], _money_pair())
+        pair[row["currency"].lower()] += row["v"] or ZERO
+
+    board = []
+    for r in regions:
+        d = delivered.get(r.id, _money_pair())
+        c = collected.get(r.id, _money_pair())
+        board.append({
+            "id": r.id,
+            "name": r.name,
+            "note": r.note,
+            "shop_count": r.shop_count,
+            "active_shop_count": r.active_shop_count,
+            "date": day.isoformat(),
+            **counts.get(r.id, dict.fromkeys(("total", *STATUS_KEYS), 0)),
+            "delivered_value_uzs": _money(d["uzs"]),
+            "delivered_value_usd": _money(d["usd"]),
+            "debt_uzs": _money(r.debt_uzs),
+            "debt_usd": _money(r.debt_usd),
+            "collected_uzs": _money(c["uzs"]),
+            "collected_usd": _money(c["usd"]),
+        })
+    return board
+
+
+def region_board(day) -> list[dict]:
+    """Board rows for every active region (by name) on `day`."""
+    return get_or_build(
+        f"shops:region-board:{day.isoformat()}",
+        _board_version(day),
+        lambda: _build_board(day),
+    )
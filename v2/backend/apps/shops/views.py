@@ -1,3 +1,6 @@
+from decimal import Decimal, InvalidOperation
+
+from django.db import transaction
 from django.db.models import Count, F, Q
 from django.utils import timezone
 from rest_framework import filters, status, viewsets
@@ -5,9 +8,14 @@ from rest_framework.decorators import action
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 
-from apps.orders.models import Order, OrderStatus
+from apps.core.idempotency import idempotent
+from apps.core.money import MONEY_LIMIT, parse_money
+from apps.core.permissions import ReadOrManagerWrite
 
-from .models import Region, Shop, ShopProductPrice
+from . import ledger, price_import
+from .models import Region, Shop, ShopLedgerKind, ShopPriceBatch, ShopProductPrice
+from .pricing import get_price_sheet, get_price_sheets
+from .region_board import region_board
 from .serializers import (
     RegionSerializer,
     ShopDetailSerializer,
@@ -41,50 +49,20 @@ class RegionViewSet(viewsets.ModelViewSet):
 
     @action(detail=False, methods=["get"], url_path="today_stats")
     def today_stats(self, request):
-        """Per-region order counts for a given date (default = today).
+        """Per-region board for a given date (default = today).
 
-        Returns: [{id, name, shop_count, total, pending, partial, delivered, cancelled}, ...]
-        Used by the Hududlar overview card grid.
+        Returns: [{id, name, note, shop_count, active_shop_count, date, total, pending, partial,
+        delivered, cancelled, delivered_value_*, debt_*, collected_*}, ...]
+        Used by the Hududlar overview card grid; cached per date (see region_board).
         """
-        date = request.query_params.get("date") or timezone.localdate().isoformat()
-        regions = (
-            Region.objects.filter(is_archived=False)
-            .annotate(shop_count=Count("shops", distinct=True))
-            .order_by("name")
-        )
-        # One aggregated query: count orders on the date, grouped by region + status.
-        by_region = (
-            Order.objects.filter(order_date=date)
-            .values("shop__region_id", "status")
-            .annotate(n=Count("id"))
-        )
-        totals: dict[int, dict[str, int]] = {}
-        for row in by_region:
-            rid = row["shop__region_id"]
-            if rid is None:
-                continue
-            bucket = totals.setdefault(
-                rid,
-                {"total": 0, "pending": 0, "partial": 0, "delivered": 0, "cancelled": 0},
-            )
-            bucket["total"] += row["n"]
-            bucket[row["status"]] = bucket.get(row["status"], 0) + row["n"]
-
-        result = []
-        for r in regions:
-            stats = totals.get(r.id, {
-                "total": 0, "pending": 0, "partial": 0,
-                "delivered": 0, "cancelled": 0,
-            })
-            result.append({
-                "id": r.id,
-                "name": r.name,
-                "note": r.note,
-                "shop_count": r.shop_count,
-                "date": date,
-                **stats,
-            })
-        return Response(result)
+        from datetime import datetime
+
+        raw = request.query_params.get("date")
+        try:
+            day = datetime.strptime(raw, "%Y-%m-%d").date() if raw else timezone.localdate()
+        except ValueError:
+            return Response({"detail": "date must be YYYY-MM-DD."}, status=400)
+        return Response(region_board(day))
 
 
 class ShopViewSet(viewsets.ModelViewSet):
@@ -129,78 +107,120 @@ class ShopViewSet(viewsets.ModelViewSet):
         shop.unarchive()
         return Response(ShopListSerializer(shop).data)
 
-    @action(detail=True, methods=["get"], url_path="debt-timeline")
-    def debt_timeline(self, request, pk=None):
-        """GET /shops/{id}/debt-timeline/?date_from=&date_to= — day-by-day debt
-        history (UZS). Debt rises with delivered order value and falls with
-        payments (amount + discount). Running balance is anchored to the shop's
-        current loan_balance and computed backward, so recent days are exact even
-        without a stored ledger."""
-        from collections import defaultdict
+    def _date_range(self, request):
+        """(date_from, date_to) from the query, defaulting to the last 7 days."""
         from datetime import datetime, timedelta
-        from django.db.models import DecimalField, Sum
-        from django.db.models.functions import TruncDate
-        from apps.finance.models import Payment
-        from apps.orders.models import OrderItem
 
-        shop = self.get_object()
         today = timezone.localdate()
+        p = request.query_params
+        df = datetime.strptime(p["date_from"], "%Y-%m-%d").date() \
+            if p.get("date_from") else today - timedelta(days=6)
+        dt = datetime.strptime(p["date_to"], "%Y-%m-%d").date() \
+            if p.get("date_to") else today
+        return df, dt
+
+    @action(detail=True, methods=["get"], url_path="debt-timeline")
+    def debt_timeline(self, request, pk=None):
+        """GET /shops/{id}/debt-timeline/?date_from=&date_to=&currency= — day-by-day
+        debt history. Debt rises with deliveries and falls with returns and
+        payments (amount + discount). Read from the shop ledger, so only the
+        requested window is scanned and past edits appear as their own rows."""
+        shop = self.get_object()
+        currency = request.query_params.get("currency", "UZS")
         try:
-            df = datetime.strptime(request.query_params["date_from"], "%Y-%m-%d").date() \
-                if request.query_params.get("date_from") else today - timedelta(days=6)
-            dt = datetime.strptime(request.query_params["date_to"], "%Y-%m-%d").date() \
-                if request.query_params.get("date_to") else today
+            df, dt = self._date_range(request)
         except ValueError:
             return Response({"detail": "Invalid date. Use YYYY-MM-DD."}, status=400)
 
-        current = float(shop.loan_balance_uzs)
-        daily = defaultdict(lambda: {"delivered": 0.0, "paid": 0.0})
-
-        # Delivered order value per day (debt added on delivery).
-        oi = (
-            OrderItem.objects
-            .filter(order__shop=shop, order__currency="UZS")
-            .exclude(order__status="cancelled")
-            .values("order__order_date")
-            .annotate(v=Sum(F("delivered_quantity") * F("unit_price"), output_field=DecimalField()))
-        )
-        for r in oi:
-            daily[r["order__order_date"]]["delivered"] += float(r["v"] or 0)
-        # Payments per day (debt reduced by amount + discount).
-        pay = (
-            Payment.objects.filter(shop=shop, currency="UZS")
-            .annotate(d=TruncDate("received_at"))
-            .values("d")
-            .annotate(a=Sum("amount"), disc=Sum("discount"))
-        )
-        for r in pay:
-            daily[r["d"]]["paid"] += float(r["a"] or 0) + float(r["disc"] or 0)
-
-        # Walk days newest→oldest, anchoring the running balance to `current`.
-        running = current
-        rows = []
-        for day in sorted(daily.keys(), reverse=True):
-            delivered = round(daily[day]["delivered"], 2)
-            paid = round(daily[day]["paid"], 2)
-            net = round(delivered - paid, 2)
-            balance_after = round(running, 2)
-            running -= net
-            if df <= day <= dt:
-                rows.append({
-                    "date": day.isoformat(),
-                    "delivered": delivered,
-                    "paid": paid,
-                    "net": net,
-                    "balance_after": balance_after,
-                })
+        rows = [
+            {
+                "date": r["date"],
+                "delivered": round(float(r["delivered"]), 2),
+                "returned": round(float(r["returned"]), 2),
+                "paid": round(float(r["paid"]), 2),
+                "adjusted": round(float(r["adjusted"]), 2),
+                "net": round(float(r["net"]), 2),
+                "balance_after": round(float(r["balance_after"]), 2),
+            }
+            for r in ledger.daily_timeline(shop.id, currency, df, dt)
+        ]
+        current = shop.loan_balance_uzs if currency == "UZS" else shop.loan_balance_usd
         return Response({
             "shop": shop.name,
+            "currency": currency,
             "date_from": df.isoformat(),
             "date_to": dt.isoformat(),
-            "current_balance_uzs": round(current, 2),
+            "current_balance_uzs": round(float(shop.loan_balance_uzs), 2),
+            "current_balance": round(float(current), 2),
             "days": rows,  # newest first
         })
 
+    @action(detail=True, methods=["get"])
+    def statement(self, request, pk=None):
+        """GET /shops/{id}/statement/?date_from=&date_to=&currency= — akt sverka:
+        opening balance, every ledger row in the window, closing balance."""
+        shop = self.get_object()
+        currency = request.query_params.get("currency", "UZS")
+        try:
+            df, dt = self._date_range(request)
+        except ValueError:
+            return Response({"detail": "Invalid date. Use YYYY-MM-DD."}, status=400)
+        data = ledger.statement(shop.id, currency, df, dt)
+        return Response({
+            "shop": shop.name,
+            "currency": currency,
+            "date_from": df.isoformat(),
+            "date_to": dt.isoformat(),
+            "opening_balance": str(data["opening"]),
+            "closing_balance": str(data["closing"]),
+            "entries": [
+                {**e, "amount": str(e["amount"]), "balance_after": str(e["balance_after"])}
+                for e in data["entries"]
+            ],
+        })
+
+    @action(detail=True, methods=["get"], url_path="balance-as-of")
+    def balance_as_of(self, request, pk=None):
+        """GET /shops/{id}/balance-as-of/?date=YYYY-MM-DD — debt at the end of that day."""
+        from datetime import datetime, time
+
+        shop = self.get_object()
+        try:
+            day = datetime.strptime(request.query_params["date"], "%Y-%m-%d").date()
+        except (KeyError, ValueError):
+            return Response({"detail": "date is required (YYYY-MM-DD)."}, status=400)
+        at = timezone.make_aware(datetime.combine(day, time.max))
+        return Response({
+            "shop": shop.name,
+            "date": day.isoformat(),
+            "balance_uzs": str(ledger.balance_as_of(shop.id, "UZS", at)),
+            "balance_usd": str(ledger.balance_as_of(shop.id, "USD", at)),
+        })
+
+    @action(detail=True, methods=["post"], url_path="adjust-balance",
+            permission_classes=[ReadOrManagerWrite])
+    @idempotent
+    def adjust_balance(self, request, pk=None):
+        """POST /shops/{id}/adjust-balance/ {currency, new_balance, note} — manual
+        correction of a shop's debt. Posted as an adjustment row in the ledger."""
+        currency = request.data.get("currency", "UZS")
+        if currency not in ("UZS", "USD"):
+            return Response({"detail": "currency UZS yoki USD bo'lishi kerak"}, status=400)
+        try:
+            new_balance = parse_money(request.data.get("new_balance"))
+        except ValueError:
+            return Response({"detail": "new_balance noto'g'ri"}, status=400)
+        with transaction.atomic():
+            shop = Shop.objects.select_for_update().get(pk=self.get_object().pk)
+            current = shop.loan_balance_uzs if currency == "UZS" else shop.loan_balance_usd
+            if abs(new_balance - current) >= MONEY_LIMIT:
+                return Response({"detail": "new_balance noto'g'ri"}, status=400)
+            ledger.post_entry(
+                shop, currency, new_balance - current, ShopLedgerKind.ADJUSTMENT,
+                note=request.data.get("note", ""), user=request.user,
+            )
+        return Response(ShopListSerializer(shop).data)
+
     @action(detail=True, methods=["get", "post"])
     def prices(self, request, pk=None):
         """GET → list per-shop prices. POST → upsert a price for (product, currency)."""
@@ -224,6 +244,150 @@ class ShopViewSet(viewsets.ModelViewSet):
         ser.save()
         return Response(ser.data, status=status.HTTP_200_OK if existing else status.HTTP_201_CREATED)
 
+    @action(detail=True, methods=["get"], url_path="price-sheet")
+    def price_sheet(self, request, pk=None):
+        """GET /shops/{id}/price-sheet/?currency=UZS — effective price for every
+        active product: the shop override when set, else the product default."""
+        shop = self.get_object()
+        currency = request.query_params.get("currency", "UZS")
+        if currency not in ("UZS", "USD"):
+            return Response({"detail": "currency must be UZS or USD."}, status=400)
+        return Response({"shop": shop.id, "currency": currency, **get_price_sheet(shop.id, currency)})
+
+    @action(detail=False, methods=["get", "post"], url_path="price-sheets")
+    def price_sheets(self, request):
+        """Effective price sheets for many shops in one call.
+
+        GET  ?shops=1,2,3&currency=UZS  (or ?region=N for every shop in a region)
+        POST {"shops": [1, 2, 3], "currency": "UZS"} — for long shop lists.
+        Returns {"currency", "results": {shop_id: {"prices": {...}, "overrides": [...]}}}.
+        """
+        src = request.data if request.method == "POST" else request.query_params
+        currency = src.get("currency", "UZS")
+        if currency not in ("UZS", "USD"):
+            return Response({"detail": "currency must be UZS or USD."}, status=400)
+        raw = src.get("shops")
+        try:
+            if isinstance(raw, list):
+                shop_ids = [int(s) for s in raw]
+            elif raw:
+                shop_ids = [int(s) for s in str(raw).split(",") if s.strip()]
+            else:
+                shop_ids = []
+        except (TypeError, ValueError):
+            return Response({"detail": "shops must be a list of ids."}, status=400)
+        if not shop_ids:
+            region = src.get("region")
+            if not region:
+                return Response({"detail": "shops or region is required."}, status=400)
+            try:
+                region = int(region)
+            except (TypeError, ValueError):
+                return Response({"detail": "region must be an id."}, status=400)
+            shop_ids = list(
+                Shop.objects.filter(region_id=region, is_archived=False).values_list("id", flat=True)
+            )
+        # Only resolve shops that actually exist.
+        shop_ids = list(Shop.objects.filter(id__in=shop_ids).values_list("id", flat=True))
+        return Response({"currency": currency, "results": get_price_sheets(shop_ids, currency)})
+
+    @action(detail=False, methods=["get", "post"], url_path="bulk-prices",
+            permission_classes=[ReadOrManagerWrite])
+    @idempotent
+    def bulk_prices(self, request):
+        """Mass price changes across shops.
+
+        GET  → the last 50 batches (history).
+        POST multipart {file: .xlsx, currency?, note?, dry_run?} — import a sheet
+             with shop / product / price [/ currency] columns (ids or names).
+        POST {percent, currency, products?, regions?, shops?, include_defaults?,
+             round_to?, note?, dry_run?} — raise/lower overrides by N %.
+        Only prices that actually change are written, in one upsert, and are
+        recorded as one batch. dry_run=true returns the changes without saving.
+        """
+        if request.method == "GET":
+            batches = ShopPriceBatch.objects.select_related("created_by")[:50]
+            return Response([
+                {
+                    "id": b.id,
+                    "source": b.source,
+                    "currency": b.currency,
+                    "rule": b.rule,
+                    "change_count": b.change_count,
+                    "note": b.note,
+                    "created_by": b.created_by.username if b.created_by else None,
+                    "created_at": b.created_at,
+                }
+                for b in batches
+            ])
+
+        data = request.data
+        currency = data.get("currency", "UZS")
+        if currency not in ("UZS", "USD"):
+            return Response({"detail": "currency UZS yoki USD bo'lishi kerak"}, status=400)
+        dry_run = str(data.get("dry_run", "")).lower() in ("1", "true")
+        upload = request.FILES.get("file")
+        errors = []
+        try:
+            if upload is not None:
+                source = ShopPriceBatch.Source.IMPORT
+                rule = {"file": upload.name}
+                prices, errors = price_import.parse_sheet(upload, currency)
+            else:
+                source = ShopPriceBatch.Source.RULE
+                try:
+                    percent = Decimal(str(data.get("percent")))
+                    round_to = Decimal(str(data["round_to"])) if data.get("round_to") else None
+                    if not percent.is_finite() or (
+                        round_to is not None and not (round_to.is_finite() and 0 < round_to < MONEY_LIMIT)
+                    ):
+                        raise InvalidOperation
+                    scope = {
+                        k: [int(v) for v in (data.get(k) or [])]
+                        for k in ("products", "regions", "shops")
+                    }
+                except (InvalidOperation, TypeError, ValueError):
+                    return Response({"detail": "percent, round_to yoki ro'yxatlar noto'g'ri"}, status=400)
+                if not -100 < percent <= 1000:
+                    return Response({"detail": "percent -100 dan 1000 gacha bo'lishi kerak"}, status=400)
+                include_defaults = data.get("include_defaults") in (True, "1", "true")
+                rule = {
+                    "percent": str(percent),
+                    "round_to": str(round_to) if round_to else None,
+                    "include_defaults": include_defaults,
+                    **scope,
+                }
+                prices = price_import.rule_prices(
+                    currency, percent, include_defaults=include_defaults,
+                    round_to=round_to, **scope,
+                )
+        except price_import.PriceImportError as exc:
+            return Response({"detail": str(exc)}, status=400)
+
+        changes = price_import.diff(prices)
+        if errors and not dry_run:
+            return Response({"detail": "Faylda xatolar bor", "errors": errors}, status=400)
+        batch = None
+        if not dry_run:
+            batch = price_import.apply(
+                changes, source=source, currency=currency, rule=rule,
+                note=data.get("note", ""), user=request.user,
+            )
+        return Response({
+            "dry_run": dry_run,
+            "batch": batch.id if batch else None,
+            "change_count": len(changes),
+            "changes": [
+                {
+                    **c,
+                    "old_price": str(c["old_price"]) if c["old_price"] is not None else None,
+                    "new_price": str(c["new_price"]),
+                }
+                for c in changes
+            ],
+            "errors": errors,
+        }, status=status.HTTP_201_CREATED if batch else status.HTTP_200_OK)
+
     @action(detail=True, methods=["delete"], url_path="prices/(?P<price_id>[^/.]+)")
     def delete_price(self, request, pk=None, price_id=None):
         shop = self.get_object()
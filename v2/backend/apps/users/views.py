@@ -7,6 +7,8 @@ from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 from rest_framework.views import APIView
 
+from apps.core import sync
+from apps.core.pagination import CursorOrPagePagination
 from apps.core.permissions import IsManagerOrAdmin, ReadOrManagerWrite
 
 from .models import EmployeeGroup, User, UserActivityLog
@@ -60,7 +62,10 @@ class UserViewSet(viewsets.ModelViewSet):
             # Detach from groups and shop assignments.
             instance.employee_groups.clear()
             if shop_ids:
-                Shop.objects.filter(id__in=shop_ids).update(assigned_driver=None)
+                Shop.objects.filter(id__in=shop_ids).update(
+                    assigned_driver=None, updated_at=timezone.now()
+                )
+                sync.record_scope_change(shop_ids, instance.id)
 
             instance.is_archived = True
             instance.is_active = False
@@ -88,10 +93,12 @@ class UserViewSet(viewsets.ModelViewSet):
 
             # Re-assign the shops they used to cover, as long as no other driver
             # has been put on them in the meantime (don't clobber a reassignment).
-            Shop.objects.filter(
+            shop_ids = list(Shop.objects.filter(
                 id__in=state.get("shop_ids", []),
                 assigned_driver__isnull=True,
-            ).update(assigned_driver=user)
+            ).values_list("id", flat=True))
+            Shop.objects.filter(id__in=shop_ids).update(assigned_driver=user, updated_at=timezone.now())
+            sync.record_scope_change(shop_ids, user.id)
 
             user.is_archived = False
             user.is_active = True
@@ -119,6 +126,8 @@ class ActivityLogViewSet(viewsets.ReadOnlyModelViewSet):
     """Feature #15 — professional user activity log."""
     permission_classes = [IsManagerOrAdmin]
     serializer_class = UserActivityLogSerializer
+    pagination_class = CursorOrPagePagination
+    cursor_ordering = ("-timestamp", "-id")
 
     def get_queryset(self):
         qs = UserActivityLog.objects.select_related("user")
@@ -2,9 +2,19 @@
 import os
 
 from celery import Celery
+from celery.schedules import crontab
 
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "config.settings")
 
 app = Celery("bakery_v2")
 app.config_from_object("django.conf:settings", namespace="CELERY")
 app.autodiscover_tasks()
+
+# Static schedule; the DatabaseScheduler (CELERY_BEAT_SCHEDULER) copies these
+# entries into django_celery_beat's tables on start.
+app.conf.beat_schedule = {
+    "inventory-price-stats-daily": {
+        "task": "inventory.refresh_price_stats",
+        "schedule": crontab(hour=0, minute=15),
+    },
+}
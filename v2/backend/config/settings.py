@@ -5,6 +5,7 @@ Loads from environment via python-decouple.
 from datetime import timedelta
 from pathlib import Path
 
+from corsheaders.defaults import default_headers
 from decouple import Csv, config
 
 BASE_DIR = Path(__file__).resolve().parent.parent
@@ -21,6 +22,7 @@ DJANGO_APPS = [
     "django.contrib.sessions",
     "django.contrib.messages",
     "django.contrib.staticfiles",
+    "django.contrib.postgres",  # trigram lookups for apps.core.search
 ]
 
 THIRD_PARTY_APPS = [
@@ -107,6 +109,23 @@ DATABASES = {
     )
 }
 
+# ──────────────── Cache ────────────────
+# Per-process memory cache for derived read models (price sheets, ...). Entries
+# are keyed on a version read from the database, so workers never serve stale data.
+CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        "LOCATION": "bakery-v2",
+    }
+}
+
+# ──────────────── Kassa balances ────────────────
+# Deferred mode: postings only append ledger rows and the cached kassa balance
+# is folded in afterwards (apps.finance.balances.fold) — relieves lock queues
+# on the two kassa rows. Folding also runs from the fold_kassa_balances task.
+KASSA_DEFERRED_BALANCES = config("KASSA_DEFERRED_BALANCES", default=False, cast=bool)
+KASSA_FOLD_ON_COMMIT = config("KASSA_FOLD_ON_COMMIT", default=True, cast=bool)
+
 # ──────────────── Auth ────────────────
 AUTH_USER_MODEL = "users.User"
 
@@ -165,6 +184,9 @@ CORS_ALLOWED_ORIGINS = config(
     cast=Csv(),
 )
 CORS_ALLOW_CREDENTIALS = True
+# Retry-safe writes (apps.core.idempotency) are keyed on this request header.
+CORS_ALLOW_HEADERS = (*default_headers, "idempotency-key")
+CORS_EXPOSE_HEADERS = ["Idempotent-Replayed"]
 
 # ──────────────── Celery ────────────────
 REDIS_URL = config("REDIS_URL", default="redis://localhost:6380/0")